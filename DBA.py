@@ -1,28 +1,103 @@
 import sqlite3
+import threading
 from configparser import ConfigParser
 from pathlib import Path
 from appdirs import user_config_dir
 
+# Tuning applied to every new connection
+# - WAL lets the ui thread read while a worker thread writes
+# - synchronous=NORMAL is safe with WAL, it only skips an fsync per commit
+PRAGMAS: dict[str, str | int] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,  # negative = KiB, so ~64MB
+    "mmap_size": 268435456,  # 256MB
+    "foreign_keys": "ON",
+    "temp_store": "MEMORY",
+}
+
+# config.ini is read once, instead of every time a DBAccess is made
+_default_db_name: str | None = None
+_config_lock = threading.Lock()
+# each thread keeps its connections open: {db_name: connection}, {db_name: DBAccess nesting depth}
+_local = threading.local()
+
+
+def get_default_db_name() -> str:
+    """Returns the database path from config.ini, read once"""
+    global _default_db_name
+    with _config_lock:
+        if _default_db_name is None:
+            config = ConfigParser()
+            cfg_file = (
+                Path(user_config_dir(appname="musicpom", appauthor="billypom"))
+                / "config.ini"
+            )
+            config.read(cfg_file)
+            _default_db_name = config.get("settings", "db")
+        return _default_db_name
+
+
+def reload_config() -> None:
+    """Forget the database path, so it gets read from config.ini again - for when the user changes it"""
+    global _default_db_name
+    with _config_lock:
+        _default_db_name = None
+
+
+def get_connection(db_name: str) -> sqlite3.Connection:
+    """Returns this thread's connection to `db_name`, connecting (and tuning it) the first time"""
+    connections: dict[str, sqlite3.Connection] = _local.__dict__.setdefault("connections", {})
+    conn = connections.get(db_name)
+    if conn is None:
+        conn = sqlite3.connect(db_name)
+        for pragma, value in PRAGMAS.items():
+            conn.execute(f"PRAGMA {pragma} = {value};")
+        connections[db_name] = conn
+    return conn
+
+
+def close_connections() -> None:
+    """Closes every connection this thread has open"""
+    connections: dict[str, sqlite3.Connection] = _local.__dict__.setdefault("connections", {})
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
 
 class DBAccess:
+    """
+    Database access for one unit of work
+
+    ```
+    with DBA.DBAccess() as db:
+        db.execute(...)
+    ```
+
+    The connection underneath belongs to the current thread and stays open between uses.
+    The `with` block is a transaction - committed when it ends, rolled back if it raises.
+    Nested blocks on the same thread join the outer one, so wrapping a loop of
+    functions that each use DBAccess batches them all into one commit (see `transaction()`)
+    """
+
     def __init__(self, db_name=None):
-        # logging.info("Instantiating DBAccess")
-        config = ConfigParser()
-        cfg_file = (
-            Path(user_config_dir(appname="musicpom", appauthor="billypom"))
-            / "config.ini"
-        )
-        config.read(cfg_file)
         if db_name is None:
-            db_name = config.get("settings", "db")
-        self._conn: sqlite3.Connection = sqlite3.connect(db_name)
+            db_name = get_default_db_name()
+        self.db_name: str = db_name
+        self._conn: sqlite3.Connection = get_connection(db_name)
         self._cursor: sqlite3.Cursor = self._conn.cursor()
 
     def __enter__(self):
+        depths: dict[str, int] = _local.__dict__.setdefault("depths", {})
+        depths[self.db_name] = depths.get(self.db_name, 0) + 1
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
+        depths: dict[str, int] = _local.__dict__.setdefault("depths", {})
+        depths[self.db_name] -= 1
+        if depths[self.db_name] == 0:
+            # only the outermost block ends the transaction
+            self.close(commit=exc_type is None)
 
     @property
     def connection(self):
@@ -35,10 +110,16 @@ class DBAccess:
     def commit(self):
         self.connection.commit()
 
+    def rollback(self):
+        self.connection.rollback()
+
     def close(self, commit=True):
+        """Ends the transaction. The connection stays open for the next DBAccess on this thread"""
+        self.cursor.close()
         if commit:
             self.commit()
-        self.connection.close()
+        else:
+            self.rollback()
 
     def execute(self, sql, params):
         self.cursor.execute(sql, params or ())
@@ -55,3 +136,15 @@ class DBAccess:
     def query(self, sql, params):
         self.cursor.execute(sql, params or ())
         return self.fetchall()
+
+
+def transaction(db_name=None) -> DBAccess:
+    """
+    Batches many writes into one commit
+    ```
+    with DBA.transaction():
+        for song in songs:
+            add_song_to_playlist(song)  # uses its own `with DBA.DBAccess()`
+    ```
+    """
+    return DBAccess(db_name)
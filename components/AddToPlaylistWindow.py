@@ -58,17 +58,19 @@ class AddToPlaylistWindow(QDialog):
         selected_playlists_db_ids = [
             self.item_dict[item] for item in selected_playlists
         ]
-        for playlist in selected_playlists_db_ids:
-            for song in self.song_db_ids:
-                try:
-                    with DBA.DBAccess() as db:
-                        db.execute(
-                            "INSERT INTO song_playlist (playlist_id, song_id) VALUES (?, ?);",
-                            (playlist, song),
+        # one commit for all of them
+        with DBA.transaction():
+            for playlist in selected_playlists_db_ids:
+                for song in self.song_db_ids:
+                    try:
+                        with DBA.DBAccess() as db:
+                            db.execute(
+                                "INSERT INTO song_playlist (playlist_id, song_id) VALUES (?, ?);",
+                                (playlist, song),
+                            )
+                    except Exception as e:
+                        logging.error(
+                            f"AddToPlaylistWindow.py save() | could not insert song into playlist: {e}"
                         )
-                except Exception as e:
-                    logging.error(
-                        f"AddToPlaylistWindow.py save() | could not insert song into playlist: {e}"
-                    )
 
         self.close()
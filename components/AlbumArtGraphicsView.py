@@ -100,6 +100,14 @@ class AlbumArtGraphicsView(QGraphicsView):
     def load_album_art(self, album_art_data: bytes) -> None:
         """Displays the album art for the currently playing track in the GraphicsView"""
         if album_art_data:
+            # Create pixmap for album art
+            pixmap = QPixmap()
+            pixmap.loadFromData(album_art_data)
+            self.load_album_art_pixmap(pixmap)
+
+    def load_album_art_pixmap(self, pixmap: QPixmap) -> None:
+        """Displays already decoded album art (see utils/art_cache.py) in the GraphicsView"""
+        if not pixmap.isNull():
             # Clear the scene
             try:
                 self.album_art_scene.clear()
@@ -107,9 +115,6 @@ class AlbumArtGraphicsView(QGraphicsView):
                 pass
             # Reset the scene
             self.setScene(self.album_art_scene)
-            # Create pixmap for album art
-            pixmap = QPixmap()
-            pixmap.loadFromData(album_art_data)
             # Create a QGraphicsPixmapItem for more control over pic
             pixmap_item = QGraphicsPixmapItem(pixmap)
             pixmap_item.setTransformationMode(
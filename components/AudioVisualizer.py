@@ -1,15 +1,20 @@
-from PyQt5.QtCore import QTimer
-from PyQt5.QtMultimedia import QAudioProbe, QMediaPlayer
+import time
+from logging import debug
+from PyQt5.QtCore import QTimer, pyqtSignal
+from PyQt5.QtMultimedia import QAudioBuffer, QAudioFormat, QAudioProbe, QMediaPlayer
 import numpy as np
 from PyQt5 import QtWidgets
 from pyqtgraph.Qt.QtWidgets import QWidget
 from utils import FFTAnalyser
-from pyqtgraph import mkBrush
+from pyqtgraph import TextItem, mkBrush
 
 
 class AudioVisualizer(QtWidgets.QWidget):
     """Audio Visualizer component"""
 
+    # fps, ms per second spent updating the plot, gui thread cpu %
+    statsUpdated = pyqtSignal(float, float, float)
+
     def __init__(self, player, probe, PlotWidget):
         super().__init__()
         self.player: QMediaPlayer = player
@@ -19,24 +24,32 @@ class AudioVisualizer(QtWidgets.QWidget):
         self.fft_analyser = FFTAnalyser(self.player, self.x_resolution)
         self.fft_analyser.calculatedVisual.connect(self.set_amplitudes)
         self.fft_analyser.calculatedVisualRs.connect(self.set_rs)
+        self.fft_analyser.frequencyRangeChanged.connect(self.set_frequency_range)
         self.fft_analyser.start()
         self.amps = np.array([])
         self._plot_item = None
         self._x_data = np.arange(self.x_resolution)
+        # what's on screen, and the next frame - updated in place instead of making new arrays every tick
+        self._y_data = np.full(self.x_resolution, -96.0)
+        self._db_buffer = np.empty(self.x_resolution)
         self.use_decibels = True  # Set to True to use decibel scale
+        # don't redraw unless some band moved at least this many dB
+        self.redraw_threshold = 0.5
 
-        # Generate logarithmic frequency scale (20Hz - 20kHz)
-        self.min_freq = 20
-        self.max_freq = 23000
+        # Logarithmic frequency scale, the same as the analyser's bands -
+        # 20Hz up to the nyquist frequency of whatever it's analysing (11kHz decoded from the file, 22-24kHz probed)
+        self.min_freq, self.max_freq = self.fft_analyser.get_frequency_range()
         self.frequency_values = np.logspace(
             np.log10(self.min_freq), np.log10(self.max_freq), self.x_resolution
         )
 
         # Audio probe for processing audio signal in real time
-        self.probe.setSource(self.player)
+        # (not every platform's media backend supports probing)
+        self.probe_supported: bool = self.probe.setSource(self.player)
         self.probe.audioBufferProbed.connect(self.process_probe)
 
         self.is_playing = False
+        self.visible = True
         self.visualizer_timer = QTimer(self)
         self.visualizer_timer.setInterval(20)  # Update every 100ms (adjust as needed)
         self.visualizer_timer.timeout.connect(self.update_audio_visualization)
@@ -74,6 +87,26 @@ class AudioVisualizer(QtWidgets.QWidget):
         freq_ticks = self.get_frequency_ticks()
         self.PlotWidget.getAxis("bottom").setTicks([freq_ticks])
 
+        # The curve is made once, new frames just replace its data
+        self._plot_item = self.PlotWidget.plot(
+            self._x_data,
+            self._y_data,
+            pen="b",
+            fillLevel=-96 if self.use_decibels else 0,
+            fillBrush=mkBrush("b"),
+        )
+
+        # FPS / cpu counter - how much the visualizer costs the gui thread
+        self.show_stats = False
+        self._stats_text = TextItem(anchor=(1, 0))
+        self._stats_text.setPos(self.x_resolution, 0)
+        self._stats_text.setVisible(False)
+        self.PlotWidget.addItem(self._stats_text)
+        self._frames_drawn = 0
+        self._update_seconds = 0.0
+        self._stats_wall_time = time.perf_counter()
+        self._stats_thread_time = time.thread_time()
+
     def get_x_resolution(self):
         """Returns the resolution for the graphics plot"""
         return self.x_resolution
@@ -90,6 +123,9 @@ class AudioVisualizer(QtWidgets.QWidget):
         # Map frequencies to x-axis positions
         ticks = []
         for freq in standard_freqs:
+            if freq < self.min_freq * 0.95 or freq > self.max_freq * 1.05:
+                # off the end of the plot
+                continue
             # Find closest index to this frequency
             idx = np.argmin(np.abs(self.frequency_values - freq))
             # Format labels: Hz for <1000, kHz for >=1000
@@ -101,6 +137,15 @@ class AudioVisualizer(QtWidgets.QWidget):
 
         return ticks
 
+    def set_frequency_range(self, min_freq: float, max_freq: float) -> None:
+        """The analyser's bands moved (different sample rate) - lays the x axis out again"""
+        self.min_freq = min_freq
+        self.max_freq = max_freq
+        self.frequency_values = np.logspace(
+            np.log10(self.min_freq), np.log10(self.max_freq), self.x_resolution
+        )
+        self.PlotWidget.getAxis("bottom").setTicks([self.get_frequency_ticks()])
+
     def get_frequencies(self):
         """Return the frequency values for x-axis"""
         return self.frequency_values
@@ -118,13 +163,16 @@ class AudioVisualizer(QtWidgets.QWidget):
         For normalized amplitude values, this gives a range of approx -96dB to 0dB
         With a noise floor cutoff at around -96dB (for very small values)
         """
+        if self.amps.size != self._db_buffer.size:
+            return np.array([])
         # Avoid log(0) by adding a small epsilon
         epsilon = 1e-7
-        amplitudes = np.maximum(self.amps, epsilon)
+        db_values = np.maximum(self.amps, epsilon, out=self._db_buffer)
         # Convert to decibels (20*log10 is the standard formula for amplitude to dB)
-        db_values = 20 * np.log10(amplitudes)
+        np.log10(db_values, out=db_values)
+        db_values *= 20
         # Clip very low values to have a reasonable floor (e.g. -96dB)
-        db_values = np.maximum(db_values, -96)
+        np.maximum(db_values, -96, out=db_values)
         return db_values
 
     def set_rs(self, rs):
@@ -137,20 +185,71 @@ class AudioVisualizer(QtWidgets.QWidget):
         """
         # self.amps = np.maximum(np.array(amps), 1e-12)  # Set a very small threshold
         # print(self.amps)
-        self.amps = np.array(amps)
+        self.amps = np.asarray(amps)
 
 
+    def set_source(self, source: str) -> None:
+        """
+        Where the spectrum comes from
+        - "probe": the audio buffers the player outputs
+        - "file": the song file, decoded separately
+        - "auto": probe, if the platform supports it
+        """
+        use_probe = self.probe_supported and source in ("probe", "auto")
+        if source == "probe" and not self.probe_supported:
+            debug("AudioVisualizer | audio probe not supported here, decoding the file instead")
+        self.fft_analyser.set_probe_mode(use_probe)
+
+    def get_probe_samples(self, buff: QAudioBuffer) -> tuple[np.ndarray, int, float] | None:
+        """
+        Mono samples from a probed buffer, its sample rate, and full scale for its sample format
+        The buffer's memory is read in place with np.frombuffer, only the mix down to mono copies
+        """
+        audio_format = buff.format()
+        sample_type = audio_format.sampleType()
+        sample_bytes = audio_format.sampleSize() // 8
+        channels = audio_format.channelCount()
+        if sample_type == QAudioFormat.SampleType.Float and sample_bytes in (4, 8):
+            kind = "f"
+            full_scale = 1.0
+        elif sample_type == QAudioFormat.SampleType.SignedInt and sample_bytes in (1, 2, 4):
+            kind = "i"
+            full_scale = float(2 ** (sample_bytes * 8 - 1))
+        elif sample_type == QAudioFormat.SampleType.UnSignedInt and sample_bytes in (1, 2, 4):
+            kind = "u"
+            full_scale = float(2 ** (sample_bytes * 8 - 1))
+        else:
+            return None
+        if channels < 1 or buff.byteCount() < sample_bytes * channels:
+            return None
+        endian = "<" if audio_format.byteOrder() == QAudioFormat.Endian.LittleEndian else ">"
+        data = buff.constData()
+        data.setsize(buff.byteCount())
+        samples = np.frombuffer(data, dtype=np.dtype(f"{endian}{kind}{sample_bytes}"))
+        samples = samples[: samples.size - samples.size % channels].reshape(-1, channels)
+        mono = samples.mean(axis=1, dtype=np.float32)
+        if kind == "u":
+            # unsigned samples sit around the middle of their range, not 0
+            mono -= full_scale
+        return mono, audio_format.sampleRate(), full_scale
+
     def process_probe(self, buff):
         """Audio visualizer buffer processing"""
         # buff.startTime() # what is this? why need? dont need...
         self.is_playing = True
 
+        if self.fft_analyser.use_probe:
+            probed = self.get_probe_samples(buff)
+            if probed is not None:
+                self.fft_analyser.feed_samples(*probed)
+
         # If music is playing, reset the timer
-        if not self.visualizer_timer.isActive():
+        if self.visible and not self.visualizer_timer.isActive():
             self.visualizer_timer.start()
 
     def update_audio_visualization(self):
         """Update the visualization for audio signal"""
+        start = time.perf_counter()
         if not self.is_playing:
             # If music stopped, continue updating visualizer for a few seconds
             self.visualizer_timer.stop()  # Stop the timer once it's done
@@ -161,23 +260,56 @@ class AudioVisualizer(QtWidgets.QWidget):
         if len(y) == 0:
             return
 
-        # Clear the previous plot
-        self.PlotWidget.clear()
+        # Only redraw if the change would be visible
+        if np.abs(y - self._y_data).max() >= self.redraw_threshold:
+            self._y_data[:] = y
+            self._plot_item.setData(self._x_data, self._y_data)
+            self._frames_drawn += 1
 
-        # Plot new values
-        self._plot_item = self.PlotWidget.plot(
-            self._x_data,
-            y,
-            pen="b",
-            fillLevel=-96 if self.use_decibels else 0,
-            fillBrush=mkBrush("b"),
-        )
-
-        # If the visualizer is done, stop updating
-        if all(val == -96 for val in y):
+        # If the visualizer is done, stop updating (everything is clipped to -96 at the lowest)
+        if y.max() <= -96:
             self.is_playing = False
             self.visualizer_timer.stop()
 
+        self._update_seconds += time.perf_counter() - start
+        self.update_stats()
+
+    def set_visible(self, visible: bool) -> None:
+        """
+        Pauses the visualizer while it can't be seen (window minimized or hidden)
+        Both the analyser thread and the redraw timer stop, until it's visible again
+        """
+        self.visible = visible
+        self.fft_analyser.set_visible(visible)
+        if not visible:
+            self.visualizer_timer.stop()
+        elif self.is_playing:
+            self.visualizer_timer.start()
+
+    def set_show_stats(self, show: bool) -> None:
+        """Shows or hides the fps / cpu counter in the corner of the plot"""
+        self.show_stats = show
+        self._stats_text.setVisible(show)
+
+    def update_stats(self) -> None:
+        """Works out fps & cpu use about once a second, and emits them (and shows them, if turned on)"""
+        now = time.perf_counter()
+        elapsed = now - self._stats_wall_time
+        if elapsed < 1:
+            return
+        thread_time = time.thread_time()
+        fps = self._frames_drawn / elapsed
+        update_ms = self._update_seconds * 1000 / elapsed
+        # the whole gui thread, including the repaints the new data causes
+        cpu_percent = (thread_time - self._stats_thread_time) * 100 / elapsed
+        self._frames_drawn = 0
+        self._update_seconds = 0.0
+        self._stats_wall_time = now
+        self._stats_thread_time = thread_time
+        self.statsUpdated.emit(fps, update_ms, cpu_percent)
+        if self.show_stats:
+            self._stats_text.setText(f"{fps:.0f} fps | {update_ms:.1f} ms/s | gui cpu {cpu_percent:.0f}%")
+
     def clear_audio_visualization(self) -> None:
-        self.PlotWidget.clear()
-        self._plot_item = None
+        self._y_data[:] = -96
+        self._plot_item.setData(self._x_data, self._y_data)
@@ -0,0 +1,72 @@
+from PyQt5.QtWidgets import (
+    QAbstractItemView,
+    QDialog,
+    QHeaderView,
+    QLabel,
+    QPushButton,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+)
+from utils.job_scheduler import CANCELLING, Job, JobScheduler
+
+
+class JobsWindow(QDialog):
+    def __init__(self, job_scheduler: JobScheduler):
+        """
+        Shows what's running & queued on the JobScheduler, with a button to cancel each one
+        Not modal - it keeps itself up to date while it's showing. Make one and show it again, don't make more
+        """
+        super(JobsWindow, self).__init__()
+        self.setWindowTitle("Jobs")
+        self.setMinimumSize(600, 250)
+        self.job_scheduler: JobScheduler = job_scheduler
+        layout = QVBoxLayout()
+        self.empty_label: QLabel = QLabel("Nothing running")
+        layout.addWidget(self.empty_label)
+        # | Scanning libraries | running | Scanning library: 1,234 | 250/s | ... | Cancel |
+        self.table: QTableWidget = QTableWidget()
+        self.table.setColumnCount(4)
+        self.table.setHorizontalHeaderLabels(["Job", "State", "Progress", ""])
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+        # (job, state) for every row in the table
+        self.rows: list[tuple[Job, str]] = []
+        self.job_scheduler.jobsChanged.connect(self.load_jobs)
+        self.load_jobs()
+
+    def load_jobs(self) -> None:
+        """Fills the table from the scheduler - running jobs first, then queued"""
+        if not self.isVisible():
+            # caught up in showEvent
+            return
+        jobs = self.job_scheduler.get_titled_jobs()
+        rows = [(job, job.state) for job in jobs]
+        if rows == self.rows:
+            # only progress changed - don't swap the buttons out from under the mouse
+            for i, job in enumerate(jobs):
+                self.table.item(i, 2).setText(str(job.progress) if job.progress else "")
+            return
+        self.rows = rows
+        self.empty_label.setVisible(not jobs)
+        self.table.setRowCount(len(jobs))
+        for i, job in enumerate(jobs):
+            self.table.setItem(i, 0, QTableWidgetItem(job.title))
+            self.table.setItem(i, 1, QTableWidgetItem(job.state))
+            self.table.setItem(i, 2, QTableWidgetItem(str(job.progress) if job.progress else ""))
+            button = QPushButton("Cancel")
+            button.setEnabled(job.state != CANCELLING)
+            button.clicked.connect(lambda _, job=job: self.cancel_job(job))
+            self.table.setCellWidget(i, 3, button)
+
+    def cancel_job(self, job: Job) -> None:
+        self.job_scheduler.cancel(job)
+
+    def showEvent(self, a0) -> None:
+        super().showEvent(a0)
+        self.load_jobs()
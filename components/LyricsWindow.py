@@ -1,3 +1,4 @@
+import DBA
 from PyQt5.QtWidgets import (
     QDialog,
     QPlainTextEdit,
@@ -34,11 +35,17 @@ class LyricsWindow(QDialog):
         """Saves the current lyrics text to the USLT/lyrics ID3 tag"""
         success = set_tag(
             filepath=self.song_filepath,
-            tag_name="lyrics",
+            db_column="lyrics",
             value=self.input_field.toPlainText(),
         )
         if success:
             debug("lyrical success! yay")
+            # keep the search index up to date
+            with DBA.DBAccess() as db:
+                db.execute(
+                    "UPDATE song SET lyrics = ? WHERE filepath = ?;",
+                    (self.input_field.toPlainText(), self.song_filepath),
+                )
         else:
             error_dialog = ErrorDialog("Could not save lyrics :( sad")
             error_dialog.exec()
@@ -16,6 +16,10 @@ class MediaPlayer(QMediaPlayer):
 
     def on_media_status_changed(self, status):
         if status == QMediaPlayer.MediaStatus.EndOfMedia:
+            playlist = self.playlist()
+            if playlist is not None and playlist.nextIndex() != -1:
+                # next song is already queued up, the player moves on to it by itself
+                return
             print("Song ended, triggering custom function!")
             self.on_song_ended()
 
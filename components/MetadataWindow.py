@@ -9,8 +9,11 @@ from PyQt5.QtWidgets import (
     QPushButton,
 )
 from PyQt5.QtGui import QFont
+from mutagen import FileType
+from mutagen.id3 import ID3
 from components.ErrorDialog import ErrorDialog
 from utils import set_tag, get_tags, update_song_in_database
+from utils.get_tags import easy_keys
 # import re
 
 
@@ -70,6 +73,7 @@ class MetadataWindow(QDialog):
                     QMessageBox.Ok,
                 )
                 return
+            tags = song_data.tags if isinstance(song_data, FileType) else song_data
             for key in self.headers.db_list:
                 if key not in self.headers.get_editable_db_list():
                     continue
@@ -81,7 +85,11 @@ class MetadataWindow(QDialog):
                         # If a tag doesn't exist in our dict, create an empty list
                         tag_sets[tag] = []
                     try:
-                        tag_sets[tag].append(song_data[tag].text[0])
+                        if isinstance(tags, ID3):
+                            tag_sets[tag].append(tags[tag].text[0])
+                        else:
+                            # flac, ogg, m4a...
+                            tag_sets[tag].append(tags[easy_keys[key]][0])
                     except KeyError:
                         pass
 
@@ -130,7 +138,7 @@ class MetadataWindow(QDialog):
                         # Update the ID3 tag if the tag is not blank,
                         #   and has been edited
                         success = set_tag(
-                            filepath=song[0], db_column=tag, value=field.text()
+                            filepath=song[0], db_column=self.headers.frame_id[tag].db, value=field.text()
                         )
                         if success:
                             update_song_in_database(
@@ -5,8 +5,6 @@ from PyQt5.QtGui import (
     QFont,
     QPainter,
     QPen,
-    QStandardItem,
-    QStandardItemModel,
     QKeySequence,
     QDragEnterEvent,
     QDropEvent,
@@ -36,22 +34,25 @@ from components.AddToPlaylistWindow import AddToPlaylistWindow
 from components.MetadataWindow import MetadataWindow
 from components.QuestionBoxDetails import QuestionBoxDetails
 from components.HeaderTags import HeaderTags2
+from components.SongTableModel import SongTableModel
 
 from utils import (
     batch_delete_filepaths_from_database,
     batch_delete_filepaths_from_playlist,
     add_files_to_database,
-    get_reorganize_vars,
+    reorganize_files,
     update_song_in_database,
     id3_remap,
     get_tags,
     set_tag,
+    AudioFileWalker,
     Worker
 )
+from utils.fts_match_query import fts_match_query, fts_weights
+from collections.abc import Iterable, Iterator
 from subprocess import Popen
 from logging import debug, error
 import os
-import shutil
 import typing
 from pathlib import Path
 from appdirs import user_config_dir
@@ -67,6 +68,7 @@ class MusicTable(QTableView):
     deleteKey: pyqtSignal = pyqtSignal()
     refreshMusicTableSignal: pyqtSignal = pyqtSignal()
     handleProgressSignal: pyqtSignal = pyqtSignal(str)
+    handleProgressUpdateSignal: pyqtSignal = pyqtSignal(object)
     getThreadPoolSignal: pyqtSignal = pyqtSignal()
     searchBoxSignal: pyqtSignal = pyqtSignal()
     focusEnterSignal: pyqtSignal = pyqtSignal()
@@ -89,22 +91,32 @@ class MusicTable(QTableView):
         self.setFont(font)
 
         # NOTE:
-        # QTableView model2 = QSortFilterProxyModel(QStandardItemModel)
+        # QTableView model2 = QSortFilterProxyModel(SongTableModel)
         #
         # wtf is actually going on here with the models?
-        # Create QStandardItemModel
+        # Create SongTableModel
         # Create QSortFilterProxyModel
-        # Set QSortFilterProxyModel source to QStandardItemModel
+        # Set QSortFilterProxyModel source to SongTableModel
         # Set QTableView model to the Proxy model
         # so it looks like the above note, i guess
 
-        # need a QStandardItemModel to load data & do actions on cells
-        self.model2: QStandardItemModel = QStandardItemModel()
+        # need a SongTableModel to load data & do actions on cells
+        self.headers = HeaderTags2()
+        self.model2: SongTableModel = SongTableModel(self.headers)
         self.proxymodel: QSortFilterProxyModel = QSortFilterProxyModel()
         self.data_cache = {}
         self.playlist_scroll_positions: dict[int | None, int] = {}
         self.search_string: str | None = None
-        self.headers = HeaderTags2()
+        # filter the loaded rows in memory while typing, instead of searching the database
+        self.instant_search: bool = self.config.getboolean("settings", "instant_search", fallback=True)
+        # whether the current search goes to the database - see `set_search_string()`
+        self.search_in_database: bool = not self.instant_search
+        # whether the loaded rows are database search results, rather than the whole list
+        self.searched_database: bool = False
+        # instant search text that matched none of the loaded songs
+        self.unmatched_search: str | None = None
+        # whether the database has the song_fts search index, checked on the first search
+        self.has_search_index: bool | None = None
         self.selected_song_filepath = ""
         self.selected_song_qmodel_index: QModelIndex
         self.current_song_filepath = ""
@@ -117,7 +129,9 @@ class MusicTable(QTableView):
         self.proxymodel.setSourceModel(self.model2)
         self.proxymodel.setSortCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
         self.setModel(self.proxymodel)
-        self.setSortingEnabled(True)
+        # rows come out of the database already sorted (see get_order_by_clause),
+        # so the proxy never sorts - clicking a header reloads with a new ORDER BY
+        self.setSortingEnabled(False)
 
         # Properties
         self.setAcceptDrops(True)
@@ -131,6 +145,8 @@ class MusicTable(QTableView):
         self.horizontal_header: QHeaderView = self.horizontalHeader()
         assert self.horizontal_header is not None  # i hate look at linting errors
         self.horizontal_header.setSectionResizeMode(QHeaderView.Interactive)
+        self.horizontal_header.setSectionsClickable(True)
+        self.horizontal_header.setSortIndicatorShown(True)
         self.horizontal_header.sortIndicatorChanged.connect(self.on_user_sort_change)
         self.horizontal_header.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.horizontal_header.customContextMenuRequested.connect(self.show_header_context_menu)
@@ -289,13 +305,8 @@ class MusicTable(QTableView):
                         files.append(path)
             e.accept()
             if directories:
-                worker = Worker(self.get_audio_files_recursively, directories)
-                _ = worker.signals.signal_progress.connect(self.handle_progress)
-                _ = worker.signals.signal_result.connect(self.on_get_audio_files_recursively_finished)
-                _ = worker.signals.signal_finished.connect(self.load_music_table)
-                if self.qapp:
-                    threadpool = self.qapp.threadpool # type: ignore
-                    threadpool.start(worker)
+                # walked on the worker thread as the songs are added, see scan_pipeline.py
+                self.add_files_to_library(self.get_audio_files_recursively(directories))
             if files:
                 self.add_files_to_library(files)
         else:
@@ -387,7 +398,7 @@ class MusicTable(QTableView):
                 direction = Qt.SortOrder.AscendingOrder if dir_str == "1" else Qt.SortOrder.DescendingOrder
                 sort_list.append((field, direction))
 
-        # Update or insert the new sort field at the end (highest priority)
+        # Update or insert the new sort field at the end (primary sort)
         sort_list = [(f, d) for f, d in sort_list if f != db_field]  # remove if exists
         sort_list.append((db_field, order))  # add with latest order
 
@@ -414,7 +425,6 @@ class MusicTable(QTableView):
 
     def on_cell_data_changed(self, topLeft: QModelIndex, bottomRight: QModelIndex):
         """Handles updating ID3 tags when data changes in a cell"""
-        # if isinstance(self.model2, QStandardItemModel):
         # debug("on_cell_data_changed")
         # get the ID of the row that was edited
         id_index = self.model2.index(topLeft.row(), 0)
@@ -442,10 +452,9 @@ class MusicTable(QTableView):
         """Emits data to main"""
         self.handleProgressSignal.emit(data)
 
-    def on_get_audio_files_recursively_finished(self, result: list[str]):
-        """file search completion handler"""
-        if result:
-            self.add_files_to_library(result)
+    def handle_progress_update(self, progress: object):
+        """Emits structured progress (utils.Progress) to main"""
+        self.handleProgressUpdateSignal.emit(progress)
 
     def on_add_files_to_database_finished(self, *args):
         """
@@ -495,14 +504,20 @@ class MusicTable(QTableView):
         Clears all stored sort orders and refreshes the table view.
         """
         self.config["table"]["sort_order"] = ""
-        with open(self.config_path, "w") as f:
+        # otherwise get_sort_config() falls back to the per column sort_orders
+        self.config["table"]["sort_orders"] = ",".join("0" for _ in self.headers.db_list)
+        with open(self.cfg_file, "w") as f:
             self.config.write(f)
-        # Clear sort visually
-        self.horizontal_header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
-        # Reload data if necessary, or just reapply sorting
+        # Reload in database order, load_music_table() clears the sort arrow
         self.sort_by_logical_fields()
 
     def find_qmodel_index_by_value(self, model, column: int, value) -> QModelIndex:
+        if model is self.proxymodel:
+            # look it up in the source model's column list instead of asking every row for its data
+            row = self.model2.find_row(column, value)
+            if row is None:
+                return QModelIndex()
+            return self.proxymodel.mapFromSource(self.model2.index(row, column))
         for row in range(model.rowCount()):
             index = model.index(row, column)
             if index.data() == value:
@@ -573,7 +588,7 @@ class MusicTable(QTableView):
         self.set_current_song_filepath()
         self.playSignal.emit(self.current_song_filepath)
 
-    def add_files_to_library(self, files: list[str]) -> None:
+    def add_files_to_library(self, files: Iterable[str]) -> None:
         """
         Spawns a worker thread - adds a list of filepaths to the library
 
@@ -583,11 +598,11 @@ class MusicTable(QTableView):
         # debug('add_files_to_library()')
         worker = Worker(add_files_to_database, files, None)
         _ = worker.signals.signal_progress.connect(self.qapp.handle_progress) # type: ignore
+        _ = worker.signals.signal_progress_update.connect(self.handle_progress_update)
         _ = worker.signals.signal_result.connect(self.on_add_files_to_database_finished)
         _ = worker.signals.signal_finished.connect(self.load_music_table)
         if self.qapp:
-            threadpool = self.qapp.threadpool # type: ignore
-            threadpool.start(worker)
+            self.qapp.job_scheduler.submit(worker, "Adding songs") # type: ignore
         else:
             error("Application window could not be found")
 
@@ -613,10 +628,10 @@ class MusicTable(QTableView):
             if reply:
                 worker = Worker(batch_delete_filepaths_from_playlist, selected_filepaths, self.selected_playlist_id)
                 worker.signals.signal_progress.connect(self.qapp.handle_progress) # type: ignore
+                worker.signals.signal_progress_update.connect(self.handle_progress_update)
                 worker.signals.signal_finished.connect(self.delete_selected_row_indices)
                 if self.qapp:
-                    threadpool = self.qapp.threadpool # type: ignore
-                    threadpool.start(worker)
+                    self.qapp.job_scheduler.submit(worker, "Removing songs from playlist") # type: ignore
         else:
             question_dialog = QuestionBoxDetails(
                 title="Delete songs",
@@ -627,10 +642,10 @@ class MusicTable(QTableView):
             if reply:
                 worker = Worker(batch_delete_filepaths_from_database, selected_filepaths)
                 worker.signals.signal_progress.connect(self.qapp.handle_progress) # type: ignore
+                worker.signals.signal_progress_update.connect(self.handle_progress_update)
                 worker.signals.signal_finished.connect(self.delete_selected_row_indices)
                 if self.qapp:
-                    threadpool = self.qapp.threadpool # type: ignore
-                    threadpool.start(worker)
+                    self.qapp.job_scheduler.submit(worker, "Deleting songs") # type: ignore
 
     # def delete_selected_row_indices(self):
     #     """
@@ -758,51 +773,29 @@ class MusicTable(QTableView):
         if reply == QMessageBox.Yes:
             worker = Worker(self.reorganize_files, filepaths)
             worker.signals.signal_progress.connect(self.handle_progress)
+            worker.signals.signal_progress_update.connect(self.handle_progress_update)
+            worker.signals.signal_result.connect(self.on_reorganize_files_finished)
             worker.signals.signal_finished.connect(self.load_music_table)
-            self.qapp.threadpool.start(worker) # type: ignore
+            job = self.qapp.job_scheduler.submit(worker, "Reorganizing files", key="reorganize_files") # type: ignore
+            if job is None:
+                QMessageBox.information(self, "Reorganize", "Files are already being reorganized")
 
-    def reorganize_files(self, filepaths, progress_callback=None):
+    def reorganize_files(self, filepaths, progress_callback=None, cancel_token=None):
         """
         Reorganizes files into Artist/Album/Song,
         based on self.config['settings'][reorganize_destination']
         """
         debug("reorganizing files")
-        # FIXME: batch update, instead of doing 1 file at a time
-        # DBAccess is being instantiated for every file, boo
-        # NOTE:
-        # is that even possible with move file function?
-        # FIXME: change reorganize location in config, try to reorganize, failed - old reference
-
         # Get target directory
         target_dir = str(self.config["settings"]["reorganize_destination"])
-        for filepath in filepaths:
-            # Read file metadata
-            artist, album = get_reorganize_vars(filepath)
-            # Determine the new path that needs to be made
-            new_path = os.path.join(target_dir, artist, album, os.path.basename(filepath))
-            # Need to determine if filepath is equal
-            if new_path == filepath:
-                continue
-            try:
-                if progress_callback:
-                    progress_callback.emit(f"Organizing: {filepath}")
-                # Create the directories if they dont exist
-                os.makedirs(os.path.dirname(new_path), exist_ok=True)
-                # Move the file to the new directory
-                shutil.move(filepath, new_path)
-                # Update the db
-                with DBA.DBAccess() as db:
-                    db.query(
-                        "UPDATE song SET filepath = ? WHERE filepath = ?",
-                        (new_path, filepath),
-                    )
-                # debug(f"reorganize_files() | Moved: {filepath} -> {new_path}")
-            except Exception as e:
-                error(f"reorganize_files() | Error moving file: {filepath} | {e}")
-        # Draw the rest of the owl
-        # QMessageBox.information(
-        #     self, "Reorganization complete", "Files successfully reorganized"
-        # )
+        return reorganize_files(filepaths, target_dir, progress_callback=progress_callback, cancel_token=cancel_token)
+
+    def on_reorganize_files_finished(self, result: tuple[bool, dict[str, str]]):
+        """Shows files that couldn't be moved"""
+        _, details = result
+        if details:
+            window = DebugWindow(details)
+            window.exec_()
 
     def toggle_play_pause(self):
         """Toggles the currently playing song by emitting a Signal"""
@@ -823,15 +816,9 @@ class MusicTable(QTableView):
             if self.selected_playlist_id == playlist_id[0]:
                 # Don't reload if we clicked the same item
                 return
-        self.model2.clear()
-        self.model2.setHorizontalHeaderLabels(self.headers.db_list)
-        fields = ", ".join(self.headers.db_list)
-        search_clause = (
-            "title LIKE ? OR artist LIKE ? OR album LIKE ?"
-            if self.search_string
-            else ""
-        )
-        params = ""
+        fields = ", ".join(f"song.{field}" for field in self.headers.db_list)
+        search_join, search_clause, params, rank = self.get_search_query()
+        self.searched_database = bool(search_clause)
         is_playlist = 0
         if len(playlist_id) > 0:
             if playlist_id[0] == 0:
@@ -851,23 +838,18 @@ class MusicTable(QTableView):
         #     debug('loaded table from cache')
         # except KeyError:
         #     # Query for a playlist
+        # sorting happens in the ORDER BY, once, instead of re-sorting the proxy per column
+        # search results are ranked, the sort config only breaks ties
+        order_by = self.get_order_by_clause(*rank)
         if is_playlist:
             try:
                 with DBA.DBAccess() as db:
-                    query = f"SELECT id, {
-                        fields} FROM song JOIN song_playlist sp ON id = sp.song_id WHERE sp.playlist_id = ?"
+                    query = f"SELECT song.id, {
+                        fields} FROM song JOIN song_playlist sp ON song.id = sp.song_id{search_join} WHERE sp.playlist_id = ?"
                     # fulltext search
-                    if self.search_string:
-                        # params = 3 * [self.search_string]
-                        params = ["%" + self.search_string + "%"] * 3
-                        if query.find("WHERE") == -1:
-                            query = f"{query} WHERE {search_clause};"
-                        else:
-                            query = f"{query} AND {search_clause};"
-                        data = db.query(
-                            query, (self.selected_playlist_id, params))
-                    else:
-                        data = db.query(query, (self.selected_playlist_id,))
+                    if search_clause:
+                        query = f"{query} AND {search_clause}"
+                    data = db.query(f"{query}{order_by};", (self.selected_playlist_id, *params))
 
             except Exception as e:
                 error(f"load_music_table() | Unhandled exception 1: {e}")
@@ -876,16 +858,12 @@ class MusicTable(QTableView):
         else:
             try:
                 with DBA.DBAccess() as db:
-                    query = f"SELECT id, {fields} FROM song"
+                    query = f"SELECT song.id, {fields} FROM song{search_join}"
                     # fulltext search
-                    if self.search_string:
-                        params = ["%" + self.search_string + "%"] * 3
-                        if query.find("WHERE") == -1:
-                            query = f"{query} WHERE {search_clause};"
-                        else:
-                            query = f"{query} AND {search_clause};"
+                    if search_clause:
+                        query = f"{query} WHERE {search_clause}"
                     data = db.query(
-                        query,
+                        f"{query}{order_by};",
                         (params),
                     )
             except Exception as e:
@@ -894,7 +872,9 @@ class MusicTable(QTableView):
         # cache the data
         # self.data_cache[self.selected_playlist_id] = data
         self.populate_model(data)
-        self.sort_table_by_multiple_columns()
+        if not self.search_in_database and self.search_string:
+            self.model2.filter_rows(self.search_string)
+        self.show_sort_indicator()
         self.current_playlist_id = self.selected_playlist_id
         self.model2.layoutChanged.emit()  # emits a signal that the view should be updated
         db_name: str = self.config.get("settings", "db").split("/").pop()
@@ -920,56 +900,71 @@ class MusicTable(QTableView):
         """
         populate the model2 with data... or whatever
         """
-        for row_data in data:
-            id, *rest_of_data = row_data
-            # handle different datatypes
-            items = []
-            for item in rest_of_data:
-                if isinstance(item, int):
-                    std_item = QStandardItem()
-                    std_item.setData(item, Qt.ItemDataRole.DisplayRole)
-                    std_item.setData(item, Qt.ItemDataRole.EditRole)
-                else:
-                    std_item = QStandardItem(str(item) if item else "")
-                items.append(std_item)
-            # store database id in the row object using setData
-            # - useful for fast db fetching and other model operations
-            for item in items:
-                item.setData(id, Qt.ItemDataRole.UserRole)
-            self.model2.appendRow(items)
+        self.model2.set_rows(data)
         self.proxymodel.setSourceModel(self.model2)
         self.setModel(self.proxymodel)
 
+    def apply_library_changes(self, changes: dict[str, list]) -> None:
+        """
+        Applies changes found by the LibraryWatcher to the rows already in the table,
+        instead of reloading the whole table
+
+        changes: {"added": [song ids], "updated": [song ids], "removed": [song ids]}
+        """
+        if self.searched_database:
+            # search results could gain or lose rows, let the db sort it out
+            self.load_music_table()
+            return
+        added: list[int] = changes["added"] if not self.selected_playlist_id else []
+        updated: list[int] = changes["updated"]
+        removed: set[int] = set(changes["removed"])
+        fields = ", ".join(self.headers.db_list)
+        ids = added + [id for id in updated if self.model2.row_for_id(id) is not None]
+        data = []
+        try:
+            with DBA.DBAccess() as db:
+                for i in range(0, len(ids), 900):
+                    chunk = ids[i : i + 900]
+                    placeholders = ", ".join("?" for _ in chunk)
+                    data.extend(db.query(f"SELECT id, {fields} FROM song WHERE id IN ({placeholders});", chunk))
+        except Exception as e:
+            error(f"apply_library_changes() | could not load changed songs: {e}")
+            return
+        # editing cells writes ID3 tags, don't do that for changes that came from disk
+        self.disconnect_data_changed()
+        self.model2.remove_ids(removed)
+        new_rows = []
+        for row_data in data:
+            row = self.model2.row_for_id(row_data[0])
+            if row is None:
+                new_rows.append(row_data)
+            else:
+                self.model2.update_row(row, row_data)
+        self.model2.append_rows(new_rows)
+        self.connect_data_changed()
+        db_name: str = self.config.get("settings", "db").split("/").pop()
+        db_filename = self.config.get("settings", "db")
+        self.playlistStatsSignal.emit(f"Songs: {self.model2.rowCount()} | {db_name} | {db_filename}")
+
     def sort_table_by_multiple_columns(self):
         """
         Sorts the data in QTableView (self) by multiple columns
         as defined in config.ini
+
+        The sort is one ORDER BY in `load_music_table()`, so this just reloads whatever is showing
         """
-        self.horizontal_header.sortIndicatorChanged.disconnect()
-        sort_orders = []
-        config_sort_orders: list[int] = [
-            int(x) for x in self.config["table"]["sort_orders"].split(",")
-        ]
-        for order in config_sort_orders:
-            if order == 0:
-                sort_orders.append(None)
-            elif order == 1:
-                sort_orders.append(Qt.SortOrder.AscendingOrder)
-            elif order == 2:
-                sort_orders.append(Qt.SortOrder.DescendingOrder)
-        # QTableView sorts need to happen in reverse order
-        # The primary sort column is the last column sorted.
-        for i in reversed(range(len(sort_orders))):
-            if sort_orders[i] is not None:
-                debug(f"sorting column {i} by {sort_orders[i]}")
-                self.sortByColumn(i, sort_orders[i])
-                # WARNING:
-                # sortByColumn calls a SELECT statement,
-                # and will do this for as many sorts that are needed
-                # maybe not a huge deal for a small music application...?
-                # `len(config_sort_orders)` number of SELECTs
+        self.reload_music_table()
         self.on_sort()
-        self.model2.layoutChanged.emit()
+
+    def reload_music_table(self):
+        """Reloads the library or playlist that is currently showing"""
+        playlist_id = self.selected_playlist_id
+        # load_music_table() skips reloading the playlist that is already selected
+        self.selected_playlist_id = None
+        if playlist_id:
+            self.load_music_table(playlist_id)
+        else:
+            self.load_music_table()
 
     def save_sort_config(self, fields: list[tuple[str, Qt.SortOrder]]):
         """
@@ -978,17 +973,31 @@ class MusicTable(QTableView):
         """
         raw = ",".join(f"{field}:{1 if order == Qt.SortOrder.AscendingOrder else 2}" for field, order in fields)
         self.config["table"]["sort_order"] = raw
-        with open(self.config_path, "w") as f:
+        with open(self.cfg_file, "w") as f:
             self.config.write(f)
 
     def get_sort_config(self) -> list[tuple[int, Qt.SortOrder]]:
         """
         Returns a list of (column_index, Qt.SortOrder) tuples based on config and headers
+        The primary sort comes first
+
+        - `sort_order` (set by clicking headers): "field:1,field:2", the last field clicked is the primary sort
+        - otherwise `sort_orders`: one 0/1/2 per column, the leftmost sorted column is the primary sort
         """
         sort_config = []
         raw_sort = self.config["table"].get("sort_order", "")
         if not raw_sort:
-            return []
+            try:
+                config_sort_orders = [int(x) for x in self.config["table"].get("sort_orders", "").split(",") if x.strip()]
+            except ValueError as e:
+                error(f"Failed to parse sort_orders: {e}")
+                return []
+            for col_index, order in enumerate(config_sort_orders[: len(self.headers.db_list)]):
+                if order == 1:
+                    sort_config.append((col_index, Qt.SortOrder.AscendingOrder))
+                elif order == 2:
+                    sort_config.append((col_index, Qt.SortOrder.DescendingOrder))
+            return sort_config
 
         try:
             sort_fields = [x.strip() for x in raw_sort.split(",")]
@@ -1005,35 +1014,82 @@ class MusicTable(QTableView):
                     sort_config.append((col_index, order))
         except Exception as e:
             error(f"Failed to parse sort config: {e}")
+        # last clicked = primary sort
+        sort_config.reverse()
         return sort_config
 
-    def sort_by_logical_fields(self):
+    def get_order_by_clause(self, *leading_terms: str) -> str:
         """
-        Sorts the table using logical field names defined in config.
+        Compiles the sort config into an ORDER BY clause for `load_music_table()`
+        Text sorts case-insensitively, like the proxy model used to
+
+        leading_terms: sorted by before the sort config, e.g. search rank
+        """
+        terms = list(leading_terms)
+        for col_index, order in self.get_sort_config():
+            direction = "ASC" if order == Qt.SortOrder.AscendingOrder else "DESC"
+            terms.append(f"song.{self.headers.db_list[col_index]} COLLATE NOCASE {direction}")
+        if not terms:
+            return ""
+        return " ORDER BY " + ", ".join(terms)
+
+    def get_search_query(self) -> tuple[str, str, list[str], list[str]]:
         """
-        self.horizontal_header.sortIndicatorChanged.disconnect()  # Prevent feedback loop
+        Turns self.search_string into pieces of SQL for `load_music_table()`
+        Returns a tuple of (join, where clause, params, order by terms) - all empty when not searching
 
-        sort_config = self.get_sort_config()
+        Uses the song_fts full text search index (ranked, prefix matching).
+        Databases without it (sqlite built without FTS5) get a LIKE search on title, artist & album
+        """
+        if not self.search_in_database or not self.search_string or not self.search_string.strip():
+            # instant search filters after loading, see `filter_music_table()`
+            return "", "", [], []
+        if self.has_search_index is None:
+            with DBA.DBAccess() as db:
+                self.has_search_index = bool(
+                    db.query("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'song_fts';", ())
+                )
+        if not self.has_search_index:
+            return (
+                "",
+                "(song.title LIKE ? OR song.artist LIKE ? OR song.album LIKE ?)",
+                ["%" + self.search_string + "%"] * 3,
+                [],
+            )
+        match_query = fts_match_query(self.search_string)
+        if not match_query:
+            return "", "", [], []
+        weights = ", ".join(str(weight) for weight in fts_weights)
+        return (
+            " JOIN song_fts ON song_fts.rowid = song.id",
+            "song_fts MATCH ?",
+            [match_query],
+            [f"bm25(song_fts, {weights})"],
+        )
 
-        # Sort in reverse order (primary sort last)
-        for col_index, order in reversed(sort_config):
-            self.sortByColumn(col_index, order)
+    def show_sort_indicator(self):
+        """Points the header sort arrow at the primary sort column, without sorting anything"""
+        sort_config = self.get_sort_config()
+        self.horizontal_header.blockSignals(True)
+        if sort_config:
+            self.horizontal_header.setSortIndicator(*sort_config[0])
+        else:
+            self.horizontal_header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.horizontal_header.blockSignals(False)
 
-        self.model2.layoutChanged.emit()
+    def sort_by_logical_fields(self):
+        """
+        Sorts the table using logical field names defined in config.
+        """
+        self.reload_music_table()
         self.on_sort()
 
-    def get_audio_files_recursively(self, directories: list[str], progress_callback=None) -> list[str]:
-        """Scans a directories for files"""
-        extensions = self.config.get("settings", "extensions").split(",")
-        audio_files: list[str] = []
-        for directory in directories:
-            for root, _, files in os.walk(directory):
-                for file in files:
-                    if any(file.lower().endswith(ext) for ext in extensions):
-                        audio_files.append(os.path.join(root, file))
-                        if progress_callback:
-                            progress_callback.emit(f"Scanning {file}")
-        return audio_files
+    def get_audio_files_recursively(self, directories: list[str]) -> Iterator[str]:
+        """
+        Scans directories for audio files - a generator, walked on other threads as it's read,
+        a bounded queue ahead of whatever reads it (add_files_to_database)
+        """
+        return AudioFileWalker.from_config(self.config).walk_paths(directories)
 
     def get_selected_rows(self) -> list[int]:
         """
@@ -1133,8 +1189,41 @@ class MusicTable(QTableView):
         self.selected_song_qmodel_index = real_index
 
     def set_search_string(self, text: str):
-        """set the search string"""
+        """
+        set the search string, and whether it's searched for in the database or in the loaded rows
+
+        With instant search on, it still goes to the database for column:word & "phrases",
+        which only the database search understands, and for text that matched none of the loaded songs
+        (lyrics aren't loaded) - typing more after that can't match anything loaded either
+        """
         self.search_string = text
+        self.search_in_database = (
+            not self.instant_search
+            or ":" in text
+            or '"' in text
+            or bool(self.unmatched_search and text.startswith(self.unmatched_search))
+        )
+
+    def filter_music_table(self):
+        """
+        Filters the songs that are already loaded with the search string - no database query
+        Each keystroke narrows down (or widens back out from) the previous result, see `SongTableModel.filter_rows()`
+        Searches the database instead when none of the loaded songs match
+        """
+        if self.searched_database:
+            # the loaded rows are database search results - load the whole list back, which filters it
+            self.load_music_table()
+        else:
+            self.model2.filter_rows(self.search_string)
+            db_name: str = self.config.get("settings", "db").split("/").pop()
+            db_filename = self.config.get("settings", "db")
+            self.playlistStatsSignal.emit(f"Songs: {self.model2.rowCount()} | {db_name} | {db_filename}")
+            self.find_current_and_selected_bits()
+        self.unmatched_search = None
+        if self.search_string and self.search_string.strip() and not self.model2.rowCount():
+            self.unmatched_search = self.search_string
+            self.search_in_database = True
+            self.load_music_table()
 
     def load_qapp(self, qapp: QApplication) -> None:
         """Necessary for using members and methods of main application window"""
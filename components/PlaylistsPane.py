@@ -133,6 +133,9 @@ class PlaylistsPane(QTreeWidget):
         if reply == QMessageBox.Yes:
             if self.qapp:
                 with DBA.DBAccess() as db:
+                    db.execute(
+                        "DELETE FROM song_playlist WHERE playlist_id = ?;", (self.playlist_db_id_choice,)
+                    )
                     db.execute(
                         "DELETE FROM playlist WHERE id = ?;", (self.playlist_db_id_choice,)
                     )
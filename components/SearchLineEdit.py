@@ -1,5 +1,8 @@
 from PyQt5.QtCore import QTimer, pyqtSignal
 from PyQt5.QtWidgets import QLineEdit
+from configparser import ConfigParser
+from pathlib import Path
+from appdirs import user_config_dir
 
 """
 MusicTable.py holds a variable called self.search_string
@@ -9,8 +12,15 @@ MusicTable.py had a function called load_music_table(), which loads data
 
 in main.py, on self.searchLineEdit.textChanged(),
 this updates the self.search_string in MusicTable.py
+with instant_search on (config), the loaded songs get filtered in memory instead,
+    so the timer only waits a few ms - unless the text has database search syntax (below)
 
 in MusicTable.py, when Ctrl+F is pressed, the line edit gets hidden or visible
+
+database search syntax (see utils/fts_match_query.py):
+    words are prefix searches, all of them have to match
+    "quoted words" match an exact phrase
+    column:word searches one column - title, artist, album, album_artist, genre, lyrics
 """
 
 
@@ -20,6 +30,13 @@ class SearchLineEdit(QLineEdit):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setVisible(False)
+        config = ConfigParser()
+        config.read(Path(user_config_dir(appname="musicpom", appauthor="billypom")) / "config.ini")
+        instant_search = config.getboolean("settings", "instant_search", fallback=True)
+        self.debounce_ms: int = 30 if instant_search else 1500
+        # column:word & "phrases" go to the database, even with instant search on
+        self.database_debounce_ms: int = 1500
+        self.setPlaceholderText('Search... artist:name "exact phrase"')
         self.timer = QTimer(self)
         self.timer.setSingleShot(True)
         self.timer.timeout.connect(self.on_typing_stopped)
@@ -42,7 +59,11 @@ class SearchLineEdit(QLineEdit):
 
     def on_text_changed(self):
         """Reset a timer each time text is changed"""
-        self.timer.start(1500)
+        text = self.text()
+        if ":" in text or '"' in text:
+            self.timer.start(self.database_debounce_ms)
+        else:
+            self.timer.start(self.debounce_ms)
 
     def on_typing_stopped(self):
         """When timer reaches end, emit the text that is currently entered"""
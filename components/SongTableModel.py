@@ -0,0 +1,319 @@
+from array import array
+from bisect import bisect_left
+from typing import Any
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+from components.HeaderTags import HeaderTags2
+
+
+class SongTableModel(QAbstractTableModel):
+    """
+    Table model for the MusicTable
+
+    Rows are stored as columns of plain python values (one list per header)
+    instead of one QStandardItem per cell, so a big library is a handful of lists
+    rather than millions of Qt objects.
+
+    The database id is stored once per row. Any cell returns it for UserRole
+
+    `filter_rows()` hides rows that don't match a search, without touching the data.
+    Helpers that take a `storage_row` (row_for_id, update_row) work on every loaded row,
+    Qt methods (index, data, removeRows...) only see the rows that are showing
+    """
+
+    # columns the in-memory search looks at
+    search_columns: tuple[str, ...] = ("title", "artist", "album", "album_artist", "genre")
+
+    def __init__(self, headers: HeaderTags2, parent=None):
+        super().__init__(parent)
+        self.headers: HeaderTags2 = headers
+        self.ids: array = array("q")
+        self.columns: list[list[Any]] = [[] for _ in self.headers.db_list]
+        self.editable_columns: set[int] = {
+            i for i, db in enumerate(self.headers.db_list) if db in self.headers.get_editable_db_list()
+        }
+        self._rows_by_id: dict[int, int] | None = None
+        self.search_column_indexes: list[int] = [
+            i for i, db in enumerate(self.headers.db_list) if db in self.search_columns
+        ]
+        # storage rows that are showing, None when not filtering
+        self.visible: array | None = None
+        self._visible_rows: dict[int, int] | None = None
+        # lowercased search text per storage row, built on the first search
+        self.search_keys: list[str] | None = None
+        # words of the current search, and (tokens, matching storage rows) for each step of it, narrowest last
+        self.search_tokens: list[str] = []
+        self.search_history: list[tuple[list[str], array]] = []
+
+    #  ____________________
+    # |                    |
+    # |                    |
+    # |  Qt model methods  |
+    # |                    |
+    # |____________________|
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        if self.visible is not None:
+            return len(self.visible)
+        return len(self.ids)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.columns)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        row = index.row() if self.visible is None else self.visible[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            value = self.columns[index.column()][row]
+            return "" if value is None else value
+        if role == Qt.ItemDataRole.UserRole:
+            return self.ids[row]
+        return None
+
+    def setData(self, index: QModelIndex, value: Any, role: int = Qt.ItemDataRole.EditRole) -> bool:
+        """Edits a cell in place, then emits dataChanged so MusicTable can save the change"""
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+        row = self.storage_row(index.row())
+        self.columns[index.column()][row] = value
+        self.update_search_key(row)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole])
+        return True
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlags:
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() in self.editable_columns:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal and section < len(self.headers.db_list):
+            return self.headers.db_list[section]
+        if orientation == Qt.Orientation.Vertical:
+            return section + 1
+        return None
+
+    def removeRows(self, row: int, count: int, parent: QModelIndex = QModelIndex()) -> bool:
+        if parent.isValid() or row < 0 or count <= 0 or row + count > self.rowCount():
+            return False
+        self.beginRemoveRows(parent, row, row + count - 1)
+        if self.visible is None:
+            self.delete_storage_rows(range(row, row + count))
+        else:
+            deleted = sorted(self.visible[row : row + count])
+            del self.visible[row : row + count]
+            self.delete_storage_rows(deleted)
+            # every row below a deleted row moved up
+            self.visible = array("q", (r - bisect_left(deleted, r) for r in self.visible))
+            self._visible_rows = None
+            self.search_history.clear()
+        self.endRemoveRows()
+        return True
+
+    #  ____________________
+    # |                    |
+    # |                    |
+    # |   Data loading     |
+    # |                    |
+    # |____________________|
+
+    def set_rows(self, data: list[tuple]) -> None:
+        """
+        Replaces everything in the model with `data`
+        data: list of `(id, *fields)` tuples, fields in HeaderTags2.db_list order
+        """
+        self.beginResetModel()
+        if data:
+            id_column, *columns = zip(*data)
+            self.ids = array("q", id_column)
+            self.columns = [list(column) for column in columns]
+        else:
+            self.ids = array("q")
+            self.columns = [[] for _ in self.headers.db_list]
+        self._rows_by_id = None
+        self.visible = None
+        self._visible_rows = None
+        self.search_keys = None
+        self.search_tokens = []
+        self.search_history.clear()
+        self.endResetModel()
+
+    def append_rows(self, data: list[tuple]) -> None:
+        """Adds `(id, *fields)` rows to the end of the model. While filtering, only matching rows show up"""
+        if not data:
+            return
+        first = len(self.ids)
+        if self.visible is None:
+            self.beginInsertRows(QModelIndex(), first, first + len(data) - 1)
+        id_column, *columns = zip(*data)
+        self.ids.extend(id_column)
+        for i, column in enumerate(columns):
+            self.columns[i].extend(column)
+        self._rows_by_id = None
+        if self.search_keys is not None:
+            self.search_keys.extend(self.get_search_key(row) for row in range(first, len(self.ids)))
+        if self.visible is None:
+            self.endInsertRows()
+            return
+        matches = [row for row in range(first, len(self.ids)) if self.row_matches(row, self.search_tokens)]
+        self.search_history.clear()
+        if matches:
+            self.beginInsertRows(QModelIndex(), len(self.visible), len(self.visible) + len(matches) - 1)
+            self.visible.extend(matches)
+            self._visible_rows = None
+            self.endInsertRows()
+
+    def update_row(self, storage_row: int, row_data: tuple) -> None:
+        """Replaces the values of one row with an `(id, *fields)` tuple"""
+        _, *values = row_data
+        for i, value in enumerate(values):
+            self.columns[i][storage_row] = value
+        self.update_search_key(storage_row)
+        row = self.model_row(storage_row)
+        if row is not None:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.columns) - 1))
+
+    def remove_ids(self, ids: set[int]) -> None:
+        """Removes every row whose database id is in `ids`"""
+        rows = [self.row_for_id(id) for id in ids]
+        rows = sorted(row for row in rows if row is not None)
+        if not rows:
+            return
+        if self.visible is None:
+            # delete from the bottom up, so the rows above keep their numbers
+            for row in reversed(rows):
+                self.removeRows(row, 1)
+            return
+        # some of them might be hidden by the filter
+        self.beginResetModel()
+        deleted = set(rows)
+        self.visible = array("q", (r - bisect_left(rows, r) for r in self.visible if r not in deleted))
+        self.delete_storage_rows(rows)
+        self._visible_rows = None
+        self.search_history.clear()
+        self.endResetModel()
+
+    def delete_storage_rows(self, rows) -> None:
+        """Deletes storage rows from the data, without telling any views"""
+        for row in sorted(rows, reverse=True):
+            del self.ids[row]
+            for column in self.columns:
+                del column[row]
+            if self.search_keys is not None:
+                del self.search_keys[row]
+        self._rows_by_id = None
+
+    def row_for_id(self, id: int) -> int | None:
+        """Returns the storage row for a database id, or None if it isn't loaded"""
+        if self._rows_by_id is None:
+            self._rows_by_id = {id: row for row, id in enumerate(self.ids)}
+        return self._rows_by_id.get(id)
+
+    def storage_row(self, row: int) -> int:
+        """Returns the storage row for a row that is showing"""
+        return row if self.visible is None else self.visible[row]
+
+    def model_row(self, storage_row: int) -> int | None:
+        """Returns the showing row for a storage row, or None if it's filtered out"""
+        if self.visible is None:
+            return storage_row
+        if self._visible_rows is None:
+            self._visible_rows = {row: i for i, row in enumerate(self.visible)}
+        return self._visible_rows.get(storage_row)
+
+    def find_row(self, column: int, value: Any) -> int | None:
+        """Returns the first showing row where `column` equals `value`, or None"""
+        values = self.columns[column]
+        start = 0
+        while True:
+            try:
+                storage_row = values.index(value, start)
+            except ValueError:
+                return None
+            row = self.model_row(storage_row)
+            if row is not None:
+                return row
+            start = storage_row + 1
+
+    #  ____________________
+    # |                    |
+    # |                    |
+    # |   In-memory search |
+    # |                    |
+    # |____________________|
+
+    def filter_rows(self, text: str | None) -> None:
+        """
+        Shows only the rows where every word of `text` is somewhere in the search columns
+
+        Typing more narrows down the previous result instead of looking at every row again,
+        and backspacing goes back to an earlier result, so a keystroke costs a lot less than a full scan
+        """
+        tokens = text.lower().split() if text else []
+        if not tokens:
+            self.clear_filter()
+            return
+        if self.search_keys is None:
+            self.search_keys = [self.get_search_key(row) for row in range(len(self.ids))]
+        # start from the narrowest earlier result that this search is a narrower version of
+        candidates: array | None = None
+        checked: list[str] = []
+        while self.search_history:
+            previous_tokens, previous_rows = self.search_history[-1]
+            if all(any(previous in token for token in tokens) for previous in previous_tokens):
+                candidates = previous_rows
+                checked = previous_tokens
+                break
+            self.search_history.pop()
+        if self.search_history and self.search_history[-1][0] == tokens:
+            self.search_history.pop()
+        keys = self.search_keys
+        # every candidate already matches the words it was found with, only look for the new ones
+        for token in tokens:
+            if token in checked:
+                continue
+            if candidates is None:
+                candidates = array("q", [row for row, key in enumerate(keys) if token in key])
+            else:
+                candidates = array("q", [row for row in candidates if token in keys[row]])
+        rows = candidates if candidates is not None else array("q", range(len(self.ids)))
+        self.search_history.append((tokens, rows))
+        self.search_tokens = tokens
+        self.beginResetModel()
+        self.visible = rows
+        self._visible_rows = None
+        self.endResetModel()
+
+    def clear_filter(self) -> None:
+        """Shows every row again"""
+        self.search_tokens = []
+        self.search_history.clear()
+        if self.visible is None:
+            return
+        self.beginResetModel()
+        self.visible = None
+        self._visible_rows = None
+        self.endResetModel()
+
+    def get_search_key(self, storage_row: int) -> str:
+        """Lowercased search text for a row - one line per search column, so words can't match across columns"""
+        values = (self.columns[i][storage_row] for i in self.search_column_indexes)
+        return "\n".join(str(value) for value in values if value is not None).lower()
+
+    def update_search_key(self, storage_row: int) -> None:
+        if self.search_keys is not None:
+            self.search_keys[storage_row] = self.get_search_key(storage_row)
+            # earlier results might be missing this row now
+            self.search_history.clear()
+
+    def row_matches(self, storage_row: int, tokens: list[str]) -> bool:
+        key = self.search_keys[storage_row] if self.search_keys is not None else self.get_search_key(storage_row)
+        return all(token in key for token in tokens)
@@ -0,0 +1,117 @@
+from PyQt5.QtCore import QLineF, QRect, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QMouseEvent, QPainter, QPaintEvent, QPen, QPixmap, QResizeEvent
+from PyQt5.QtWidgets import QSizePolicy, QWidget
+from utils.waveform_peaks import WaveformPeaks
+
+
+class WaveformScrubber(QWidget):
+    """
+    Waveform of the current song, drawn from its peaks file (see utils/waveform_peaks.py)
+    Click or drag to seek - the part that's been played is drawn in a different colour
+    """
+
+    # position to seek to, in ms
+    seekSignal = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(32)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+        self.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.peaks: WaveformPeaks | None = None
+        self.duration: int = 0
+        self.position: int = 0
+        # where the mouse is while dragging, in ms
+        self.drag_position: int | None = None
+        self.played_color: QColor = QColor("#3daee9")
+        self.unplayed_color: QColor = QColor("#5a5a5a")
+        # the waveform in both colours, drawn once per size
+        self._played_pixmap: QPixmap | None = None
+        self._unplayed_pixmap: QPixmap | None = None
+
+    def set_peaks(self, peaks: WaveformPeaks | None) -> None:
+        self.peaks = peaks
+        if peaks is not None and not self.duration:
+            self.duration = peaks.duration_ms
+        self._played_pixmap = None
+        self._unplayed_pixmap = None
+        self.update()
+
+    def set_duration(self, duration: int) -> None:
+        if duration != self.duration:
+            self.duration = duration
+            self.update()
+
+    def set_position(self, position: int) -> None:
+        """Only repaints if the played part grew by a pixel or more"""
+        old_x = self.position_to_x(self.position)
+        self.position = position
+        if self.position_to_x(position) != old_x:
+            self.update()
+
+    def is_dragging(self) -> bool:
+        return self.drag_position is not None
+
+    def position_to_x(self, position: int) -> int:
+        if self.duration <= 0:
+            return 0
+        return int(self.width() * min(1.0, max(0.0, position / self.duration)))
+
+    def x_to_position(self, x: int) -> int:
+        if self.width() <= 0:
+            return 0
+        return int(self.duration * min(1.0, max(0.0, x / self.width())))
+
+    def render_waveform(self, color: QColor) -> QPixmap:
+        """Draws the waveform, one vertical line per pixel from min to max"""
+        pixmap = QPixmap(self.size())
+        pixmap.fill(Qt.GlobalColor.transparent)
+        middle = self.height() / 2
+        painter = QPainter(pixmap)
+        painter.setPen(QPen(color, 1))
+        if self.peaks is not None:
+            peaks = self.peaks.get_peaks(self.width())
+            painter.drawLines(
+                [QLineF(x + 0.5, middle - high * middle, x + 0.5, middle - low * middle) for x, (low, high) in enumerate(peaks)]
+            )
+        else:
+            painter.drawLine(QLineF(0, middle, self.width(), middle))
+        painter.end()
+        return pixmap
+
+    def paintEvent(self, a0: QPaintEvent | None) -> None:
+        if self._played_pixmap is None or self._unplayed_pixmap is None:
+            self._played_pixmap = self.render_waveform(self.played_color)
+            self._unplayed_pixmap = self.render_waveform(self.unplayed_color)
+        position = self.drag_position if self.drag_position is not None else self.position
+        played_x = self.position_to_x(position)
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._unplayed_pixmap)
+        painter.drawPixmap(QRect(0, 0, played_x, self.height()), self._played_pixmap, QRect(0, 0, played_x, self.height()))
+        painter.setPen(QPen(self.played_color.lighter(150), 1))
+        painter.drawLine(played_x, 0, played_x, self.height())
+        painter.end()
+
+    def resizeEvent(self, a0: QResizeEvent | None) -> None:
+        self._played_pixmap = None
+        self._unplayed_pixmap = None
+        super().resizeEvent(a0)
+
+    def mousePressEvent(self, a0: QMouseEvent | None) -> None:
+        if a0 is not None and a0.button() == Qt.MouseButton.LeftButton and self.duration:
+            self.drag_position = self.x_to_position(a0.x())
+            self.update()
+
+    def mouseMoveEvent(self, a0: QMouseEvent | None) -> None:
+        if a0 is not None and self.drag_position is not None:
+            self.drag_position = self.x_to_position(a0.x())
+            self.update()
+
+    def mouseReleaseEvent(self, a0: QMouseEvent | None) -> None:
+        if a0 is not None and self.drag_position is not None:
+            # seek once, when let go - like the playback slider
+            position = self.x_to_position(a0.x())
+            self.drag_position = None
+            self.position = position
+            self.seekSignal.emit(position)
+            self.update()
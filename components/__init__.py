@@ -5,6 +5,7 @@ from .PreferencesWindow import PreferencesWindow
 from .ErrorDialog import ErrorDialog
 from .LyricsWindow import LyricsWindow
 from .DebugWindow import DebugWindow
+from .JobsWindow import JobsWindow
 from .AddToPlaylistWindow import AddToPlaylistWindow
 from .EditPlaylistOptionsWindow import EditPlaylistOptionsWindow
 from .CreatePlaylistWindow import CreatePlaylistWindow
@@ -12,5 +13,7 @@ from .PlaylistsPane import PlaylistsPane
 from .ExportPlaylistWindow import ExportPlaylistWindow
 from .QuestionBoxDetails import QuestionBoxDetails
 from .HeaderTags import HeaderTags2
+from .SongTableModel import SongTableModel
 from .MediaPlayer import MediaPlayer
 from .SearchLineEdit import SearchLineEdit
+from .WaveformScrubber import WaveformScrubber
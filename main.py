@@ -24,11 +24,13 @@ from PyQt5.QtWidgets import (
     QApplication,
     QGraphicsScene,
     QMessageBox,
+    QProgressBar,
     QPushButton,
     QStatusBar,
     QStyle,
 )
 from PyQt5.QtCore import (
+    QEvent,
     QModelIndex,
     QSize,
     QUrl,
@@ -38,19 +40,28 @@ from PyQt5.QtCore import (
 from PyQt5.QtMultimedia import (
     QMediaPlayer,
     QMediaContent,
+    QMediaPlaylist,
     QAudioProbe,
 )
-from PyQt5.QtGui import QCloseEvent, QFont, QResizeEvent
+from PyQt5.QtGui import QCloseEvent, QFont, QHideEvent, QResizeEvent, QShowEvent
 from utils import (
     delete_album_art,
-    get_tags,
     scan_for_music,
     initialize_db,
+    update_database_schema,
+    recover_reorganize_files,
     add_files_to_database,
     set_album_art,
-    id3_remap,
-    get_album_art,
-    Worker
+    get_art_pixmap,
+    get_now_playing,
+    prefetch_song,
+    Progress,
+    Worker,
+    JobPriority,
+    JobScheduler,
+    LibraryWatcher,
+    load_waveform_peaks,
+    generate_waveform_peaks,
 )
 from components import (
     MediaPlayer,
@@ -60,7 +71,9 @@ from components import (
     CreatePlaylistWindow,
     ExportPlaylistWindow,
     HeaderTags2,
-    DebugWindow
+    DebugWindow,
+    JobsWindow,
+    WaveformScrubber,
 )
 from utils.export_playlist_by_id import export_playlist_by_id
 
@@ -82,6 +95,10 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
         )
         self.config.read(self.cfg_file)
         self.threadpool: QThreadPool = QThreadPool()
+        # every Worker goes through here - see JobScheduler for priorities & cancelling
+        # 2 BACKGROUND threads, so library syncs don't wait hours behind the waveforms
+        self.job_scheduler: JobScheduler = JobScheduler(self.threadpool, self, max_background_jobs=2)
+        self.jobs_window: JobsWindow | None = None
         # UI
         self.setupUi(self)
         self.setWindowTitle("musicpom")
@@ -91,6 +108,17 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
         self.status_bar: QStatusBar = QStatusBar()
         self.permanent_status_label: QLabel = QLabel("")
         self.status_bar.addPermanentWidget(self.permanent_status_label)
+        # long jobs (scans, reorganizing...) - only shown while one is running
+        self.progress_bar: QProgressBar = QProgressBar()
+        self.progress_bar.setMaximumWidth(200)
+        self.progress_bar.hide()
+        self.status_bar.addPermanentWidget(self.progress_bar)
+        # opens the jobs window - running & queued scans, reorganizing...
+        self.jobs_button: QPushButton = QPushButton("Jobs")
+        self.jobs_button.setFlat(True)
+        self.jobs_button.clicked.connect(self.open_jobs_window)
+        self.job_scheduler.jobsChanged.connect(self.on_jobs_changed)
+        self.status_bar.addPermanentWidget(self.jobs_button)
         self.setStatusBar(self.status_bar)
 
         # table
@@ -98,6 +126,14 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
         self.current_song_filepath: str | None = None
         self.current_song_metadata: ID3 | dict | None = None
         self.current_song_album_art: bytes | None = None
+        self.current_waveform_filepath: str | None = None
+        # goes up every time the song changes, so loads for older songs can tell they're stale
+        self.now_playing_request: int = 0
+        # next song - gets ready `prefetch_seconds` before the current one ends
+        self.prefetch_seconds: int = self.config.getint("settings", "prefetch_seconds", fallback=15)
+        self.prefetch_filepath: str | None = None
+        self.prefetched: dict | None = None
+        self.media_playlist: QMediaPlaylist | None = None
 
         # widget bits
         self.tableView: MusicTable
@@ -108,6 +144,8 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
         # index is the model2's row number? i guess?
         self.probe: QAudioProbe = QAudioProbe()  # Gets audio buffer data
         self.audio_visualizer: AudioVisualizer = AudioVisualizer(self.player, self.probe, self.PlotWidget)
+        self.audio_visualizer.set_source(self.config.get("settings", "visualizer_source", fallback="auto"))
+        self.audio_visualizer.set_show_stats(self.config.getboolean("settings", "show_visualizer_stats", fallback=False))
         self.timer: QTimer = QTimer(parent=self)  # for playback slider and such
 
         # Button styles
@@ -144,11 +182,18 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
         self.timer.start(100)
         self.timer.timeout.connect(self.move_slider)
 
+        # Waveform scrubber - replaces the playback slider once the song's waveform is ready
+        self.waveformScrubber: WaveformScrubber = WaveformScrubber(self.centralwidget)
+        self.hLayoutPlayback.insertWidget(self.hLayoutPlayback.indexOf(self.playbackSlider), self.waveformScrubber)
+        self.hLayoutPlayback.setStretch(self.hLayoutPlayback.indexOf(self.waveformScrubber), 4)
+        self.waveformScrubber.hide()
+
         # Set fixed size for album art
         self.albumGraphicsView.setFixedSize(250, 250)
 
         # Connections
         self.playbackSlider.sliderReleased.connect(lambda: self.player.setPosition(self.playbackSlider.value()))  # sliderReleased works better than sliderMoved
+        self.waveformScrubber.seekSignal.connect(self.player.setPosition)
         self.volumeSlider.sliderMoved[int].connect(lambda: self.on_volume_changed())
         self.speedSlider.sliderMoved.connect(lambda: self.on_speed_changed(self.speedSlider.value()))
         # self.speedSlider.doubleClicked.connect(lambda: self.on_speed_changed(1))
@@ -185,6 +230,7 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
         self.tableView.playSignal.connect(self.play_audio_file)
         self.tableView.playPauseSignal.connect(self.on_play_clicked)  # Spacebar toggle play/pause signal
         self.tableView.handleProgressSignal.connect(self.handle_progress)
+        self.tableView.handleProgressUpdateSignal.connect(self.handle_progress_update)
         self.tableView.searchBoxSignal.connect(self.handle_search_box_visibility)
         self.tableView.playlistStatsSignal.connect(self.set_permanent_status_bar_message)
         self.tableView.load_music_table()
@@ -194,6 +240,18 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
         self.playlistTreeView.playlistChoiceSignal.connect(self.tableView.load_music_table)
         self.playlistTreeView.allSongsSignal.connect(self.tableView.load_music_table)
 
+        # Keep the library in sync with the filesystem
+        self.library_watcher: LibraryWatcher = LibraryWatcher(self.job_scheduler, self)
+        self.library_watcher.libraryChangedSignal.connect(self.tableView.apply_library_changes)
+        if self.config.getboolean("settings", "watch_library", fallback=True):
+            self.library_watcher.start()
+
+        # Make waveforms for the whole library in the background
+        if self.config.getboolean("settings", "generate_waveforms", fallback=True):
+            self.job_scheduler.submit(
+                Worker(generate_waveform_peaks), "Making waveforms", JobPriority.BACKGROUND, key="generate_waveforms"
+            )
+
         # albumGraphicsView
         self.albumGraphicsView.albumArtDropped.connect(self.set_album_art_for_selected_songs)
         self.albumGraphicsView.albumArtDeleted.connect(self.delete_album_art_for_current_song)
@@ -210,8 +268,25 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
         if a0 is not None:
             return super().resizeEvent(a0)
 
+    def changeEvent(self, a0: QEvent | None) -> None:
+        """Stop the visualizer while minimized"""
+        if a0 is not None and a0.type() == QEvent.Type.WindowStateChange:
+            self.audio_visualizer.set_visible(not self.isMinimized())
+        super().changeEvent(a0)
+
+    def hideEvent(self, a0: QHideEvent | None) -> None:
+        self.audio_visualizer.set_visible(False)
+        super().hideEvent(a0)
+
+    def showEvent(self, a0: QShowEvent | None) -> None:
+        self.audio_visualizer.set_visible(not self.isMinimized())
+        super().showEvent(a0)
+
     def closeEvent(self, a0: QCloseEvent | None) -> None:
         """Save settings when closing the application"""
+        self.audio_visualizer.fft_analyser.stop()
+        # scans etc. stop at the next file, instead of keeping the app open until they're done
+        self.job_scheduler.cancel_all()
         self.config["settings"]["volume"] = str(self.current_volume)
         self.config["settings"]["window_size"] = (str(self.width()) + "," + str(self.height()))
         self.config['table']['column_ratios'] = ",".join(self.tableView.get_current_header_width_ratios())
@@ -244,11 +319,7 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
         """Update stuff when the song changes"""
         if not media.isNull():
             file_url = media.canonicalUrl().toLocalFile()
-            metadata = id3_remap(get_tags(file_url)[0])
-            if metadata is not None:
-                self.set_ui_metadata(
-                    metadata["title"], metadata["artist"], metadata["album"], file_url
-                )
+            self.load_now_playing(file_url)
 
     def on_volume_changed(self) -> None:
         """Handles volume changes"""
@@ -305,22 +376,64 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
 
     def on_next_clicked(self) -> None:
         """click next (or song ended) - go to next song"""
+        next_index, next_filepath = self.get_next_song()
+        if next_index is None or next_filepath is None:
+            return
+        self.play_audio_file(next_filepath)
+        self.tableView.set_current_song_qmodel_index(next_index)
+        self.tableView.set_current_song_filepath(next_filepath)
+
+    def get_next_song(self) -> tuple[QModelIndex | None, str | None]:
+        """The row after the current song, in the table's current order, and its filepath"""
         current_real_index = self.tableView.current_song_qmodel_index
         try:
             # FIXME: seg fault here but only sometimes???
             # when playing song in lib, switch to playlist, back to lib, next song
             index = self.tableView.proxymodel.mapFromSource(current_real_index)
         except Exception:
-            return
+            return None, None
         row: int = index.row()
         next_row: int = row + 1
         next_index: QModelIndex = self.tableView.proxymodel.index(next_row, index.column())
         next_filepath = next_index.siblingAtColumn(self.headers.db_list.index("filepath")).data()
         if next_filepath is None:
+            return None, None
+        return next_index, next_filepath
+
+    def prefetch_next_song(self) -> None:
+        """
+        Near the end of a song - gets the next one ready in the background
+        (file read into the OS cache, tags, album art, waveform), see on_next_song_prefetched
+        """
+        _, next_filepath = self.get_next_song()
+        # only once per song
+        self.prefetch_filepath = next_filepath or ""
+        if not next_filepath:
             return
-        self.play_audio_file(next_filepath)
-        self.tableView.set_current_song_qmodel_index(next_index)
-        self.tableView.set_current_song_filepath(next_filepath)
+        worker = Worker(prefetch_song, next_filepath)
+        worker.signals.signal_result.connect(self.on_next_song_prefetched)
+        self.job_scheduler.submit(worker, priority=JobPriority.INTERACTIVE)
+
+    def on_next_song_prefetched(self, result: dict) -> None:
+        """Keeps the next song's tags & art for when it starts, and queues it up behind the current song"""
+        if result["filepath"] != self.prefetch_filepath:
+            return
+        self.prefetched = result
+        playlist = self.media_playlist
+        if playlist is not None and playlist.currentIndex() == playlist.mediaCount() - 1:
+            # the player goes straight into it when this song ends, no gap
+            playlist.addMedia(QMediaContent(QUrl.fromLocalFile(result["filepath"])))
+
+    def on_media_playlist_index_changed(self, position: int) -> None:
+        """The player moved on to the queued song by itself (see on_next_song_prefetched)"""
+        if position <= 0 or self.media_playlist is None:
+            return
+        filepath = self.media_playlist.media(position).canonicalUrl().toLocalFile()
+        next_index, next_filepath = self.get_next_song()
+        if next_index is not None and next_filepath == filepath:
+            self.tableView.set_current_song_qmodel_index(next_index)
+        self.tableView.set_current_song_filepath(filepath)
+        self.load_now_playing(filepath)
 
     #  ____________________
     # |                    |
@@ -368,6 +481,8 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
                  appauthor="billypom")) / "config.ini"
         )
         self.config.read(cfg_file)
+        # the database path might have changed
+        DBA.reload_config()
         debug("load_config()")
 
     def set_permanent_status_bar_message(self, message: str) -> None:
@@ -397,7 +512,10 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
     def handle_search_box_text(self, text: str):
         """when text changes, update the music table thingie"""
         self.tableView.set_search_string(text)
-        self.tableView.load_music_table()
+        if self.tableView.search_in_database:
+            self.tableView.load_music_table()
+        else:
+            self.tableView.filter_music_table()
 
     def play_audio_file(self, filepath=None) -> None:
         """
@@ -407,35 +525,97 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
         """
         if not filepath:
             filepath = self.tableView.get_selected_song_filepath()
-        metadata = id3_remap(get_tags(filepath)[0])
         # read the file
         url = QUrl.fromLocalFile(filepath)
         # load the audio content
         content = QMediaContent(url)
         # set the player to play the content
-        self.player.setMedia(content)
+        # - in a playlist, so the next song can be queued up behind it (see prefetch_next_song)
+        if self.media_playlist is not None:
+            self.media_playlist.currentIndexChanged.disconnect(self.on_media_playlist_index_changed)
+            self.media_playlist.deleteLater()
+        self.media_playlist = QMediaPlaylist(self.player)
+        self.media_playlist.addMedia(content)
+        self.media_playlist.currentIndexChanged.connect(self.on_media_playlist_index_changed)
+        self.player.setPlaylist(self.media_playlist)
         # self.player.setMedia(QUrl("gst-pipeline: videotestsrc ! autovideosink"))
         self.player.play()  # play
         self.move_slider()  # mover
 
         # assign "now playing" labels & album artwork
-        if metadata is not None:
-            self.set_ui_metadata(
-                metadata["title"], metadata["artist"], metadata["album"], filepath
-            )
+        self.load_now_playing(filepath)
+
+    def load_now_playing(self, filepath: str) -> None:
+        """
+        Fills in the "now playing" labels from the song table straight away,
+        then reads the tags & album art from the file in the background (see on_now_playing_loaded)
+        """
+        self.now_playing_request += 1
+        self.current_song_filepath = filepath
+        self.prefetch_filepath = None
+        prefetched, self.prefetched = self.prefetched, None
+        with DBA.DBAccess() as db:
+            rows = db.query("SELECT title, artist, album FROM song WHERE filepath = ?;", (filepath,))
+        if rows:
+            title, artist, album = rows[0]
+        else:
+            title, artist, album = os.path.splitext(os.path.basename(filepath))[0], "", ""
+        self.set_ui_metadata(title or "", artist or "", album or "")
+        if prefetched is not None and prefetched["filepath"] == filepath:
+            # got ready while the last song was finishing (see prefetch_next_song)
+            self.on_now_playing_loaded(prefetched)
+        else:
+            # stops working as soon as another song starts
+            request = self.now_playing_request
+            worker = Worker(get_now_playing, filepath, lambda: request != self.now_playing_request)
+            worker.signals.signal_result.connect(self.on_now_playing_loaded)
+            self.job_scheduler.submit(worker, priority=JobPriority.INTERACTIVE)
+        self.load_waveform(filepath)
+
+    def on_now_playing_loaded(self, result: dict) -> None:
+        """Tags & album art for the song that's playing, from the file"""
+        if result["filepath"] != self.current_song_filepath:
+            # skipped to another song while this one was loading
+            return
+        metadata = result["metadata"]
+        self.current_song_metadata = metadata
+        if metadata.get("title"):
+            self.set_ui_metadata(metadata.get("title"), metadata.get("artist"), metadata.get("album"))
+        # a cached thumbnail, shared by every song with the same art
+        self.albumGraphicsView.load_album_art_pixmap(
+            get_art_pixmap(result["art_hash"], result["thumbnail_path"])
+        )
 
-    def set_ui_metadata(self, title, artist, album, filepath):
+    def set_ui_metadata(self, title, artist, album):
         """
         Loads metadata into UI, presumably for current song
         But you could pass any text here i guess
-        album art will always try to be current song
         """
         self.artistLabel.setText(artist)
         self.albumLabel.setText(album)
         self.titleLabel.setText(title)
-        # set album artwork
-        album_art_data = get_album_art(filepath)
-        self.albumGraphicsView.load_album_art(album_art_data)
+
+    def load_waveform(self, filepath: str) -> None:
+        """
+        Shows the song's waveform in place of the playback slider
+        The slider stays until the waveform has been loaded (or made, the first time)
+        """
+        self.current_waveform_filepath = filepath
+        self.waveformScrubber.hide()
+        self.playbackSlider.show()
+        worker = Worker(load_waveform_peaks, filepath)
+        worker.signals.signal_result.connect(self.on_waveform_loaded)
+        self.job_scheduler.submit(worker, priority=JobPriority.INTERACTIVE)
+
+    def on_waveform_loaded(self, result) -> None:
+        filepath, peaks = result
+        if filepath != self.current_waveform_filepath:
+            # another song started while this one was loading
+            return
+        self.waveformScrubber.set_duration(self.player.duration())
+        self.waveformScrubber.set_peaks(peaks)
+        self.playbackSlider.hide()
+        self.waveformScrubber.show()
 
     def set_album_art_for_selected_songs(self, album_art_path: str) -> None:
         """Sets the ID3 tag APIC (album art) for all selected song filepaths"""
@@ -453,15 +633,14 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
         result = delete_album_art(file)
         if result:
             # Load the default album artwork in the qgraphicsview
-            album_art_data = get_album_art(None)
-            self.albumGraphicsView.load_album_art(album_art_data)
+            self.albumGraphicsView.load_album_art_pixmap(get_art_pixmap(None, None))
 
     def move_slider(self) -> None:
         """Handles moving the playback slider"""
         if self.player.state() == QMediaPlayer.State.StoppedState:
             return
         else:
-            if self.playbackSlider.isSliderDown():
+            if self.playbackSlider.isSliderDown() or self.waveformScrubber.is_dragging():
                 # Prevents slider from updating when dragging
                 return
             # Update the slider
@@ -470,6 +649,15 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
                 self.playbackSlider.setMaximum(self.player.duration())
                 slider_position = self.player.position()
                 self.playbackSlider.setValue(slider_position)
+                self.waveformScrubber.set_duration(self.player.duration())
+                self.waveformScrubber.set_position(slider_position)
+                remaining = self.player.duration() - slider_position
+                if (
+                    self.prefetch_seconds > 0
+                    and self.prefetch_filepath is None
+                    and 0 < remaining <= self.prefetch_seconds * 1000
+                ):
+                    self.prefetch_next_song()
                 current_minutes, current_seconds = divmod(
                     slider_position / 1000, 60)
                 duration_minutes, duration_seconds = divmod(
@@ -492,6 +680,37 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
         """
         self.show_status_bar_message(data)
 
+    def handle_progress_update(self, progress: Progress):
+        """
+        Shows how far a job has got - progress bar, and done / total / rate / time left in the status bar
+        Comes from Worker's signal_progress_update, a few times a second at most
+        """
+        if progress.finished:
+            self.progress_bar.hide()
+            self.show_status_bar_message(str(progress), 5000)
+            return
+        if progress.total is None:
+            # busy indicator
+            self.progress_bar.setRange(0, 0)
+        else:
+            self.progress_bar.setRange(0, max(1, progress.total))
+            self.progress_bar.setValue(min(progress.done, progress.total))
+        self.progress_bar.show()
+        self.show_status_bar_message(str(progress))
+
+    def on_jobs_changed(self) -> None:
+        """Keeps the jobs button's count up to date"""
+        count = len(self.job_scheduler.get_titled_jobs())
+        self.jobs_button.setText(f"Jobs ({count})" if count else "Jobs")
+
+    def open_jobs_window(self) -> None:
+        """Running & queued jobs, with cancel buttons - not modal, so playback can carry on"""
+        # one window, hidden & shown again - it stays connected to the scheduler
+        if self.jobs_window is None:
+            self.jobs_window = JobsWindow(self.job_scheduler)
+        self.jobs_window.show()
+        self.jobs_window.raise_()
+
     #  ____________________
     # |                    |
     # |                    |
@@ -517,7 +736,8 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
         worker = Worker(add_files_to_database, filenames)
         worker.signals.signal_finished.connect(self.tableView.load_music_table)
         worker.signals.signal_progress.connect(self.handle_progress)
-        self.threadpool.start(worker)
+        worker.signals.signal_progress_update.connect(self.handle_progress_update)
+        self.job_scheduler.submit(worker, f"Adding {len(filenames)} songs")
 
     def create_playlist(self) -> None:
         """Creates a database record for a playlist, given a name"""
@@ -566,8 +786,19 @@ class ApplicationWindow(QMainWindow, Ui_MainWindow):
         """
         worker = Worker(scan_for_music)
         worker.signals.signal_finished.connect(self.tableView.load_music_table)
+        worker.signals.signal_result.connect(self.on_scan_libraries_finished)
         worker.signals.signal_progress.connect(self.handle_progress)
-        self.threadpool.start(worker)
+        worker.signals.signal_progress_update.connect(self.handle_progress_update)
+        job = self.job_scheduler.submit(worker, "Scanning libraries", key="scan_libraries")
+        if job is None:
+            self.status_bar.showMessage("Already scanning libraries", 5000)
+
+    def on_scan_libraries_finished(self, result: tuple[bool, dict[str, str]]) -> None:
+        """Shows files that failed to import, or were removed from disk, after a scan"""
+        _, details = result
+        if details:
+            window = DebugWindow(details)
+            window.exec_()
 
     def delete_database(self) -> None:
         """Deletes the entire database"""
@@ -624,6 +855,8 @@ def update_database_file() -> bool:
             return False
         if size == 0:
             initialize_db()
+        else:
+            update_database_schema()
     if not os.path.exists(db_filepath):
         if not os.path.exists(db_path):
             os.makedirs(db_path)
@@ -698,6 +931,8 @@ if __name__ == "__main__":
     config: ConfigParser = update_config_file()
     if not update_database_file():
         sys.exit(1)
+    # put back files from a reorganize that didn't finish
+    recover_reorganize_files()
 
     # Allow for dynamic imports of my custom classes and utilities
     # ?
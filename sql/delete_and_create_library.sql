@@ -1,3 +1,6 @@
+DROP TABLE IF EXISTS song_fts;
+-- foreign keys are on, playlists can't point at songs that are gone
+DELETE FROM song_playlist;
 DROP TABLE IF EXISTS song;
 
 CREATE TABLE song(
@@ -7,10 +10,24 @@ CREATE TABLE song(
     title varchar(255),
     album varchar(255),
     artist varchar(255),
+    album_artist varchar(255),
     track_number integer,
+    length_seconds integer,
     genre varchar(255),
     codec varchar(15),
     album_date date,
     bitrate int,
-    date_added TIMESTAMP default CURRENT_TIMESTAMP
+    date_added TIMESTAMP default CURRENT_TIMESTAMP,
+    -- stat() info, used to skip unchanged files when rescanning
+    file_size integer,
+    file_mtime integer,
+    file_inode integer,
+    lyrics text,
+    -- album art, see utils/art_cache.py. '' = no art
+    art_hash varchar(32)
 );
+
+-- load_music_table() sorts with ORDER BY <column> COLLATE NOCASE
+CREATE INDEX IF NOT EXISTS song_artist_album_idx ON song (artist COLLATE NOCASE, album COLLATE NOCASE, track_number COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS song_album_idx ON song (album COLLATE NOCASE, track_number COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS song_title_idx ON song (title COLLATE NOCASE);
@@ -1,3 +1,4 @@
+DROP TABLE IF EXISTS song_fts;
 DROP TABLE IF EXISTS song_playlist;
 DROP TABLE IF EXISTS song;
 DROP TABLE IF EXISTS playlist;
@@ -16,9 +17,21 @@ CREATE TABLE song(
     codec varchar(15),
     album_date date,
     bitrate int,
-    date_added TIMESTAMP default CURRENT_TIMESTAMP
+    date_added TIMESTAMP default CURRENT_TIMESTAMP,
+    -- stat() info, used to skip unchanged files when rescanning
+    file_size integer,
+    file_mtime integer,
+    file_inode integer,
+    lyrics text,
+    -- album art, see utils/art_cache.py. '' = no art
+    art_hash varchar(32)
 );
 
+-- load_music_table() sorts with ORDER BY <column> COLLATE NOCASE
+CREATE INDEX IF NOT EXISTS song_artist_album_idx ON song (artist COLLATE NOCASE, album COLLATE NOCASE, track_number COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS song_album_idx ON song (album COLLATE NOCASE, track_number COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS song_title_idx ON song (title COLLATE NOCASE);
+
 CREATE TABLE playlist(
     id integer primary key,
     name varchar(64),
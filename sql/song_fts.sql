@@ -0,0 +1,32 @@
+-- Full text search index for the search box
+-- External content table - the text lives in song, song_fts only holds the index.
+-- Triggers keep it in sync with every insert, update & delete on song
+CREATE VIRTUAL TABLE IF NOT EXISTS song_fts USING fts5(
+    title,
+    artist,
+    album,
+    album_artist,
+    genre,
+    lyrics,
+    content='song',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS song_fts_insert AFTER INSERT ON song BEGIN
+    INSERT INTO song_fts(rowid, title, artist, album, album_artist, genre, lyrics)
+    VALUES (new.id, new.title, new.artist, new.album, new.album_artist, new.genre, new.lyrics);
+END;
+
+CREATE TRIGGER IF NOT EXISTS song_fts_delete AFTER DELETE ON song BEGIN
+    INSERT INTO song_fts(song_fts, rowid, title, artist, album, album_artist, genre, lyrics)
+    VALUES ('delete', old.id, old.title, old.artist, old.album, old.album_artist, old.genre, old.lyrics);
+END;
+
+-- only when searchable columns change - moving a file doesn't touch the index
+CREATE TRIGGER IF NOT EXISTS song_fts_update AFTER UPDATE OF title, artist, album, album_artist, genre, lyrics ON song BEGIN
+    INSERT INTO song_fts(song_fts, rowid, title, artist, album, album_artist, genre, lyrics)
+    VALUES ('delete', old.id, old.title, old.artist, old.album, old.album_artist, old.genre, old.lyrics);
+    INSERT INTO song_fts(rowid, title, artist, album, album_artist, genre, lyrics)
+    VALUES (new.id, new.title, new.artist, new.album, new.album_artist, new.genre, new.lyrics);
+END;
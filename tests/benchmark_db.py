@@ -0,0 +1,120 @@
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+from configparser import ConfigParser
+from time import perf_counter
+
+# DBAccess reads config.ini from the user config dir - point it at a throwaway one
+root = tempfile.mkdtemp(prefix="musicpom_bench_")
+os.environ["XDG_CONFIG_HOME"] = root
+os.makedirs(os.path.join(root, "musicpom"))
+db_path = os.path.join(root, "musicpom", "library.db")
+cfg_file = os.path.join(root, "musicpom", "config.ini")
+with open(cfg_file, "w") as f:
+    f.write(f"[settings]\ndb = {db_path}\n")
+
+import DBA  # noqa: E402
+
+
+class LegacyDBAccess:
+    """The old DBAccess - reads config.ini and connects for every operation, commits on close"""
+
+    def __init__(self):
+        config = ConfigParser()
+        config.read(cfg_file)
+        self._conn = sqlite3.connect(config.get("settings", "db"))
+        self._cursor = self._conn.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._conn.commit()
+        self._conn.close()
+
+    def execute(self, sql, params):
+        self._cursor.execute(sql, params or ())
+
+    def query(self, sql, params):
+        self._cursor.execute(sql, params or ())
+        return self._cursor.fetchall()
+
+
+def create_song_table(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE TABLE song (id integer primary key, filepath varchar(511) UNIQUE, title varchar(255));")
+    conn.executemany(
+        "INSERT INTO song (filepath, title) VALUES (?, ?);",
+        ((f"/music/{i}.mp3", f"title {i}") for i in range(10000)),
+    )
+
+
+def ops_per_sec(count: int, op) -> float:
+    start = perf_counter()
+    for i in range(count):
+        op(i)
+    return count / (perf_counter() - start)
+
+
+def main():
+    """
+    Compares ops/sec of the old per-call connect against the pooled DBAccess
+    Usage (from the repo root): python -m tests.benchmark_db [op_count]
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    try:
+        # same data in 2 files, the legacy one stays in the default rollback journal mode
+        for path in (db_path, db_path + ".legacy"):
+            with sqlite3.connect(path) as conn:
+                create_song_table(conn)
+
+        def select(access):
+            def op(i):
+                with access() as db:
+                    db.query("SELECT title FROM song WHERE id = ?;", (i % 10000 + 1,))
+            return op
+
+        def update(access):
+            def op(i):
+                with access() as db:
+                    db.execute("UPDATE song SET title = ? WHERE id = ?;", (f"edited {i}", i % 10000 + 1))
+            return op
+
+        def batched_update(i):
+            with DBA.DBAccess() as db:
+                db.execute("UPDATE song SET title = ? WHERE id = ?;", (f"batched {i}", i % 10000 + 1))
+
+        def batched(i):
+            # one commit for every 500 updates
+            if i % 500 == 0:
+                with DBA.transaction():
+                    for j in range(i, min(i + 500, count)):
+                        batched_update(j)
+
+        legacy_results = []
+        with open(cfg_file, "w") as f:
+            f.write(f"[settings]\ndb = {db_path}.legacy\n")
+        legacy_results.append(ops_per_sec(count, select(LegacyDBAccess)))
+        legacy_results.append(ops_per_sec(count, update(LegacyDBAccess)))
+
+        results = [
+            ops_per_sec(count, select(DBA.DBAccess)),
+            ops_per_sec(count, update(DBA.DBAccess)),
+        ]
+        start = perf_counter()
+        for i in range(0, count, 500):
+            batched(i)
+        batched_ops = count / (perf_counter() - start)
+
+        print(f"{'operation':<28} | {'before (ops/s)':>14} | {'after (ops/s)':>13}")
+        print(f"{'SELECT by id':<28} | {legacy_results[0]:>14.0f} | {results[0]:>13.0f}")
+        print(f"{'UPDATE, 1 commit each':<28} | {legacy_results[1]:>14.0f} | {results[1]:>13.0f}")
+        print(f"{'UPDATE, DBA.transaction()':<28} | {'':>14} | {batched_ops:>13.0f}")
+    finally:
+        DBA.close_connections()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
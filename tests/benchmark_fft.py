@@ -0,0 +1,91 @@
+import sys
+from time import perf_counter
+import numpy as np
+from scipy.ndimage import gaussian_filter1d
+
+from utils.spectrum import log_band_amplitudes, decay_points
+
+FRAME_RATE = 44100
+SAMPLING_WINDOW_LENGTH = 0.05
+SENSITIVITY = 10
+
+
+def legacy_calculate_amps(samples: np.ndarray, start_index: int, resolution: int, points: np.ndarray) -> np.ndarray:
+    """The old FFTAnalyser.calculate_amps, minus the player"""
+    sample_count = int(FRAME_RATE * SAMPLING_WINDOW_LENGTH)
+    v_sample = samples[start_index : start_index + sample_count]
+    window = np.hanning(len(v_sample))
+    v_sample = v_sample * window
+    fourier = np.fft.fft(v_sample)
+    freq = np.fft.fftfreq(fourier.size, d=SAMPLING_WINDOW_LENGTH)
+    amps = 2 / v_sample.size * np.abs(fourier)
+    data = np.array([freq, amps]).T
+    point_range = 1 / resolution
+    min_freq = np.min(freq[freq > 0])
+    max_freq = np.max(freq)
+    log_freqs = np.logspace(np.log10(min_freq), np.log10(max_freq), resolution)
+    point_samples = []
+    for i, log_freq in enumerate(log_freqs):
+        amps = data[(log_freq - point_range < data[:, 0]) & (data[:, 0] < log_freq)]
+        if not amps.size:
+            point_samples.append(0)
+        else:
+            point_samples.append(
+                amps[0][1].max() * (((1 + SENSITIVITY) / 10 + (SENSITIVITY - 1) / 10) ** (i / 50))
+            )
+    for n, amp in enumerate(point_samples):
+        if amp < points[n]:
+            points[n] = points[n] * 0.8 + amp * 0.2
+        else:
+            points[n] = amp
+        if points[n] < 1e-4:
+            points[n] = 0
+    return gaussian_filter1d(points, sigma=2)
+
+
+def calculate_amps(samples: np.ndarray, start_index: int, resolution: int, points: np.ndarray) -> np.ndarray:
+    """The new FFTAnalyser.calculate_amps, minus the player"""
+    sample_count = int(FRAME_RATE * SAMPLING_WINDOW_LENGTH)
+    v_sample = samples[start_index : start_index + sample_count]
+    point_samples = log_band_amplitudes(v_sample, resolution, SAMPLING_WINDOW_LENGTH, SENSITIVITY)
+    decay_points(points, point_samples, playing=True)
+    return gaussian_filter1d(points, sigma=2)
+
+
+def time_frames(calculate, samples: np.ndarray, resolution: int, frames: int) -> tuple[float, list[np.ndarray]]:
+    """Returns (ms per frame, every frame's output), stepping 33ms through the song like the analyser"""
+    points = np.zeros(resolution)
+    step = int(FRAME_RATE * 0.033)
+    outputs = []
+    start = perf_counter()
+    for frame in range(frames):
+        outputs.append(calculate(samples, frame * step, resolution, points).copy())
+    return (perf_counter() - start) / frames * 1000, outputs
+
+
+def main():
+    """
+    Times one visualizer frame, old calculate_amps vs rfft + cached log bands
+    Usage (from the repo root): python -m tests.benchmark_fft [frames] [resolution]
+    """
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    resolution = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    # a few tones and some noise, as 16 bit samples
+    t = np.arange(int(FRAME_RATE * 0.033 * frames) + FRAME_RATE) / FRAME_RATE
+    rng = np.random.default_rng(0)
+    signal = sum(np.sin(2 * np.pi * hz * t) for hz in (55, 220, 520, 1760, 7040)) + rng.normal(0, 0.5, t.size)
+    samples = (signal / np.abs(signal).max() * 32767).astype(np.int16)
+
+    legacy_ms, legacy_out = time_frames(legacy_calculate_amps, samples, resolution, frames)
+    new_ms, new_out = time_frames(calculate_amps, samples, resolution, frames)
+    difference = max(np.abs(a - b).max() / max(np.abs(a).max(), 1e-9) for a, b in zip(legacy_out, new_out))
+    print(f"{frames} frames, {resolution} bands")
+    print(f"before: {legacy_ms:.3f} ms/frame")
+    print(f"after:  {new_ms:.3f} ms/frame")
+    print(f"speedup: {legacy_ms / new_ms:.1f}x")
+    # bands with more than 1 fft bin now show their loudest bin, the old code only looked at the first one
+    print(f"largest difference: {difference:.2e} (relative to the frame's peak)")
+
+
+if __name__ == "__main__":
+    main()
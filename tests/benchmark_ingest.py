@@ -0,0 +1,74 @@
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+import threading
+import tracemalloc
+from time import perf_counter, sleep
+
+# DBAccess & scan_for_music read config.ini from the user config dir - point it at a throwaway one
+root = tempfile.mkdtemp(prefix="musicpom_bench_")
+os.environ["XDG_CONFIG_HOME"] = root
+os.makedirs(os.path.join(root, "musicpom"))
+db_path = os.path.join(root, "musicpom", "library.db")
+library = os.path.join(root, "library")
+with open(os.path.join(root, "musicpom", "config.ini"), "w") as f:
+    f.write(f"[settings]\ndb = {db_path}\nlibrary = {library}\nextensions = mp3\ntag_workers = 0\n")
+
+import DBA  # noqa: E402
+from tests.benchmark_scan import create_synthetic_library  # noqa: E402
+from utils.scan_for_music import scan_for_music  # noqa: E402
+
+
+def time_to_first_row(stop: threading.Event, started: float, result: list[float]) -> None:
+    """Polls the song table until something is in it"""
+    conn = sqlite3.connect(db_path)
+    while not stop.is_set():
+        if conn.execute("SELECT 1 FROM song LIMIT 1;").fetchone():
+            result.append(perf_counter() - started)
+            break
+        sleep(0.01)
+    conn.close()
+
+
+def main():
+    """
+    Full library scan - time until the first song is in the database, total time, and peak memory
+    The library grows 4x per run; time to first row & peak memory should stay about the same
+    Usage (from the repo root): python -m tests.benchmark_ingest [smallest_file_count]
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2500
+    try:
+        print(f"{'files':>7} | {'first row':>9} | {'total':>7} | {'files/sec':>9} | {'peak memory':>11}")
+        with sqlite3.connect(db_path) as conn:
+            conn.executescript(open("sql/init.sql").read())
+        for _ in range(3):
+            shutil.rmtree(library, ignore_errors=True)
+            create_synthetic_library(library, count)
+            with DBA.DBAccess() as db:
+                db.execute("DELETE FROM song;", ())
+            first_row: list[float] = []
+            stop = threading.Event()
+            tracemalloc.start()
+            started = perf_counter()
+            poller = threading.Thread(target=time_to_first_row, args=(stop, started, first_row))
+            poller.start()
+            scan_for_music(incremental=False)
+            total = perf_counter() - started
+            stop.set()
+            poller.join()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"{count:>7} | {first_row[0] if first_row else total:>8.2f}s | {total:>6.2f}s | "
+                f"{count / total:>9.0f} | {peak / 1e6:>9.1f}MB"
+            )
+            count *= 4
+    finally:
+        DBA.close_connections()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import sys
+from time import perf_counter
+from PyQt5.QtCore import QCoreApplication, QThreadPool
+
+from utils.Worker import Worker
+
+
+def per_file_signals(count: int, progress_callback=None) -> int:
+    """The old way - one cross-thread signal per file"""
+    for i in range(count):
+        progress_callback.signal_progress.emit(f"/music/{i}.mp3")
+    return count
+
+
+def reporter(count: int, progress_callback=None) -> int:
+    progress_callback.start(count, "Adding songs")
+    for i in range(count):
+        progress_callback.advance(item=f"/music/{i}.mp3")
+    return count
+
+
+def run(app: QCoreApplication, fn, count: int) -> tuple[float, int]:
+    """Returns (seconds until the gui thread has handled every update, how many updates it got)"""
+    received = [0]
+
+    def handle(_):
+        received[0] += 1
+
+    worker = Worker(fn, count)
+    worker.signals.signal_progress.connect(handle)
+    worker.signals.signal_progress_update.connect(handle)
+    # queued behind every progress signal, so this is when the gui has caught up
+    worker.signals.signal_result.connect(lambda _: app.quit())
+    start = perf_counter()
+    QThreadPool.globalInstance().start(worker)
+    app.exec_()
+    return perf_counter() - start, received[0]
+
+
+def main():
+    """
+    Progress signals the gui thread has to handle for a job over `count` files
+    Usage (from the repo root): python -m tests.benchmark_progress [count]
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    app = QCoreApplication(sys.argv)
+    for name, fn in (("signal per file", per_file_signals), ("ProgressReporter", reporter)):
+        seconds, received = run(app, fn, count)
+        print(f"{name:<17}: {count} files | {received} gui updates | {seconds:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import shutil
+import tempfile
+from time import perf_counter
+from mutagen.mp3 import MP3
+from mutagen.id3 import ID3
+from mutagen.id3._frames import TIT2, TPE1, TALB
+
+from utils.get_tags import get_tags
+
+# MPEG-1 Layer III, 128kbps, 44.1kHz, no padding = 417 byte frames
+MP3_FRAME = b"\xff\xfb\x90\x00" + bytes(413)
+
+
+def create_synthetic_library(root: str, count: int, per_dir: int = 100) -> list[str]:
+    """
+    Writes `count` tiny mp3 files into `root`, `per_dir` files per folder
+    Every 10th file has no title tag, so the fallback title gets exercised
+    """
+    files = []
+    for i in range(count):
+        directory = os.path.join(root, f"artist_{i // per_dir:04d}", "album")
+        os.makedirs(directory, exist_ok=True)
+        filepath = os.path.join(directory, f"{i:06d} - track.mp3")
+        with open(filepath, "wb") as f:
+            f.write(MP3_FRAME * 40)  # ~1 second of audio
+        tags = ID3()
+        if i % 10:
+            tags.add(TIT2(encoding=3, text=[f"track {i}"]))
+        tags.add(TPE1(encoding=3, text=[f"artist {i // per_dir}"]))
+        tags.add(TALB(encoding=3, text=["album"]))
+        tags.save(filepath)
+        files.append(filepath)
+    return files
+
+
+def legacy_get_mp3_tags(filename: str):
+    """The old tag reader - writes the file twice for every read"""
+    audio = MP3(filename)
+    audio.save(os.path.abspath(filename))
+    if "TIT2" not in list(audio.keys()):
+        title = os.path.splitext(os.path.basename(filename))[0]
+        audio["TIT2"] = TIT2(encoding=3, text=[title])
+    audio.save()
+    return audio, ""
+
+
+def time_scan(files: list[str], reader) -> float:
+    """Returns seconds taken to read the tags of every file"""
+    start = perf_counter()
+    for filepath in files:
+        reader(filepath)
+    return perf_counter() - start
+
+
+def main():
+    """
+    Times a tag scan over a synthetic library, old reader vs read only reader
+    Usage (from the repo root): python -m tests.benchmark_scan [file_count]
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    root = tempfile.mkdtemp(prefix="musicpom_bench_")
+    try:
+        print(f"creating {count} files in {root}")
+        files = create_synthetic_library(root, count)
+        # both readers get a cold-ish, identical tree to read
+        legacy = time_scan(files, legacy_get_mp3_tags)
+        shutil.rmtree(root)
+        files = create_synthetic_library(root, count)
+        read_only = time_scan(files, get_tags)
+        print(f"before (read + 2 writes): {legacy:.2f}s | {count / legacy:.0f} files/sec")
+        print(f"after  (read only):       {read_only:.2f}s | {count / read_only:.0f} files/sec")
+        print(f"speedup: {legacy / read_only:.1f}x")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
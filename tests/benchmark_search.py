@@ -0,0 +1,48 @@
+import sys
+from time import perf_counter
+
+from components.HeaderTags import HeaderTags2
+from components.SongTableModel import SongTableModel
+from tests.benchmark_table_model import create_rows
+
+
+def type_search(model: SongTableModel, text: str, incremental: bool = True) -> list[tuple[str, float, int]]:
+    """
+    Types `text` one character at a time, then backspaces it all away
+    Returns (search text, ms, rows showing) per keystroke
+    """
+    keystrokes = [text[:i] for i in range(1, len(text) + 1)]
+    keystrokes += [text[:i] for i in range(len(text) - 1, -1, -1)]
+    results = []
+    for search in keystrokes:
+        if not incremental:
+            model.search_history.clear()
+        start = perf_counter()
+        model.filter_rows(search)
+        results.append((search, (perf_counter() - start) * 1000, model.rowCount()))
+    return results
+
+
+def main():
+    """
+    Times SongTableModel.filter_rows() per keystroke, narrowing incrementally vs scanning every row
+    Usage (from the repo root): python -m tests.benchmark_search [row_count] [search text]
+    """
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    text = sys.argv[2] if len(sys.argv) > 2 else "artist 123"
+    model = SongTableModel(HeaderTags2())
+    model.set_rows(create_rows(count))
+    start = perf_counter()
+    model.filter_rows("x")
+    model.clear_filter()
+    print(f"{count} rows, building the search index: {(perf_counter() - start) * 1000:.1f} ms")
+    incremental = type_search(model, text)
+    full = type_search(model, text, incremental=False)
+    print(f"{'search':<14} | {'rows':>7} | {'incremental (ms)':>16} | {'full scan (ms)':>14}")
+    for (search, ms, rows), (_, full_ms, _) in zip(incremental, full):
+        print(f"{search!r:<14} | {rows:>7} | {ms:>16.2f} | {full_ms:>14.2f}")
+    print(f"{'worst':<14} | {'':>7} | {max(r[1] for r in incremental):>16.2f} | {max(r[1] for r in full):>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import sys
+import resource
+import subprocess
+from time import perf_counter
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QStandardItem, QStandardItemModel
+
+from components.HeaderTags import HeaderTags2
+from components.SongTableModel import SongTableModel
+
+
+def create_rows(count: int) -> list[tuple]:
+    """Fake `SELECT id, {fields} FROM song` results, in HeaderTags2.db_list order"""
+    return [
+        (
+            i,
+            f"title {i}",
+            f"artist {i // 12}",
+            f"album {i // 12}",
+            f"album artist {i // 12}",
+            i % 12 + 1,
+            "genre",
+            "2001-01-01",
+            180 + i % 300,
+            "mp3",
+            320,
+            f"/music/artist {i // 12}/album {i // 12}/{i % 12 + 1:02d} title {i}.mp3",
+        )
+        for i in range(count)
+    ]
+
+
+def load_standard_item_model(data: list[tuple]) -> QStandardItemModel:
+    """The old MusicTable.populate_model - 1 QStandardItem per cell"""
+    model = QStandardItemModel()
+    for row_data in data:
+        id, *rest_of_data = row_data
+        items = []
+        for item in rest_of_data:
+            if isinstance(item, int):
+                std_item = QStandardItem()
+                std_item.setData(item, Qt.ItemDataRole.DisplayRole)
+                std_item.setData(item, Qt.ItemDataRole.EditRole)
+            else:
+                std_item = QStandardItem(str(item) if item else "")
+            items.append(std_item)
+        for item in items:
+            item.setData(id, Qt.ItemDataRole.UserRole)
+        model.appendRow(items)
+    return model
+
+
+def load_song_table_model(data: list[tuple]) -> SongTableModel:
+    model = SongTableModel(HeaderTags2())
+    model.set_rows(data)
+    return model
+
+
+def measure(kind: str, count: int) -> None:
+    """Loads 1 model in this process and prints: seconds, peak RSS added by the model (MB)"""
+    data = create_rows(count)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = perf_counter()
+    model = load_standard_item_model(data) if kind == "standard" else load_song_table_model(data)
+    elapsed = perf_counter() - start
+    assert model.rowCount() == count
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed} {(peak - baseline) / 1024}")
+
+
+def main():
+    """
+    Compares load time & memory of the old QStandardItemModel against SongTableModel
+    Each measurement runs in its own process, so RSS numbers don't bleed into each other
+    Usage (from the repo root): python -m tests.benchmark_table_model [row_count ...]
+    """
+    if len(sys.argv) > 1 and sys.argv[1] == "--measure":
+        measure(sys.argv[2], int(sys.argv[3]))
+        return
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 500000]
+    print(f"{'rows':>8} | {'model':<18} | {'load (s)':>9} | {'RSS (MB)':>9}")
+    for count in counts:
+        for kind, name in (("standard", "QStandardItemModel"), ("song", "SongTableModel")):
+            result = subprocess.run(
+                [sys.executable, "-m", "tests.benchmark_table_model", "--measure", kind, str(count)],
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode:
+                # show why, instead of just the exit status
+                sys.exit(f"{name}, {count} rows failed:\n{result.stderr}")
+            elapsed, rss = (float(x) for x in result.stdout.split())
+            print(f"{count:>8} | {name:<18} | {elapsed:>9.2f} | {rss:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import os
+import sys
+import wave
+import shutil
+import struct
+import tempfile
+from collections import defaultdict
+from time import perf_counter
+from mutagen import File
+from mutagen.id3 import ID3
+from mutagen.id3._frames import TIT2, TPE1, TALB, TDRC
+from mutagen.ogg import OggPage
+
+from utils.get_tags import get_tags, id3_remap
+
+# MPEG-1 Layer III, 128kbps, 44.1kHz, no padding = 417 byte frames
+MP3_FRAME = b"\xff\xfb\x90\x00" + bytes(413)
+SAMPLE_RATE = 44100
+LENGTH_SECONDS = 180
+
+
+def write_mp3(filepath: str) -> None:
+    with open(filepath, "wb") as f:
+        f.write(MP3_FRAME * 40)
+
+
+def write_wav(filepath: str) -> None:
+    with wave.open(filepath, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(bytes(SAMPLE_RATE * 4))
+
+
+def write_flac(filepath: str) -> None:
+    """Just the fLaC marker and a STREAMINFO block - no audio frames"""
+    channels, bits = 2, 16
+    packed = (SAMPLE_RATE << 44) | ((channels - 1) << 41) | ((bits - 1) << 36) | (SAMPLE_RATE * LENGTH_SECONDS)
+    info = struct.pack(">HH", 4096, 4096) + bytes(6) + packed.to_bytes(8, "big") + bytes(16)
+    with open(filepath, "wb") as f:
+        f.write(b"fLaC" + b"\x80" + len(info).to_bytes(3, "big") + info)
+
+
+def write_ogg_pages(filepath: str, packets: list[bytes], last_position: int) -> None:
+    """One packet per page, the last page's granule position gives the length"""
+    with open(filepath, "wb") as f:
+        for sequence, packet in enumerate(packets):
+            page = OggPage()
+            page.serial = 1
+            page.sequence = sequence
+            page.packets = [packet]
+            page.first = sequence == 0
+            page.last = sequence == len(packets) - 1
+            page.position = last_position if page.last else 0
+            f.write(page.write())
+
+
+def write_ogg(filepath: str) -> None:
+    identification = b"\x01vorbis" + struct.pack("<IBIiiiBB", 0, 2, SAMPLE_RATE, 0, 128000, 0, 0xB8, 1)
+    comment = b"\x03vorbis" + struct.pack("<I", 5) + b"bench" + struct.pack("<I", 0) + b"\x01"
+    setup = b"\x05vorbis" + bytes(10)
+    write_ogg_pages(filepath, [identification, comment, setup, bytes(10)], SAMPLE_RATE * LENGTH_SECONDS)
+
+
+def write_opus(filepath: str) -> None:
+    head = b"OpusHead" + struct.pack("<BBHIhB", 1, 2, 312, 48000, 0, 0)
+    tags = b"OpusTags" + struct.pack("<I", 5) + b"bench" + struct.pack("<I", 0)
+    write_ogg_pages(filepath, [head, tags, bytes(10)], 48000 * LENGTH_SECONDS + 312)
+
+
+def atom(name: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(data)) + name + data
+
+
+def write_m4a(filepath: str) -> None:
+    """The atoms mutagen needs for the stream info (moov/trak/mdia), and an empty mdat"""
+    mvhd = atom(b"mvhd", bytes(12) + struct.pack(">II", 1000, LENGTH_SECONDS * 1000) + bytes(80))
+    mdhd = atom(b"mdhd", bytes(12) + struct.pack(">II", SAMPLE_RATE, SAMPLE_RATE * LENGTH_SECONDS) + bytes(4))
+    hdlr = atom(b"hdlr", bytes(8) + b"soun" + bytes(13))
+    mp4a = atom(b"mp4a", bytes(6) + struct.pack(">H", 1) + bytes(8) + struct.pack(">HHHHI", 2, 16, 0, 0, SAMPLE_RATE << 16) + atom(b"free", b""))
+    stbl = atom(b"stbl", atom(b"stsd", bytes(4) + struct.pack(">I", 1) + mp4a) + atom(b"stco", bytes(8)))
+    mdia = atom(b"mdia", mdhd + hdlr + atom(b"minf", stbl))
+    moov = atom(b"moov", mvhd + atom(b"trak", atom(b"tkhd", bytes(84)) + mdia))
+    with open(filepath, "wb") as f:
+        f.write(atom(b"ftyp", b"M4A \0\0\0\0M4A mp42isom") + moov + atom(b"mdat", bytes(100)))
+
+
+WRITERS = {
+    "mp3": write_mp3,
+    "wav": write_wav,
+    "flac": write_flac,
+    "ogg": write_ogg,
+    "opus": write_opus,
+    "m4a": write_m4a,
+}
+
+
+def create_synthetic_library(root: str, count: int) -> dict[str, list[str]]:
+    """
+    Writes `count` tiny tagged files of every format into `root`
+    Every 10th file has no title tag, so the fallback title gets exercised
+    Returns {extension: [filepaths]}
+    """
+    files = defaultdict(list)
+    for extension, writer in WRITERS.items():
+        directory = os.path.join(root, extension)
+        os.makedirs(directory, exist_ok=True)
+        for i in range(count):
+            filepath = os.path.join(directory, f"{i:06d} - track.{extension}")
+            writer(filepath)
+            audio = File(filepath, easy=True)
+            if audio.tags is None:
+                audio.add_tags()
+            if isinstance(audio.tags, ID3):
+                if i % 10:
+                    audio.tags.add(TIT2(encoding=3, text=[f"track {i}"]))
+                audio.tags.add(TPE1(encoding=3, text=[f"artist {i // 100}"]))
+                audio.tags.add(TALB(encoding=3, text=["album"]))
+                audio.tags.add(TDRC(encoding=3, text=["2019-03-01"]))
+            else:
+                if i % 10:
+                    audio["title"] = [f"track {i}"]
+                audio["artist"] = [f"artist {i // 100}"]
+                audio["album"] = ["album"]
+                audio["date"] = ["2019-03-01"]
+            audio.save()
+            files[extension].append(filepath)
+    return files
+
+
+def find_library_files(root: str) -> dict[str, list[str]]:
+    """Every file under `root`, grouped by extension"""
+    files = defaultdict(list)
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            extension = os.path.splitext(filename)[1].lower().lstrip(".")
+            if extension:
+                files[extension].append(os.path.join(dirpath, filename))
+    return files
+
+
+def time_tags(files: list[str]) -> tuple[float, int]:
+    """Returns (seconds taken to read & remap the tags of every file, how many failed)"""
+    failed = 0
+    start = perf_counter()
+    for filepath in files:
+        tags, fail_reason = get_tags(filepath)
+        if fail_reason or not id3_remap(tags):
+            failed += 1
+    return perf_counter() - start, failed
+
+
+def main():
+    """
+    Times get_tags() + id3_remap() per format, in files/sec
+    Usage (from the repo root):
+        python -m tests.benchmark_tags [file_count]      - synthetic files of every format
+        python -m tests.benchmark_tags /path/to/music    - a real library
+    """
+    argument = sys.argv[1] if len(sys.argv) > 1 else "2000"
+    root = None
+    try:
+        if os.path.isdir(argument):
+            files = find_library_files(argument)
+        else:
+            root = tempfile.mkdtemp(prefix="musicpom_bench_")
+            print(f"creating {argument} files per format in {root}")
+            files = create_synthetic_library(root, int(argument))
+        for extension, paths in sorted(files.items()):
+            seconds, failed = time_tags(paths)
+            print(
+                f"{extension:>5}: {len(paths):6d} files | {seconds:.2f}s | "
+                f"{len(paths) / seconds:.0f} files/sec | {failed} failed"
+            )
+    finally:
+        if root:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import shutil
+import tempfile
+from time import perf_counter
+
+from utils.audio_file_walker import AudioFileWalker
+
+EXTENSIONS = ["mp3", "wav", "ogg", "flac", "opus", "m4a"]
+# what a music folder usually has besides music
+OTHER_FILES = ["cover.jpg", "folder.jpg", "notes.txt", "playlist.m3u", "rip.log", "rip.cue"]
+
+
+def create_synthetic_tree(root: str, count: int, per_album: int = 12, albums_per_artist: int = 4) -> None:
+    """`count` empty audio files, as artist/album/track folders, plus the usual non-audio clutter"""
+    for i in range(count):
+        album = i // per_album
+        directory = os.path.join(root, f"artist_{album // albums_per_artist:05d}", f"album_{album:06d}")
+        if i % per_album == 0:
+            os.makedirs(directory, exist_ok=True)
+            for filename in OTHER_FILES:
+                open(os.path.join(directory, filename), "wb").close()
+        open(os.path.join(directory, f"{i:07d} - track.{EXTENSIONS[i % len(EXTENSIONS)]}"), "wb").close()
+
+
+def legacy_walk(directories: list[str]) -> list[str]:
+    """The old scan - os.walk, and every extension checked against every file"""
+    files = []
+    for directory in directories:
+        for dirpath, _, filenames in os.walk(directory):
+            for file in filenames:
+                filename = os.path.join(dirpath, file)
+                if any(filename.lower().endswith(ext) for ext in EXTENSIONS):
+                    files.append(filename)
+    return files
+
+
+def time_walk(walk, directories: list[str]) -> tuple[float, int]:
+    """Returns (seconds taken, files found)"""
+    start = perf_counter()
+    found = sum(1 for _ in walk(directories))
+    return perf_counter() - start, found
+
+
+def main():
+    """
+    Times finding the audio files in a library, old os.walk scan vs AudioFileWalker
+    Usage (from the repo root):
+        python -m tests.benchmark_walk [file_count]    - a synthetic library
+        python -m tests.benchmark_walk /path/to/music  - a real library (try it on a network drive)
+    """
+    argument = sys.argv[1] if len(sys.argv) > 1 else "100000"
+    root = None
+    try:
+        if os.path.isdir(argument):
+            directories = [argument]
+        else:
+            root = tempfile.mkdtemp(prefix="musicpom_bench_")
+            print(f"creating {argument} files in {root}")
+            create_synthetic_tree(root, int(argument))
+            directories = [root]
+        # the first walk warms the os cache for the rest
+        legacy_walk(directories)
+        walks = [("os.walk + any()", legacy_walk)]
+        for workers in (1, 4, 16):
+            walker = AudioFileWalker(EXTENSIONS, workers=workers)
+            walks.append((f"scandir, {workers} threads", walker.walk_paths))
+        for name, walk in walks:
+            seconds, found = time_walk(walk, directories)
+            print(f"{name:<20}: {found} files | {seconds:.2f}s | {found / seconds:.0f} files/sec")
+    finally:
+        if root:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import sys
+import subprocess
+from pathlib import Path
+
+# imported on their own, each in a fresh interpreter - utils & components import each other,
+# so a name exported in the wrong order only breaks one of them
+MODULES = ["utils", "components", "ui"] + [
+    f"tests.{path.stem}" for path in sorted(Path(__file__).parent.glob("benchmark_*.py"))
+]
+
+
+def main():
+    """
+    Checks that every package imports on its own, whatever was (or wasn't) imported before it
+
+    Usage (from the repo root): python -m tests.check_imports
+    """
+    failed = []
+    for module in MODULES:
+        result = subprocess.run([sys.executable, "-c", f"import {module}"], capture_output=True, text=True)
+        if result.returncode:
+            failed.append(module)
+            print(f"{module}: FAILED\n{result.stderr.strip().splitlines()[-1]}")
+        else:
+            print(f"{module}: ok")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
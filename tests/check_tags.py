@@ -0,0 +1,86 @@
+import os
+import sys
+import shutil
+import sqlite3
+import tempfile
+
+# update_art_hash writes song.art_hash - point DBAccess at a throwaway database
+root = tempfile.mkdtemp(prefix="musicpom_check_")
+os.environ["XDG_CONFIG_HOME"] = root
+os.makedirs(os.path.join(root, "musicpom"))
+db_path = os.path.join(root, "musicpom", "library.db")
+with open(os.path.join(root, "musicpom", "config.ini"), "w") as f:
+    f.write(f"[settings]\ndb = {db_path}\n")
+
+import DBA  # noqa: E402
+from tests.benchmark_tags import WRITERS  # noqa: E402
+from utils.get_tags import get_tags, id3_remap  # noqa: E402
+from utils.set_tag import set_tag  # noqa: E402
+from utils.set_album_art import set_album_art  # noqa: E402
+from utils.delete_album_art import delete_album_art  # noqa: E402
+
+# what gets written, and what id3_remap should read back
+EDITS = {
+    "title": ("edited title", "edited title"),
+    "artist": ("edited artist", "edited artist"),
+    "album_artist": ("edited album artist", "edited album artist"),
+    "track_number": ("7", "7"),
+    "album_date": ("2019-03-01", "2019-03-01"),
+    "lyrics": ("la la la", "la la la"),
+}
+ART = "assets/default_album_art.jpg"
+
+
+def check(extension: str, directory: str) -> list[str]:
+    """Edits a synthetic file of one format, then reads it back the way a rescan does"""
+    filepath = os.path.join(directory, f"song.{extension}")
+    WRITERS[extension](filepath)
+    with open(filepath, "rb") as f:
+        head = f.read(4)
+    problems = []
+    for db_column, (value, _) in EDITS.items():
+        if not set_tag(filepath, db_column, value):
+            problems.append(f"set_tag({db_column}) failed")
+    set_album_art(filepath, ART)
+    tags = id3_remap(get_tags(filepath)[0])
+    for db_column, (_, expected) in EDITS.items():
+        key = "date" if db_column == "album_date" else db_column
+        if tags.get(key) != expected:
+            problems.append(f"{db_column}: wrote {expected!r}, read back {tags.get(key)!r}")
+    if not tags.get("art_hash"):
+        problems.append("album art wasn't written")
+    with open(filepath, "rb") as f:
+        if extension != "mp3" and f.read(4) != head:
+            problems.append("the file's header changed (an ID3 tag got prepended?)")
+    delete_album_art(filepath)
+    if id3_remap(get_tags(filepath)[0]).get("art_hash"):
+        problems.append("album art wasn't deleted")
+    return problems
+
+
+def main():
+    """
+    Edits tags & album art in a file of every format the scanner reads, and reads them back
+
+    Usage (from the repo root): python -m tests.check_tags
+    """
+    with DBA.DBAccess() as db:
+        db.connection.executescript(open("sql/init.sql").read())
+    directory = os.path.join(root, "library")
+    os.makedirs(directory)
+    failed = False
+    try:
+        for extension in WRITERS:
+            problems = check(extension, directory)
+            print(f"{extension}: {'ok' if not problems else 'FAILED'}")
+            for problem in problems:
+                print(f"    {problem}")
+            failed = failed or bool(problems)
+    finally:
+        DBA.close_connections()
+        shutil.rmtree(root)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,10 @@ from PyQt5.QtCore import (
     pyqtSlot,
     QRunnable,
 )
-from logging import error
+from inspect import signature
+from logging import debug, error
+from utils.cancellation_token import CancellationToken, JobCancelled
+from utils.progress_reporter import ProgressReporter
 from sys import exc_info
 from traceback import format_exc, print_exc
 
@@ -31,6 +34,10 @@ class WorkerSignals(QObject):
     signal_result: pyqtSignal = pyqtSignal(object)
     signal_finished: pyqtSignal = pyqtSignal()
     signal_progress: pyqtSignal = pyqtSignal(str)
+    # Progress, from progress_callback.start() / advance() - a few times a second at most
+    signal_progress_update: pyqtSignal = pyqtSignal(object)
+    # the job stopped early because it was cancelled (signal_finished still follows)
+    signal_cancelled: pyqtSignal = pyqtSignal()
 
 
 class Worker(QRunnable):
@@ -55,7 +62,19 @@ class Worker(QRunnable):
         self.signals: WorkerSignals = WorkerSignals()
 
         # Add a callback to our kwargs
-        self.kwargs["progress_callback"] = self.signals.signal_progress
+        # - throttled, so a job working through lots of files doesn't flood the gui with signals
+        self.progress: ProgressReporter = ProgressReporter(
+            self.signals.signal_progress, self.signals.signal_progress_update
+        )
+        self.kwargs["progress_callback"] = self.progress
+        # functions that can stop part way take a `cancel_token`, see JobScheduler.cancel()
+        self.cancel_token: CancellationToken = CancellationToken()
+        try:
+            if "cancel_token" in signature(fn).parameters:
+                self.kwargs["cancel_token"] = self.cancel_token
+        except (TypeError, ValueError):
+            # builtins etc. - no signature to look at
+            pass
 
     @pyqtSlot()
     def run(self) -> None:  # type: ignore
@@ -65,15 +84,28 @@ class Worker(QRunnable):
 
         Initialize the runner function with passed args & kwargs
         """
+        if self.cancel_token.is_cancelled():
+            # cancelled while it was waiting to start
+            self.signals.signal_cancelled.emit()
+            self.signals.signal_finished.emit()
+            return
         self.signals.signal_started.emit()
         try:
             result = self.fn(*self.args, **self.kwargs)
+        except JobCancelled:
+            debug(f"Worker cancelled: {self.fn}")
+            self.progress.finish()
+            self.signals.signal_cancelled.emit()
+            self.signals.signal_finished.emit()
         except Exception:
             print_exc()
             exctype, value = exc_info()[:2]
-            self.signals.signal_finished.emit((exctype, value, format_exc()))
+            self.progress.finish()
             error(f"Worker failed: {exctype} | {value} | {format_exc()}")
+            # signal_finished takes no arguments - the error is in the log above
+            self.signals.signal_finished.emit()
         else:
+            self.progress.finish()
             if result:
                 self.signals.signal_finished.emit()
                 self.signals.signal_result.emit(result)
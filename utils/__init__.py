@@ -1,10 +1,18 @@
 from .fft_analyser import FFTAnalyser
 from .convert_id3_timestamp_to_datetime import convert_id3_timestamp_to_datetime
 from .initialize_db import initialize_db
+from .update_database_schema import update_database_schema
 from .safe_get import safe_get
 from .get_album_art import get_album_art
+from .art_cache import get_album_art_thumbnail, get_art_pixmap, update_art_hash
+from .get_now_playing import get_now_playing
+from .prefetch_song import prefetch_song, warm_file_cache
 from .get_tags import get_tags, id3_remap
+from .get_tags_parallel import get_tags_parallel
+from .scan_pipeline import buffered, stat_files
+from .audio_file_walker import AudioFileWalker, get_audio_suffixes
 from .get_reorganize_vars import get_reorganize_vars
+from .reorganize_files import reorganize_files, recover_reorganize_files
 from .set_tag import set_tag
 from .delete_song_id_from_database import delete_song_id_from_database
 from .batch_delete_filepaths_from_database import batch_delete_filepaths_from_database
@@ -12,9 +20,15 @@ from .batch_delete_filepaths_from_playlist import batch_delete_filepaths_from_pl
 from .delete_and_create_library_database import delete_and_create_library_database
 from .update_song_in_database import update_song_in_database
 from .scan_for_music import scan_for_music
+from .fts_match_query import fts_match_query, fts_weights
 from .add_files_to_database import add_files_to_database
 from .convert_date_str_to_tyer_tdat_id3_tag import convert_date_str_to_tyer_tdat_id3_tag
 from .set_album_art import set_album_art
 from .delete_album_art import delete_album_art
+from .progress_reporter import Progress, ProgressReporter
+from .cancellation_token import CancellationToken, JobCancelled
 from .Worker import Worker
+from .job_scheduler import Job, JobPriority, JobScheduler
+from .library_watcher import LibraryWatcher
 from .export_playlist_by_id import export_playlist_by_id
+from .waveform_peaks import WaveformPeaks, get_waveform_peaks, load_waveform_peaks, generate_waveform_peaks
@@ -1,17 +1,41 @@
+import os
 import DBA
+from collections.abc import Iterable, Sized
 from logging import debug
-from utils import get_tags, id3_remap
+from time import perf_counter
+from utils import get_tags_parallel
 from configparser import ConfigParser
 from pathlib import Path
 from appdirs import user_config_dir
+from utils.cancellation_token import CancellationToken
 
+insert_song_sql = (
+    "INSERT OR IGNORE INTO song (filepath, title, album, artist, track_number, genre, codec, album_date, bitrate, length_seconds, file_size, file_mtime, file_inode, album_artist, lyrics, art_hash) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+# Same as above, but existing rows (same filepath) get their tags refreshed
+# - keeps the song id, so playlists don't lose the song
+upsert_song_sql = insert_song_sql.replace("INSERT OR IGNORE", "INSERT") + (
+    " ON CONFLICT(filepath) DO UPDATE SET title = excluded.title, album = excluded.album, artist = excluded.artist, "
+    "track_number = excluded.track_number, genre = excluded.genre, codec = excluded.codec, album_date = excluded.album_date, "
+    "bitrate = excluded.bitrate, length_seconds = excluded.length_seconds, file_size = excluded.file_size, "
+    "file_mtime = excluded.file_mtime, file_inode = excluded.file_inode, album_artist = excluded.album_artist, "
+    "lyrics = excluded.lyrics, art_hash = excluded.art_hash"
+)
+# rows are inserted in batches of this many, or whatever has been read every INSERT_INTERVAL seconds
+INSERT_BATCH_SIZE = 1000
+INSERT_INTERVAL = 0.5
 
-def add_files_to_database(files: list[str], playlist_id: int | None = None, progress_callback=None) -> tuple[bool, dict[str, str]]:
+
+def add_files_to_database(files: Iterable[str], playlist_id: int | None = None, replace_existing: bool = False, progress_callback=None, cancel_token: CancellationToken | None = None) -> tuple[bool, dict[str, str]]:
     """
     Adds audio file(s) to the sqllite db "song" table
     Args:
-        files: list() of fully qualified paths to audio file(s)
+        files: fully qualified paths to audio file(s) - a list, or a generator that's still finding them
+            (see scan_pipeline.py). Songs are inserted as they're read, not after every file is found
+        replace_existing: update the tags of files that are already in the library, instead of skipping them
         progress_callback: emit data for user feedback
+        cancel_token: stops early - songs read so far are still inserted, then JobCancelled is raised
 
     Returns a tuple where the first value is the success state
     and the second value is a list of failed to add items
@@ -28,60 +52,72 @@ def add_files_to_database(files: list[str], playlist_id: int | None = None, prog
         Path(user_config_dir(appname="musicpom", appauthor="billypom")) / "config.ini"
     )
     _ = config.read(cfg_file)
-    if not files:
-        return False, {"Failure": "All operations failed in add_files_to_database()"}
     failed_dict: dict[str, str] = {}
-    insert_data: list[tuple[
-    str, 
-    str | int | None, 
-    str | int | None, 
-    str | int | None, 
-    str | int | None, 
-    str | int | None, 
-    str, 
-    str | int | None, 
-    str | int | None, 
-    str | int | None]] = []  # To store data for batch insert
-    for filepath in files:
+    insert_data: list[tuple] = []  # To store data for batch insert
+    sql = upsert_song_sql if replace_existing else insert_song_sql
+    workers = config.getint("settings", "tag_workers", fallback=0)
+    file_count = 0
+    last_insert = perf_counter()
+    if progress_callback:
+        # a generator doesn't know how many files it'll find
+        progress_callback.start(len(files) if isinstance(files, Sized) else None, "Adding songs")
+    # tags are read across a pool of processes, a few chunks ahead of here
+    for filepath, audio, fail_reason in get_tags_parallel(files, workers):
+        if cancel_token and cancel_token.is_cancelled():
+            break
+        file_count += 1
         if progress_callback:
-            progress_callback.emit(filepath)
-        filename = filepath.split("/")[-1]
-        tags, fail_reason = get_tags(filepath)
+            progress_callback.advance(item=filepath)
         if fail_reason:
             # if we fail to get audio tags, skip to next song
             failed_dict[filepath] = fail_reason
             continue
-        # remap tags from ID3 to database tags
-        audio: dict[str, str | int | None] = id3_remap(tags)
+        try:
+            stat = os.stat(filepath)
+        except OSError as e:
+            failed_dict[filepath] = f"Could not stat file: {e}"
+            continue
         # Append data tuple to insert_data list
-        insert_data.append(
-            (
-                filepath,
-                audio["title"],
-                audio["album"],
-                audio["artist"],
-                audio["track_number"],
-                audio["genre"],
-                filename.split(".")[-1],
-                audio["date"],
-                audio["bitrate"],
-                audio["length"],
-            )
-        )
-        # Check if batch size is reached
-        if len(insert_data) >= 1000:
+        insert_data.append(get_song_row(filepath, audio, stat))
+        # Check if batch size is reached, or the last batch was a while ago
+        if len(insert_data) >= INSERT_BATCH_SIZE or perf_counter() - last_insert >= INSERT_INTERVAL:
             debug(f"inserting a LOT of songs: {len(insert_data)}")
             with DBA.DBAccess() as db:
-                db.executemany(
-                    "INSERT OR IGNORE INTO song (filepath, title, album, artist, track_number, genre, codec, album_date, bitrate, length_seconds) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);",
-                    insert_data,
-                )
+                db.executemany(sql, insert_data)
             insert_data = []  # Reset the insert_data list
+            last_insert = perf_counter()
     # Insert any remaining data after reading every file
     if insert_data:
         with DBA.DBAccess() as db:
-            db.executemany(
-                "INSERT OR IGNORE INTO song (filepath, title, album, artist, track_number, genre, codec, album_date, bitrate, length_seconds) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);",
-                insert_data,
-            )
+            db.executemany(sql, insert_data)
+    if cancel_token:
+        cancel_token.raise_if_cancelled()
+    if not file_count:
+        return False, {"Failure": "All operations failed in add_files_to_database()"}
     return True, failed_dict
+
+
+def get_song_row(filepath: str, audio: dict[str, str | int | None], stat: os.stat_result) -> tuple:
+    """
+    Builds the parameters for `insert_song_sql` / `upsert_song_sql`
+    from remapped tags (see `id3_remap()`) and the file's stat() info
+    """
+    filename = filepath.split("/")[-1]
+    return (
+        filepath,
+        audio["title"],
+        audio["album"],
+        audio["artist"],
+        audio["track_number"],
+        audio["genre"],
+        filename.split(".")[-1],
+        audio["date"],
+        audio["bitrate"],
+        audio["length"],
+        stat.st_size,
+        stat.st_mtime_ns,
+        stat.st_ino,
+        audio.get("album_artist"),
+        audio.get("lyrics"),
+        audio.get("art_hash"),
+    )
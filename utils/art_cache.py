@@ -0,0 +1,166 @@
+import os
+import base64
+import binascii
+import hashlib
+import threading
+import DBA
+from collections import OrderedDict
+from logging import debug, error
+from pathlib import Path
+from appdirs import user_cache_dir
+from mutagen import File, FileType
+from mutagen.flac import Picture, error as FLACError
+from mutagen.id3 import ID3
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPixmap
+
+# One scaled down copy of each different album art image, named after get_art_hash()
+art_dir = Path(user_cache_dir(appname="musicpom", appauthor="billypom")) / "art"
+default_image_path = "./assets/default_album_art.jpg"
+# biggest width/height of a thumbnail - the album art view is 250px, this leaves room for hidpi screens
+THUMBNAIL_SIZE = 500
+# how many decoded thumbnails are kept in memory
+PIXMAP_CACHE_SIZE = 64
+
+_pixmaps: OrderedDict[str, QPixmap] = OrderedDict()
+_thumbnail_lock = threading.Lock()
+
+
+def get_art_hash(data: bytes) -> str:
+    """Content hash of an image - the same picture in every song of an album gets the same hash"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def get_apic_data(audio: ID3 | None) -> bytes | None:
+    """The front cover from an ID3 tag, or the first picture if there's no front cover"""
+    if audio is None:
+        return None
+    pictures = audio.getall("APIC")
+    for tag in pictures:
+        if tag.type == 3:  # 3 is the type for front cover
+            return tag.data
+    if pictures:
+        return pictures[0].data
+    return None
+
+
+def get_picture_data(audio: FileType | None) -> bytes | None:
+    """
+    The front cover from any audio file mutagen reads - ID3 (mp3, wav), FLAC pictures,
+    Ogg METADATA_BLOCK_PICTURE comments, or MP4 covr atoms (`cover` for EasyMP4, see get_tags.py)
+    """
+    if audio is None or audio.tags is None:
+        return None
+    if isinstance(audio.tags, ID3):
+        return get_apic_data(audio.tags)
+    pictures = list(getattr(audio, "pictures", []))
+    for value in audio.tags.get("metadata_block_picture") or []:
+        try:
+            pictures.append(Picture(base64.b64decode(value)))
+        except (binascii.Error, FLACError):
+            continue
+    for picture in pictures:
+        if picture.type == 3:
+            return picture.data
+    if pictures:
+        return pictures[0].data
+    covers = audio.tags.get("covr") or audio.tags.get("cover")
+    if covers:
+        return bytes(covers[0])
+    return None
+
+
+def get_thumbnail_path(art_hash: str) -> Path:
+    return art_dir / f"{art_hash}.thumb"
+
+
+def store_thumbnail(data: bytes, art_hash: str | None = None) -> str | None:
+    """
+    Saves a scaled down copy of an image in the art cache, if there isn't one already
+    Uses QImage, not QPixmap, so it's safe off the gui thread
+
+    Returns the image's hash, or None if it isn't an image Qt can read
+    """
+    art_hash = art_hash or get_art_hash(data)
+    thumbnail_path = get_thumbnail_path(art_hash)
+    if thumbnail_path.exists():
+        return art_hash
+    image = QImage()
+    if not image.loadFromData(data):
+        return None
+    if image.width() > THUMBNAIL_SIZE or image.height() > THUMBNAIL_SIZE:
+        image = image.scaled(
+            THUMBNAIL_SIZE,
+            THUMBNAIL_SIZE,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation,
+        )
+    art_dir.mkdir(parents=True, exist_ok=True)
+    # png keeps transparency, jpg for everything else. QImage works out which when loading
+    image_format = "PNG" if image.hasAlphaChannel() else "JPG"
+    with _thumbnail_lock:
+        temp_file = thumbnail_path.with_suffix(f".{threading.get_ident()}.tmp")
+        if not image.save(str(temp_file), image_format, 90):
+            error(f"store_thumbnail() | could not write {temp_file}")
+            return None
+        os.replace(temp_file, thumbnail_path)
+    return art_hash
+
+
+def get_album_art_thumbnail(filepath: str | None) -> tuple[str | None, Path | None]:
+    """
+    Returns the song's (art hash, thumbnail path), or (None, None) if it has no art
+
+    The hash comes from the song table, so most of the time the audio file isn't opened at all.
+    Songs without one yet (added before art_hash existed) get it filled in here
+    """
+    if not filepath:
+        return None, None
+    with DBA.DBAccess() as db:
+        rows = db.query("SELECT art_hash FROM song WHERE filepath = ?;", (filepath,))
+    art_hash = rows[0][0] if rows else None
+    if art_hash == "":
+        # checked already, no art
+        return None, None
+    if art_hash and get_thumbnail_path(art_hash).exists():
+        return art_hash, get_thumbnail_path(art_hash)
+    try:
+        data = get_picture_data(File(filepath))
+    except Exception as e:
+        error(f"get_album_art_thumbnail() | Error retrieving album art: {e}")
+        return None, None
+    art_hash = store_thumbnail(data) if data else None
+    if rows:
+        with DBA.DBAccess() as db:
+            db.execute("UPDATE song SET art_hash = ? WHERE filepath = ?;", (art_hash or "", filepath))
+    if art_hash is None:
+        return None, None
+    debug(f"get_album_art_thumbnail() | {filepath} -> {art_hash}")
+    return art_hash, get_thumbnail_path(art_hash)
+
+
+def get_art_pixmap(art_hash: str | None, thumbnail_path: Path | None) -> QPixmap:
+    """
+    Decoded album art, from an in-memory LRU of the last few images shown
+    Falls back to the placeholder art. Gui thread only (QPixmap)
+    """
+    key = art_hash or ""
+    pixmap = _pixmaps.get(key)
+    if pixmap is not None:
+        _pixmaps.move_to_end(key)
+        return pixmap
+    pixmap = QPixmap()
+    if not thumbnail_path or not pixmap.load(str(thumbnail_path)):
+        key = ""
+        pixmap.load(default_image_path)
+    _pixmaps[key] = pixmap
+    if len(_pixmaps) > PIXMAP_CACHE_SIZE:
+        _pixmaps.popitem(last=False)
+    return pixmap
+
+
+def update_art_hash(filepath: str, data: bytes | None) -> None:
+    """Keeps song.art_hash in step after the art in a file is changed or deleted"""
+    art_hash = store_thumbnail(data) if data else None
+    with DBA.DBAccess() as db:
+        db.execute("UPDATE song SET art_hash = ? WHERE filepath = ?;", (art_hash or "", filepath))
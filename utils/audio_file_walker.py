@@ -0,0 +1,126 @@
+import os
+import re
+import fnmatch
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from configparser import ConfigParser
+from logging import debug
+from utils.scan_pipeline import buffered
+
+# how many directories' worth of files walk() can get ahead of whoever reads it
+QUEUE_SIZE = 64
+
+# folders that never have music worth adding - trash cans & filesystem bookkeeping
+DEFAULT_SKIP_DIRS = (".Trash*", "$RECYCLE.BIN", "System Volume Information", "lost+found")
+
+
+def get_audio_suffixes(extensions: Iterable[str]) -> tuple[str, ...]:
+    """`extensions` from config.ini ("mp3,flac") as a tuple for str.endswith() - (".mp3", ".flac")"""
+    return tuple(f".{ext.strip().lower().lstrip('.')}" for ext in extensions if ext.strip())
+
+
+class AudioFileWalker:
+    """
+    Finds audio files underneath some directories, with os.scandir
+
+    - one endswith() against a tuple of suffixes per file, no per-extension loop
+    - the DirEntry is handed on, so its cached stat() can be used later (see scan_pipeline.stat_files)
+    - hidden files & folders, trash folders and (optionally) other mounted drives are skipped
+    - directories are scanned by a pool of threads, a bounded number ahead of whoever reads the files
+    """
+
+    def __init__(
+        self,
+        extensions: Iterable[str],
+        skip_hidden: bool = True,
+        skip_dirs: Iterable[str] = DEFAULT_SKIP_DIRS,
+        one_filesystem: bool = False,
+        workers: int = 4,
+    ):
+        self.suffixes: tuple[str, ...] = get_audio_suffixes(extensions)
+        self.skip_hidden: bool = skip_hidden
+        # every skip pattern in one regex
+        patterns = [fnmatch.translate(pattern.strip()) for pattern in skip_dirs if pattern.strip()]
+        self.skip_dirs_regex: re.Pattern | None = re.compile("|".join(patterns)) if patterns else None
+        self.one_filesystem: bool = one_filesystem
+        self.workers: int = max(1, workers)
+
+    @classmethod
+    def from_config(cls, config: ConfigParser) -> "AudioFileWalker":
+        skip_dirs = config.get("settings", "scan_skip_dirs", fallback=",".join(DEFAULT_SKIP_DIRS))
+        return cls(
+            config.get("settings", "extensions").split(","),
+            skip_hidden=config.getboolean("settings", "scan_skip_hidden", fallback=True),
+            skip_dirs=skip_dirs.split(","),
+            one_filesystem=config.getboolean("settings", "scan_one_filesystem", fallback=False),
+            workers=config.getint("settings", "scan_workers", fallback=4),
+        )
+
+    def scan_directory(
+        self, path: str, device: int | None
+    ) -> tuple[list[os.DirEntry], list[tuple[str, int | None]]]:
+        """
+        One directory's audio files, and its subdirectories that should be walked
+        `device` is the st_dev of the library folder, if other filesystems are being skipped
+        """
+        files: list[os.DirEntry] = []
+        subdirectories: list[tuple[str, int | None]] = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if self.skip_hidden and name.startswith("."):
+                        continue
+                    try:
+                        # symlinked folders aren't followed, same as os.walk()
+                        if entry.is_dir(follow_symlinks=False):
+                            if self.skip_dirs_regex is not None and self.skip_dirs_regex.match(name):
+                                continue
+                            if device is not None and entry.stat(follow_symlinks=False).st_dev != device:
+                                debug(f"AudioFileWalker | not crossing into {entry.path}")
+                                continue
+                            subdirectories.append((entry.path, device))
+                        elif name.lower().endswith(self.suffixes) and entry.is_file():
+                            files.append(entry)
+                    except OSError:
+                        continue
+        except OSError as e:
+            debug(f"AudioFileWalker | could not scan {path}: {e}")
+        return files, subdirectories
+
+    def iter_directories(self, directories: Iterable[str]) -> Iterator[list[os.DirEntry]]:
+        """
+        Yields each directory's audio files (DirEntry's), in no particular order
+        Every library folder and subdirectory is a separate job for the thread pool,
+        only a few more than there are threads get scanned ahead of what's been read
+        """
+        waiting: deque[tuple[str, int | None]] = deque()
+        for directory in directories:
+            try:
+                device = os.stat(directory).st_dev if self.one_filesystem else None
+            except OSError as e:
+                debug(f"AudioFileWalker | could not scan {directory}: {e}")
+                continue
+            waiting.append((directory, device))
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while waiting or pending:
+                while waiting and len(pending) < self.workers * 4:
+                    pending.append(executor.submit(self.scan_directory, *waiting.popleft()))
+                files, subdirectories = pending.popleft().result()
+                waiting.extend(subdirectories)
+                if files:
+                    yield files
+
+    def walk(self, directories: Iterable[str]) -> Iterator[os.DirEntry]:
+        """
+        A DirEntry for every audio file - iter_directories(), run on its own thread
+        through a bounded queue (see scan_pipeline.buffered). A directory at a time goes through the queue
+        """
+        for files in buffered(self.iter_directories(directories), QUEUE_SIZE):
+            yield from files
+
+    def walk_paths(self, directories: Iterable[str]) -> Iterator[str]:
+        """walk(), but just the filepaths"""
+        return (entry.path for entry in self.walk(directories))
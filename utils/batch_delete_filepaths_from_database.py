@@ -33,6 +33,8 @@ def batch_delete_filepaths_from_database(
         )
         dialog.exec_()
         return False
+    if progress_callback:
+        progress_callback.start(len(song_ids), "Deleting songs")
     try:
         with DBA.DBAccess() as db:
             # Batch delete in chunks
@@ -48,7 +50,7 @@ def batch_delete_filepaths_from_database(
                 query = f"DELETE FROM song WHERE id in ({placeholders});"
                 db.execute(query, chunk)
                 if progress_callback:
-                    progress_callback.emit(f"Deleting songs: {i}")
+                    progress_callback.advance(len(chunk))
 
     except Exception as e:
         logging.error(
@@ -33,6 +33,8 @@ def batch_delete_filepaths_from_playlist(
         )
         dialog.exec_()
         return False
+    if progress_callback:
+        progress_callback.start(len(song_ids), "Deleting songs")
     try:
         with DBA.DBAccess() as db:
             # Batch delete in chunks
@@ -45,7 +47,7 @@ def batch_delete_filepaths_from_playlist(
                 db.execute(query, chunk)
 
                 if progress_callback:
-                    progress_callback.emit(f"Deleting songs: {i}")
+                    progress_callback.advance(len(chunk))
 
     except Exception as e:
         error(
@@ -0,0 +1,32 @@
+import threading
+
+
+class JobCancelled(Exception):
+    """Raised by CancellationToken.raise_if_cancelled() - Worker treats it as a clean stop, not an error"""
+
+
+class CancellationToken:
+    """
+    Asks a running job to stop. The job has to check for it - nothing is interrupted
+
+    Worker passes one as `cancel_token` to any function that takes that argument
+    ```
+    for filepath in files:
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        ...
+    ```
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._cancelled.is_set():
+            raise JobCancelled()
@@ -1,18 +1,29 @@
 import datetime
 from mutagen.id3._specs import ID3TimeStamp
 
+# longest first - a timestamp can be cut down to just the year
+DATE_FORMATS = ("%Y-%m-%d", "%Y%m%d", "%Y-%m", "%Y")
+
 
 def convert_id3_timestamp_to_datetime(timestamp):
-    """Turns a mutagen ID3TimeStamp into a format that SQLite can use for Date field"""
+    """
+    Turns a mutagen ID3TimeStamp into a format that SQLite can use for Date field
+    Also takes the plain date strings other formats use (vorbis comments, mp4 ©day) - "2019", "2019-03-01T12:00:00Z"...
+    Returns None if there's no date, or it can't be read
+    """
     if timestamp is None:
         return
-    if not isinstance(timestamp, ID3TimeStamp):
-        return
-    if len(timestamp.text) == 4:  # If only year is provided
-        datetime_obj = datetime.datetime.strptime(timestamp.text, "%Y")
+    if isinstance(timestamp, ID3TimeStamp):
+        text = timestamp.text
+    elif isinstance(timestamp, str):
+        text = timestamp
     else:
+        return
+    # drop any time of day
+    text = text.strip().split("T")[0].split(" ")[0]
+    for date_format in DATE_FORMATS:
         try:
-            datetime_obj = datetime.datetime.strptime(timestamp.text, "%Y-%m-%d")
+            datetime_obj = datetime.datetime.strptime(text, date_format)
         except ValueError:
-            datetime_obj = datetime.datetime.strptime(timestamp.text, "%Y%m%d")
-    return datetime_obj.strftime("%Y-%m-%d")
+            continue
+        return datetime_obj.strftime("%Y-%m-%d")
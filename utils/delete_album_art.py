@@ -1,11 +1,15 @@
 from logging import debug, warning, error
+from mutagen import FileType
+from mutagen.flac import FLAC
 from mutagen.id3 import ID3
 from traceback import print_exc, format_exc
 from sys import exc_info
+from utils.art_cache import get_apic_data, get_picture_data, update_art_hash
+from utils.get_tags import get_tags_for_writing
 
 
 def delete_album_art(file: str) -> bool:
-    """Deletes the album art (APIC tag) for a specific song
+    """Deletes the album art (APIC tag, or the format's own picture for flac, ogg & m4a) for a specific song
 
     Args:
         `file`: fully qualified path to an audio file
@@ -15,14 +19,25 @@ def delete_album_art(file: str) -> bool:
     """
     try:
         debug("Deleting album art")
-        audio = ID3(file)
-        debug(audio)
-        if "APIC:" in audio:
-            del audio["APIC:"]
+        audio = get_tags_for_writing(file)
+        tags = audio.tags if isinstance(audio, FileType) else audio
+        debug(tags)
+        if isinstance(tags, ID3) and tags.getall("APIC"):
+            # set_album_art() names its APIC "Cover", so it isn't always APIC:
+            tags.delall("APIC")
             debug("Deleting album art for real this time")
-            audio.save()
+            audio.save(file)
+        elif isinstance(audio, FLAC) and audio.pictures:
+            audio.clear_pictures()
+            audio.save(file)
+        elif not isinstance(tags, ID3) and ("cover" in tags or "metadata_block_picture" in tags):
+            for key in ("cover", "metadata_block_picture"):
+                if key in tags:
+                    del tags[key]
+            audio.save(file)
         else:
             warning("delete_album_art_for_current_song() | no tag called APIC")
+        update_art_hash(file, get_apic_data(audio) if isinstance(audio, ID3) else get_picture_data(audio))
         return True
     except Exception:
         print_exc()
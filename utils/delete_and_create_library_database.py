@@ -1,5 +1,6 @@
 import DBA
 from logging import debug
+from utils.initialize_db import create_song_fts
 
 
 def delete_and_create_library_database():
@@ -10,3 +11,5 @@ def delete_and_create_library_database():
             debug(f"executing [{statement}]")
             with DBA.DBAccess() as db:
                 db.execute(statement, ())
+    with DBA.DBAccess() as db:
+        create_song_fts(db)
@@ -2,26 +2,34 @@
 # https://github.com/ravenkls/MilkPlayer/blob/master/audio/fft_analyser.py
 
 import time
+import threading
 from PyQt5 import QtCore
-from pydub import AudioSegment
 import numpy as np
-from scipy.ndimage.filters import gaussian_filter1d
+from scipy.ndimage import gaussian_filter1d
 from logging import debug, info
 from PyQt5.QtMultimedia import QMediaPlayer
+from utils.spectrum import log_band_amplitudes, decay_points
+from utils.pcm_stream import PCMStream
+from utils.pcm_cache import CACHE_FRAME_RATE, CachedPCM, FillingPCM, open_pcm
 
 
 class FFTAnalyser(QtCore.QThread):
-    """Analyses a song using FFTs."""
+    """
+    Analyses a song using FFTs.
+
+    Only runs while there is something to show - a song playing (or fading out after a pause)
+    in a visible window - otherwise the thread sleeps until the player or the window wakes it up.
+    The player's position comes in through its signals, instead of asking it from this thread
+    """
 
     calculatedVisual = QtCore.pyqtSignal(np.ndarray)
     calculatedVisualRs = QtCore.pyqtSignal(np.ndarray)
+    # lowest & highest band, in Hz - changes with the sample rate, see get_frequency_range()
+    frequencyRangeChanged = QtCore.pyqtSignal(float, float)
 
     def __init__(self, player, x_resolution):  # noqa: F821
         super().__init__()
         self.player = player
-        self.reset_media()
-        self.player.currentMediaChanged.connect(self.reset_media)
-
         self.resolution = x_resolution
         # this length is a number, in seconds, of how much audio is sampled to determine the frequencies
         # of the audio at a specific point in time
@@ -29,130 +37,238 @@ class FFTAnalyser(QtCore.QThread):
         self.sampling_window_length = 0.05
         self.visual_delta_threshold = 1000
         self.sensitivity = 10
+        # songs are decoded to mono at this rate (the same as the cache), so the bands go up to 11 kHz
+        # in file mode - the probe gets whatever rate the player outputs
+        self.frame_rate = CACHE_FRAME_RATE
+        self.stream: CachedPCM | FillingPCM | PCMStream | None = None
+        # probe mode - analyse what the player is actually outputting (see feed_samples),
+        # instead of decoding the file a second time
+        self.use_probe = False
+        self.probe_samples = np.zeros(0, dtype=np.float32)
+        self.probe_max_sample = 1.0
+        self.probe_frame_rate = self.frame_rate
+        self.start_animate = False
+        self.points = np.zeros(self.resolution)
+
+        # frames per second - lowered when frames take more than `cpu_budget` of a core to work out
+        self.max_fps = 30
+        self.min_fps = 10
+        self.cpu_budget = 0.25
+        self.frame_interval = 1 / self.max_fps
+
+        # playback state, kept up to date by the player's signals (on the gui thread)
+        self.lock = threading.Lock()
+        self.active = threading.Event()  # set = work out frames, clear = sleep
+        self.playing = False
+        self.visible = True
+        self.playback_rate = 1.0
+        # last position the player reported, and when - extrapolated between reports
+        self.position_ms = 0
+        self.position_time = time.perf_counter()
+
+        self.reset_media()
+        self.player.currentMediaChanged.connect(self.reset_media)
+        self.player.stateChanged.connect(self.on_state_changed)
+        self.player.positionChanged.connect(self.on_position_changed)
+        self.player.playbackRateChanged.connect(self.on_playback_rate_changed)
+        self.on_state_changed(self.player.state())
 
     def reset_media(self):
         """Resets the media to the currently playing song."""
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
         audio_file = self.player.currentMedia().canonicalUrl().path()
         # if os.name == "nt" and audio_file.startswith("/"):
         #     audio_file = audio_file[1:]
-        if audio_file:
-            try:
-                self.song = AudioSegment.from_file(audio_file).set_channels(1)
-            except PermissionError:
-                self.start_animate = False
-            else:
-                self.samples = np.array(self.song.get_array_of_samples())
-
-                self.max_sample = self.samples.max()
-                self.points = np.zeros(self.resolution)
-                self.start_animate = True
+        if audio_file and self.use_probe:
+            # samples come from feed_samples() once it starts playing
+            with self.lock:
+                self.probe_samples = np.zeros(0, dtype=np.float32)
+            self.points = np.zeros(self.resolution)
+            self.start_animate = True
+        elif audio_file:
+            # memory-mapped from the cache if it's been played before, otherwise read
+            # from the cache file as it's decoded in the background (see utils/pcm_cache.py)
+            self.stream = open_pcm(audio_file, self.frame_rate)
+            self.points = np.zeros(self.resolution)
+            self.start_animate = True
         else:
             self.start_animate = False
+        self.on_position_changed(0)
+        self.update_active()
 
-    def calculate_amps(self):
-        """Calculates the amplitudes used for visualising the media."""
+    def set_probe_mode(self, enabled: bool) -> None:
+        """
+        True = analyse the buffers the player outputs, given to feed_samples()
+        False = decode the song file separately, and follow the player's position
+        """
+        self.use_probe = enabled
+        self.reset_media()
+        self.frequencyRangeChanged.emit(*self.get_frequency_range())
 
-        sample_count = int(self.song.frame_rate * self.sampling_window_length)
-        start_index = int((self.player.position() / 1000) * self.song.frame_rate)
-        # samples to analyse
-        v_sample = self.samples[start_index : start_index + sample_count]
+    def get_frequency_range(self) -> tuple[float, float]:
+        """
+        Frequency of the lowest & highest band, in Hz - the same bins `get_log_bands()` spreads the bands over
+        The bottom is 1 / sampling_window_length, the top is just under the nyquist frequency of the samples analysed
+        """
+        with self.lock:
+            frame_rate = self.probe_frame_rate if self.use_probe else self.frame_rate
+        sample_count = int(frame_rate * self.sampling_window_length)
+        return frame_rate / sample_count, ((sample_count - 1) // 2) * frame_rate / sample_count
+
+    def feed_samples(self, samples: np.ndarray, sample_rate: int, max_sample: float) -> None:
+        """
+        Probe mode - latest mono samples the player output
+        max_sample is full scale for the sample format, for normalising
+        """
+        rate_changed = sample_rate != self.probe_frame_rate
+        with self.lock:
+            keep = int(sample_rate * self.sampling_window_length)
+            if samples.size >= keep:
+                self.probe_samples = samples[-keep:]
+            else:
+                self.probe_samples = np.concatenate((self.probe_samples, samples))[-keep:]
+            self.probe_max_sample = max_sample
+            self.probe_frame_rate = sample_rate
+        if rate_changed:
+            self.frequencyRangeChanged.emit(*self.get_frequency_range())
+
+    def on_state_changed(self, state) -> None:
+        """Player started/paused/stopped"""
+        with self.lock:
+            self.playing = state == QMediaPlayer.State.PlayingState
+            # the position doesn't move while paused
+            self.position_ms = self.player.position()
+            self.position_time = time.perf_counter()
+        self.update_active()
 
-        # Use a window function to reduce spectral leakage
-        window = np.hanning(len(v_sample))
-        v_sample = v_sample * window
+    def on_position_changed(self, position: int) -> None:
+        """Player reported its position (every so often, and straight away after a seek)"""
+        with self.lock:
+            self.position_ms = position
+            self.position_time = time.perf_counter()
 
-        # use FFTs to analyse frequency and amplitudes
-        fourier = np.fft.fft(v_sample)
-        freq = np.fft.fftfreq(fourier.size, d=self.sampling_window_length)
-        amps = 2 / v_sample.size * np.abs(fourier)
-        data = np.array([freq, amps]).T
+    def on_playback_rate_changed(self, rate: float) -> None:
+        with self.lock:
+            self.position_ms = self.get_position()
+            self.position_time = time.perf_counter()
+            # QMediaPlayer uses 0 for normal speed
+            self.playback_rate = rate or 1.0
 
-        # TEST:
-        # print(freq * .05 * self.song.frame_rate)
+    def set_visible(self, visible: bool) -> None:
+        """The visualizer was shown or hidden (e.g. the window was minimized)"""
+        self.visible = visible
+        self.update_active()
+
+    def get_position(self) -> float:
+        """Playback position in ms, from the player's last report"""
+        if not self.playing:
+            return self.position_ms
+        return self.position_ms + (time.perf_counter() - self.position_time) * 1000 * self.playback_rate
+
+    def update_active(self) -> None:
+        """Wakes the thread up if there's something to animate, or lets it sleep"""
+        with self.lock:
+            # after a pause, keep going until the bars have faded out
+            fading = bool(self.points.any())
+            if self.start_animate and self.visible and (self.playing or fading):
+                self.active.set()
+            else:
+                self.active.clear()
+
+    def stop(self) -> None:
+        """Ends the thread"""
+        self.requestInterruption()
+        self.active.set()
+        self.wait()
+
+    def calculate_amps(self):
+        """Calculates the amplitudes used for visualising the media."""
+
+        with self.lock:
+            playing = self.playing
+        frame = self.read_probe_frame() if self.use_probe else self.read_file_frame()
+        if frame is None:
+            return
+        # samples to analyse
+        v_sample, max_sample = frame
 
         # NOTE:
         # given 520 hz sine wave
         # np.argmax(fourier) = 2374
-        # freq[2374] * .05 * self.song.frame_rate = 520 :O omg! thats the hz value
-        # x values = freq * self.song.frame_rate * self.sampling_window_length
-
-        point_range = 1 / self.resolution
-
-        # Logarithmic frequency scaling
-        min_freq = np.min(freq[freq > 0])  # minimum positive frequency
-        # print(
-        #     f"min freq: {min_freq * self.sampling_window_length * self.song.frame_rate}"
-        # )
-        # 20hz
-        max_freq = np.max(freq)  # maximum frequency
-        # print(
-        #     f"max freq: {max_freq * self.sampling_window_length * self.song.frame_rate}"
-        # )
-        # 23khz
-        log_freqs = np.logspace(np.log10(min_freq), np.log10(max_freq), self.resolution)
-
-        point_samples = []
-
-        if not data.size:
-            return
+        # freq[2374] * .05 * self.frame_rate = 520 :O omg! thats the hz value
+        # x values = freq * self.frame_rate * self.sampling_window_length
 
-        # for i, freq in enumerate(np.arange(0, 1, point_range), start=1):
-        for i, log_freq in enumerate(log_freqs):
-            # get the amps which are in between the frequency range
-            # amps = data[(freq - point_range < data[:, 0]) & (data[:, 0] < freq)]
-            amps = data[(log_freq - point_range < data[:, 0]) & (data[:, 0] < log_freq)]
-            if not amps.size:
-                point_samples.append(0)
-            else:
-                point_samples.append(
-                    amps[0][1].max() # BINK!!!!!!!!!!!!!
-                    * (
-                        ((1 + self.sensitivity) / 10 + (self.sensitivity - 1) / 10)
-                        ** (i / 50)
-                    )
-                )
+        # window, fft & log bands - the window and band edges are cached per frame size (see utils/spectrum.py)
+        point_samples = log_band_amplitudes(
+            v_sample, self.resolution, self.sampling_window_length, self.sensitivity
+        )
 
         # Add the point_samples to the self.points array, the reason we have a separate
         # array (self.points) is so that we can fade out the previous amplitudes from
         # the past
-        for n, amp in enumerate(point_samples):
-            # amp *= 2
-            if self.player.state() in (
-                QMediaPlayer.State.PausedState,
-                QMediaPlayer.State.StoppedState
-            ):
-                # More aggressive decay when no audio is playing
-                self.points[n] *= 0.7  # Faster fade out when paused/stopped
-            elif amp < self.points[n]:
-                # Faster fade for frequencies that are decreasing
-                self.points[n] = self.points[n] * 0.8 + amp * 0.2  # Smoother transition
-            else:
-                # Rise quickly to new peaks
-                self.points[n] = amp
-                # print(f'amp > points[n] - {amp} > {self.points[n]}')
-            # Set a lower threshold to properly reach zero
-            if self.points[n] < 1e-4:
-                self.points[n] = 0
-
-        # print(self.points)
+        decay_points(self.points, point_samples, playing)
 
         # interpolate points
         rs = gaussian_filter1d(self.points, sigma=2)
 
-        # divide by the highest sample in the song to normalise the
+        # divide by the highest sample to normalise the
         # amps in terms of decimals from 0 -> 1
-        self.calculatedVisual.emit(rs / self.max_sample)
-        # self.calculated_visual.emit(rs)
-        # print(rs)
-        # print(rs/self.max_sample)
+        self.calculatedVisual.emit(rs / max_sample)
+
+    def read_file_frame(self) -> tuple[np.ndarray, float] | None:
+        """
+        Samples at the player's position, from the decoded song, and the loudest sample decoded so far
+        Returns None if that part isn't decoded yet (just started, or just seeked) - skip this frame
+        """
+        stream = self.stream
+        if stream is None:
+            return None
+        sample_count = int(self.frame_rate * self.sampling_window_length)
+        with self.lock:
+            position = self.get_position()
+        start_index = int((position / 1000) * self.frame_rate)
+        v_sample = stream.read(start_index, sample_count)
+        if v_sample is None:
+            return None
+        return v_sample, stream.max_sample
+
+    def read_probe_frame(self) -> tuple[np.ndarray, float] | None:
+        """
+        Latest samples the player output, and full scale for their format
+        Returns None until a whole window has come in
+        """
+        with self.lock:
+            v_sample = self.probe_samples
+            max_sample = self.probe_max_sample
+            sample_count = int(self.probe_frame_rate * self.sampling_window_length)
+        if v_sample.size < sample_count:
+            return None
+        return v_sample, max_sample
 
     def run(self):
         """Runs the animate function depending on the song."""
-        while True:
+        while not self.isInterruptionRequested():
+            # sleeps here while paused, stopped or hidden
+            self.active.wait()
+            if self.isInterruptionRequested():
+                break
+            started = time.perf_counter()
             if self.start_animate:
                 try:
                     self.calculate_amps()
                 except ValueError:
                     self.calculatedVisual.emit(np.zeros(self.resolution))
                     self.start_animate = False
-            time.sleep(0.033)
+            self.update_active()
+            cost = time.perf_counter() - started
+            self.adapt_frame_rate(cost)
+            time.sleep(max(0.0, self.frame_interval - cost))
+
+    def adapt_frame_rate(self, cost: float) -> None:
+        """Slows down if frames use more than `cpu_budget` of a core, speeds back up when they don't"""
+        if cost > self.frame_interval * self.cpu_budget:
+            self.frame_interval = min(1 / self.min_fps, self.frame_interval * 1.25)
+        elif cost < self.frame_interval * self.cpu_budget / 2:
+            self.frame_interval = max(1 / self.max_fps, self.frame_interval * 0.9)
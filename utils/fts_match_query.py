@@ -0,0 +1,48 @@
+import re
+
+# Columns in the song_fts index (sql/song_fts.sql)
+fts_columns = ["title", "artist", "album", "album_artist", "genre", "lyrics"]
+# bm25() weight per column, in the same order - a title match ranks above a lyrics match
+fts_weights = [10.0, 5.0, 5.0, 3.0, 2.0, 1.0]
+
+# "quoted phrase" | column:"quoted phrase" | word | column:word
+search_term_pattern = re.compile(r'(?:(\w+):)?(?:"([^"]*)"?|(\S+))')
+# a letter or digit - what the unicode61 tokenizer keeps, everything else separates tokens
+token_character_pattern = re.compile(r"[^\W_]")
+
+
+def fts_match_query(search_string: str) -> str:
+    """
+    Turns whatever was typed in the search box into an FTS5 MATCH expression
+
+    - every word is a prefix search, so results show up while typing: `beat` finds "Beatles"
+    - every word has to match (somewhere), in any order
+    - "quoted words" match as an exact phrase
+    - column:word only searches that column, e.g. `artist:beatles genre:rock`
+
+    Everything is quoted, so punctuation typed by the user can't break the query
+    Terms without a letter or digit ("&", "-") are dropped - they'd never match anything
+    Returns an empty string if there is nothing to search for
+
+    >>> fts_match_query("simon & garfunkel")
+    '"simon"* AND "garfunkel"*'
+    >>> fts_match_query('AC/DC - "live at" artist:acdc')
+    '"AC/DC"* AND "live at" AND artist : "acdc"*'
+    """
+    terms = []
+    for match in search_term_pattern.finditer(search_string):
+        column, phrase, word = match.groups()
+        if column and column.lower() not in fts_columns:
+            # not a column filter, just a word with a colon in it
+            word = match.group(0)
+            column = None
+        text = phrase if phrase is not None else word
+        if not text or not token_character_pattern.search(text):
+            continue
+        term = '"' + text.replace('"', '""') + '"'
+        if phrase is None:
+            term += "*"
+        if column:
+            term = f"{column.lower()} : {term}"
+        terms.append(term)
+    return " AND ".join(terms)
@@ -0,0 +1,31 @@
+from collections.abc import Callable
+from utils.get_tags import get_tags, id3_remap
+from utils.art_cache import get_album_art_thumbnail
+
+
+def get_now_playing(filepath: str, is_stale: Callable[[], bool], progress_callback=None) -> dict | None:
+    """
+    Everything the "now playing" part of the window shows that needs the audio file opened -
+    tags (with lyrics) and album art. Run in a Worker when the song changes
+
+    `is_stale()` returns True once another song has started,
+    the work stops there and nothing is returned
+    ```
+    {"filepath": str, "metadata": id3_remap() dict, "art_hash": str | None, "thumbnail_path": Path | None}
+    ```
+    """
+    if is_stale():
+        return None
+    tags, fail_reason = get_tags(filepath)
+    metadata = {} if fail_reason else id3_remap(tags)
+    if is_stale():
+        return None
+    art_hash, thumbnail_path = get_album_art_thumbnail(filepath)
+    if is_stale():
+        return None
+    return {
+        "filepath": filepath,
+        "metadata": metadata,
+        "art_hash": art_hash,
+        "thumbnail_path": thumbnail_path,
+    }
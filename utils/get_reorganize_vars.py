@@ -1,4 +1,5 @@
 from mutagen.id3 import ID3
+from mutagen.id3._util import ID3NoHeaderError
 
 
 def get_reorganize_vars(filepath: str) -> tuple[str, str]:
@@ -11,7 +12,11 @@ def get_reorganize_vars(filepath: str) -> tuple[str, str]:
     """
     # TODO: fix this func. id3_remap(get_tags())
     # or is what i have less memory so more better? :shrug:
-    audio = ID3(filepath)
+    try:
+        audio = ID3(filepath)
+    except ID3NoHeaderError:
+        # files are not given an ID3 header just by scanning them anymore
+        return "Unknown Artist", "Unknown Album"
     try:
         artist = str(audio["TPE1"].text[0])
         if artist == "":
@@ -1,60 +1,131 @@
 import os
-from logging import debug, error
+from mutagen import File, FileType, MutagenError
 from mutagen.id3 import ID3
+from mutagen.id3._util import ID3NoHeaderError
 from mutagen.mp3 import MP3
 from mutagen.flac import FLAC
+from mutagen.oggflac import OggFLAC
+from mutagen.oggopus import OggOpus
+from mutagen.oggvorbis import OggVorbis
+from mutagen.wave import WAVE
+from mutagen.easymp4 import EasyMP4, EasyMP4Tags
 from mutagen.id3._frames import TIT2
-from mutagen.id3._util import ID3NoHeaderError
 
 from utils import convert_id3_timestamp_to_datetime
+from utils.art_cache import get_picture_data, get_art_hash
+
+# mutagen classes that can read each extension. Passed to File() as `options`,
+# so it only has to score these instead of every format it knows
+FILE_TYPES: dict[str, list[type[FileType]]] = {
+    ".mp3": [MP3],
+    ".wav": [WAVE],
+    ".flac": [FLAC],
+    ".ogg": [OggVorbis, OggOpus, OggFLAC],
+    ".oga": [OggVorbis, OggOpus, OggFLAC],
+    ".opus": [OggOpus],
+    ".m4a": [EasyMP4],
+    ".mp4": [EasyMP4],
+}
+
+# EasyMP4 doesn't have these - give them the same names as vorbis comments
+EasyMP4Tags.RegisterTextKey("lyrics", "\xa9lyr")
+EasyMP4Tags.RegisterKey(
+    "cover",
+    getter=lambda tags, key: tags["covr"],
+    setter=lambda tags, key, value: tags.__setitem__("covr", value),
+    deleter=lambda tags, key: tags.__delitem__("covr"),
+)
+
+# db column -> mutagen's "easy" name, for every format without ID3 tags (vorbis comments, EasyMP4)
+easy_keys: dict[str, str] = {
+    "title": "title",
+    "artist": "artist",
+    "album": "album",
+    "album_artist": "albumartist",
+    "track_number": "tracknumber",
+    "genre": "genre",
+    "album_date": "date",
+    "lyrics": "lyrics",
+}
 
 
 def get_mp3_tags(filename: str) -> tuple[MP3 | ID3 | FLAC, str]:
-    """Get ID3 tags for mp3 file"""
+    """
+    Get ID3 tags for mp3 file
+    This is read only - the file on disk is never written to.
+    If the title tag doesn't exist, it is derived from the filename in memory
+    """
     try:
         # Open the MP3 file and read its content
         audio = MP3(filename)
-    except ID3NoHeaderError:
-        audio = MP3()
-
-    try:
-        if os.path.exists(filename):
-            audio.save(os.path.abspath(filename))
+    except Exception as e:
+        return MP3(), f"Could not read ID3 tags from file: {e}"
 
+    if audio.tags is None:
+        # no ID3 header in the file - give it an empty one in memory
+        audio.add_tags()
+    if "TIT2" not in audio.tags:
+        # if title tag doesnt exist, use the filename
         title = os.path.splitext(os.path.basename(filename))[0]
-        if "TIT2" not in list(audio.keys()):
-            # if title tag doesnt exist, create it - filename
-            tit2_tag = TIT2(encoding=3, text=[title])
-            audio["TIT2"] = tit2_tag
-        # Save the updated tags
-        audio.save()
-        return audio, ""
+        audio.tags.add(TIT2(encoding=3, text=[title]))
+    return audio, ""
 
+
+def get_file_tags(filename: str, file_types: list[type[FileType]]) -> tuple[FileType | ID3, str]:
+    """
+    Get the tags for any format in FILE_TYPES, through mutagen's File()
+    Only the headers & metadata blocks are read, not the audio.
+    Read only, and like get_mp3_tags() the title falls back to the filename in memory
+    """
+    try:
+        audio = File(filename, options=file_types)
     except Exception as e:
-        return MP3(), f"Could not assign ID3 tag to file: {e}"
+        return ID3(), f"Could not read tags from file: {e}"
+    if audio is None:
+        return ID3(), "Not a supported audio file"
+    if audio.tags is None:
+        audio.add_tags()
+    title = os.path.splitext(os.path.basename(filename))[0]
+    if isinstance(audio.tags, ID3):
+        if "TIT2" not in audio.tags:
+            audio.tags.add(TIT2(encoding=3, text=[title]))
+    elif not audio.tags.get("title"):
+        audio.tags["title"] = [title]
+    return audio, ""
 
 
-def id3_remap(audio: MP3 | ID3 | FLAC) -> dict[str, str | int | None]:
+def id3_remap(audio: FileType | ID3) -> dict[str, str | int | None]:
     """
     Turns the ID3 dict of an audio file into a normal dict that I, the human, can use.
     Add extra fields too :D yahooo
+
+    Every format gets the same keys - ID3 frames for mp3 & wav,
+    mutagen's "easy" names (vorbis comments, EasyMP4) for everything else
     """
     remap = {}
-    if isinstance(audio, MP3):
+    if not isinstance(audio, FileType) or audio.info is None:
+        return remap
+    if isinstance(audio.tags, ID3):
         # so ugly
         uslt_tags = [tag for tag in audio.keys() if tag.startswith("USLT::")]
         lyrics = next((audio[tag].text for tag in uslt_tags), "")
+        # only the hash - the thumbnail gets made the first time the art is shown
+        art_data = get_picture_data(audio)
+        # the frame's text is an ID3TimeStamp
+        tdrc = audio.get("TDRC")
         # so ugly
         remap = {
             "title": audio.get("TIT2"),
             "artist": audio.get("TPE1"),
             "album": audio.get("TALB"),
+            "album_artist": audio.get("TPE2"),
             "track_number": audio.get("TRCK"),
             "genre": audio.get("TCON"),
-            "date": convert_id3_timestamp_to_datetime(audio.get("TDRC")),
+            "date": convert_id3_timestamp_to_datetime(tdrc.text[0] if tdrc else None),
             "bitrate": audio.get("TBIT"),
             "lyrics": lyrics,
             "length": int(round(audio.info.length, 0)),
+            "art_hash": get_art_hash(art_data) if art_data else "",
         }
         for k, v in remap.items():
             # we get crap like this if the tag exists
@@ -63,14 +134,35 @@ def id3_remap(audio: MP3 | ID3 | FLAC) -> dict[str, str | int | None]:
                 continue
             if not isinstance(v, str) and not isinstance(v, int):
                 remap[k] = v.text[0]
+    else:
+        def first(key: str) -> str | None:
+            values = audio.tags.get(key) if audio.tags is not None else None
+            return str(values[0]) if values else None
+
+        art_data = get_picture_data(audio)
+        bitrate = getattr(audio.info, "bitrate", 0)
+        remap = {
+            "title": first(easy_keys["title"]),
+            "artist": first(easy_keys["artist"]),
+            "album": first(easy_keys["album"]),
+            "album_artist": first(easy_keys["album_artist"]),
+            "track_number": first(easy_keys["track_number"]),
+            "genre": first(easy_keys["genre"]),
+            "date": convert_id3_timestamp_to_datetime(first(easy_keys["album_date"])),
+            # kbps
+            "bitrate": bitrate // 1000 if bitrate else None,
+            "lyrics": first(easy_keys["lyrics"]) or first("unsyncedlyrics") or "",
+            "length": int(round(audio.info.length, 0)),
+            "art_hash": get_art_hash(art_data) if art_data else "",
+        }
     return remap
 
 
-def get_tags(filename: str) -> tuple[MP3 | ID3 | FLAC, str]:
+def get_tags(filename: str) -> tuple[FileType | ID3, str]:
     """
-    Get the "ID3" tags for an audio file
+    Get the "ID3" tags for an audio file - any format in FILE_TYPES
     Returns a tuple of:
-    - mutagen ID3 object OR python dictionary
+    - mutagen file object (MP3, FLAC, OggVorbis, EasyMP4...) OR empty ID3 object
     - string reason for failure (failure = empty dict above)
 
     Args
@@ -85,8 +177,34 @@ def get_tags(filename: str) -> tuple[MP3 | ID3 | FLAC, str]:
         ...
     }
     """
-    if filename.endswith(".mp3"):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".mp3":
         tags, details = get_mp3_tags(filename)
+    elif extension in FILE_TYPES:
+        tags, details = get_file_tags(filename, FILE_TYPES[extension])
     else:
-        tags, details = ID3(), "non mp3 file"
+        tags, details = ID3(), f"unsupported file type {extension}"
     return tags, details
+
+
+def get_tags_for_writing(filepath: str) -> FileType | ID3:
+    """
+    Opens an audio file's tags to be edited, then saved with `.save(filepath)`
+    - mp3: an ID3, or a new empty one if the file has no ID3 header
+    - everything else in FILE_TYPES: the mutagen file object, so the tags are written in the file's own format
+      (ID3 chunk for wav, vorbis comments for flac & ogg, atoms for mp4) - edit its `.tags`
+
+    Raises MutagenError if the file can't be read
+    """
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension == ".mp3" or extension not in FILE_TYPES:
+        try:  # Load existing tags
+            return ID3(filepath)
+        except ID3NoHeaderError:  # Create new tags if none exist
+            return ID3()
+    audio = File(filepath, options=FILE_TYPES[extension])
+    if audio is None:
+        raise MutagenError(f"Not a supported audio file: {filepath}")
+    if audio.tags is None:
+        audio.add_tags()
+    return audio
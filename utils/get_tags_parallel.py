@@ -0,0 +1,71 @@
+import os
+from collections import deque
+from collections.abc import Iterable, Iterator
+from itertools import chain, islice
+from logging import debug
+from multiprocessing import get_context
+from utils.get_tags import get_tags, id3_remap
+
+
+def get_remapped_tags(filepath: str) -> tuple[str, dict[str, str | int | None], str]:
+    """
+    Reads the tags for one audio file and remaps them to database tags
+    This runs inside of a worker process, so everything returned must be picklable
+
+    Returns a tuple of:
+    - filepath
+    - remapped tags dict (empty on failure)
+    - string reason for failure
+    """
+    try:
+        tags, fail_reason = get_tags(filepath)
+        if fail_reason:
+            return filepath, {}, fail_reason
+        return filepath, id3_remap(tags), ""
+    except Exception as e:
+        # an exception here would kill the whole pool iteration, so just report it
+        return filepath, {}, f"Could not read tags: {e}"
+
+
+def get_remapped_tags_chunk(filepaths: list[str]) -> list[tuple[str, dict[str, str | int | None], str]]:
+    """get_remapped_tags() for a chunk of files, in one trip to a worker process"""
+    return [get_remapped_tags(filepath) for filepath in filepaths]
+
+
+def get_tags_parallel(
+    files: Iterable[str], workers: int = 0, chunksize: int = 64
+) -> Iterator[tuple[str, dict[str, str | int | None], str]]:
+    """
+    Reads tags for many audio files across a pool of processes
+
+    Args:
+        files: fully qualified paths to audio file(s) - a list, or a generator that's still finding them
+        workers: number of processes to use. 0 = one per cpu core
+        chunksize: how many filepaths get handed to a worker process at a time
+
+    Yields (filepath, tags, fail_reason) tuples as each chunk finishes.
+    `files` is only read a few chunks ahead of the results, so a huge (or endless) generator
+    doesn't pile up in memory, and results start coming back before it's finished
+    """
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    files = iter(files)
+    first_chunk = list(islice(files, chunksize))
+    # a pool is not worth spinning up for a handful of files
+    if workers == 1 or len(first_chunk) < chunksize:
+        for filepath in chain(first_chunk, files):
+            yield get_remapped_tags(filepath)
+        return
+    debug(f"get_tags_parallel() | reading files with {workers} processes")
+    # chunks handed out but not collected yet - enough to keep every process busy
+    pending = deque()
+    # spawn, not fork - forking while Qt has threads running can deadlock the child
+    with get_context("spawn").Pool(processes=workers) as pool:
+        chunk = first_chunk
+        while chunk:
+            pending.append(pool.apply_async(get_remapped_tags_chunk, (chunk,)))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().get()
+            chunk = list(islice(files, chunksize))
+        while pending:
+            yield from pending.popleft().get()
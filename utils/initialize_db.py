@@ -1,5 +1,6 @@
 import DBA
-from logging import debug
+import sqlite3
+from logging import debug, error
 
 
 def initialize_db():
@@ -11,3 +12,20 @@ def initialize_db():
                 debug(f"executing [{statement}]")
                 #with DBA.DBAccess() as db: # is this better?
                 db.execute(statement, ())
+        create_song_fts(db)
+
+
+def create_song_fts(db: DBA.DBAccess) -> bool:
+    """
+    Creates the song_fts full text search index & its triggers, then fills it from the song table
+    Returns False if sqlite was built without FTS5 - search falls back to LIKE
+    """
+    try:
+        with open("sql/song_fts.sql", "r") as file:
+            # triggers have ; inside them, so this can't be split like init.sql
+            db.connection.executescript(file.read())
+        db.execute("INSERT INTO song_fts(song_fts) VALUES ('rebuild');", ())
+    except sqlite3.OperationalError as e:
+        error(f"create_song_fts() | could not create the search index: {e}")
+        return False
+    return True
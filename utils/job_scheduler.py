@@ -0,0 +1,164 @@
+from collections.abc import Hashable
+from dataclasses import dataclass
+from enum import IntEnum
+from logging import debug
+from PyQt5.QtCore import QObject, QThreadPool, pyqtSignal
+from utils.Worker import Worker
+from utils.progress_reporter import Progress
+
+
+class JobPriority(IntEnum):
+    # can take hours, gets a thread of its own so nothing waits on it - waveforms for the whole library
+    BACKGROUND = 0
+    # big jobs the user started - scans, adding / deleting / reorganizing songs
+    BULK = 1
+    # someone is waiting on it right now - now playing tags & art, the current song's waveform
+    INTERACTIVE = 2
+
+
+QUEUED = "queued"
+RUNNING = "running"
+CANCELLING = "cancelling"
+
+
+@dataclass(eq=False)
+class Job:
+    """A Worker that was handed to JobScheduler.submit()"""
+
+    worker: Worker
+    # shown in the jobs window - untitled jobs aren't
+    title: str
+    priority: JobPriority
+    # only one job with the same key can be queued or running at a time
+    key: Hashable | None = None
+    state: str = QUEUED
+    progress: Progress | None = None
+
+
+class JobScheduler(QObject):
+    """
+    Runs Workers on a QThreadPool, in priority order
+
+    - INTERACTIVE jobs go straight to the pool, ahead of anything already waiting there
+    - BULK & BACKGROUND jobs are held here, each with their own number of threads,
+      and the pool always has one more thread than that: a long scan can't make the now playing
+      art wait for a free thread, and the library's waveforms can't hold up a scan
+    - a job with the same `key` as one that's queued or running isn't submitted (two scans at once)
+    - cancel() asks a job to stop, through its Worker's cancel_token
+    ```
+    job = scheduler.submit(Worker(scan_for_music), "Scanning libraries", key="scan_libraries")
+    if job is None:
+        # already scanning
+    ```
+    jobsChanged is emitted whenever a job is added, starts, makes progress, or is done
+    """
+
+    jobsChanged: pyqtSignal = pyqtSignal()
+
+    def __init__(
+        self,
+        threadpool: QThreadPool,
+        parent=None,
+        max_bulk_jobs: int | None = None,
+        max_background_jobs: int = 1,
+    ):
+        super().__init__(parent)
+        self.threadpool: QThreadPool = threadpool
+        # threads each class of held job can have - whatever's left of the pool after BACKGROUND
+        # and one thread for INTERACTIVE jobs goes to BULK
+        self.limits: dict[JobPriority, int] = {
+            JobPriority.BULK: max_bulk_jobs or max(1, threadpool.maxThreadCount() - max_background_jobs - 1),
+            JobPriority.BACKGROUND: max_background_jobs,
+        }
+        # a small pool grows, so there's still a thread for INTERACTIVE jobs when both are busy
+        threadpool.setMaxThreadCount(max(threadpool.maxThreadCount(), sum(self.limits.values()) + 1))
+        self.started: dict[JobPriority, int] = {priority: 0 for priority in self.limits}
+        # queued & running, in the order they were submitted
+        self.jobs: list[Job] = []
+        # BULK & BACKGROUND jobs that haven't been given to the pool yet
+        self.held: list[Job] = []
+
+    def submit(
+        self,
+        worker: Worker,
+        title: str = "",
+        priority: JobPriority = JobPriority.BULK,
+        key: Hashable | None = None,
+    ) -> Job | None:
+        """
+        Queues `worker` - returns its Job,
+        or None if a job with the same `key` is already queued or running
+        """
+        if key is not None:
+            job = self.get_job(key)
+            if job is not None:
+                debug(f"JobScheduler | {key} is already {job.state}, not submitting it again")
+                return None
+        job = Job(worker, title, priority, key)
+        worker.signals.signal_started.connect(lambda: self.on_job_started(job))
+        worker.signals.signal_progress_update.connect(lambda progress: self.on_job_progress(job, progress))
+        worker.signals.signal_finished.connect(lambda: self.on_job_finished(job))
+        self.jobs.append(job)
+        if priority >= JobPriority.INTERACTIVE:
+            self.threadpool.start(worker, int(priority))
+        else:
+            self.held.append(job)
+            self.start_held_jobs()
+        self.jobsChanged.emit()
+        return job
+
+    def start_held_jobs(self) -> None:
+        """Gives held jobs to the pool, highest priority first, while their class has threads for them"""
+        # sorted() keeps the order of equals, so the same priority goes in the order it came
+        for job in sorted(self.held, key=lambda job: job.priority, reverse=True):
+            if self.started[job.priority] < self.limits[job.priority]:
+                self.held.remove(job)
+                self.started[job.priority] += 1
+                self.threadpool.start(job.worker, int(job.priority))
+
+    def cancel(self, job: Job) -> None:
+        """
+        Asks `job` to stop. A job that hasn't started is dropped,
+        a running one stops the next time it checks its cancel_token
+        """
+        job.worker.cancel_token.cancel()
+        if job in self.held:
+            # never started, so it never finishes either
+            self.held.remove(job)
+            self.jobs.remove(job)
+        elif job in self.jobs:
+            job.state = CANCELLING
+        self.jobsChanged.emit()
+
+    def cancel_all(self) -> None:
+        for job in list(self.jobs):
+            self.cancel(job)
+
+    def get_job(self, key: Hashable) -> Job | None:
+        """The queued or running job with this `key`, if there is one"""
+        return next((job for job in self.jobs if job.key == key), None)
+
+    def get_titled_jobs(self) -> list[Job]:
+        """The jobs worth showing someone - running first, then queued"""
+        titled = [job for job in self.jobs if job.title]
+        return sorted(titled, key=lambda job: job.state == QUEUED)
+
+    def on_job_started(self, job: Job) -> None:
+        if job.state == QUEUED:
+            job.state = RUNNING
+            self.jobsChanged.emit()
+
+    def on_job_progress(self, job: Job, progress: Progress) -> None:
+        job.progress = progress
+        if job.title:
+            self.jobsChanged.emit()
+
+    def on_job_finished(self, job: Job) -> None:
+        if job not in self.jobs:
+            return
+        self.jobs.remove(job)
+        if job.priority in self.started:
+            self.started[job.priority] -= 1
+            self.start_held_jobs()
+        debug(f"JobScheduler | {job.title or job.worker.fn} {'cancelled' if job.state == CANCELLING else 'done'}")
+        self.jobsChanged.emit()
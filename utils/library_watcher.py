@@ -0,0 +1,352 @@
+import os
+import DBA
+from logging import debug, error, warning
+from configparser import ConfigParser
+from pathlib import Path
+from appdirs import user_config_dir
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+from utils.Worker import Worker
+from utils.cancellation_token import CancellationToken, JobCancelled
+from utils.job_scheduler import CANCELLING, Job, JobPriority, JobScheduler
+from utils.get_tags_parallel import get_tags_parallel
+from utils.add_files_to_database import get_song_row, upsert_song_sql
+from utils.scan_for_music import get_known_files, plan_rescan, move_song_sql
+from utils.audio_file_walker import get_audio_suffixes
+
+
+def get_library_directories(libraries: list[str], progress_callback=None) -> list[str]:
+    """Returns every directory in the library folders, including the library folders themselves"""
+    directories: list[str] = []
+    for library in libraries:
+        for dirpath, _, _ in os.walk(library):
+            directories.append(dirpath)
+    return directories
+
+
+def is_library_available(library: str) -> bool:
+    """False if a library folder is gone or empty - an unmounted drive, or a network share that dropped out"""
+    try:
+        with os.scandir(library) as entries:
+            return any(True for _ in entries)
+    except OSError:
+        return False
+
+
+def get_known_filepaths(filepaths: list[str]) -> dict[str, tuple[int, int | None, int | None, int | None]]:
+    """Returns {filepath: (song id, size, mtime, inode)} for the given filepaths that are in the library"""
+    rows = []
+    with DBA.DBAccess() as db:
+        for i in range(0, len(filepaths), 900):
+            chunk = filepaths[i : i + 900]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows.extend(
+                db.query(
+                    f"SELECT id, filepath, file_size, file_mtime, file_inode FROM song WHERE filepath IN ({placeholders});",
+                    chunk,
+                )
+            )
+    return {filepath: (song_id, size, mtime, inode) for song_id, filepath, size, mtime, inode in rows}
+
+
+def sync_directories(
+    directories: list[str],
+    watched: set[str],
+    extensions: list[str],
+    workers: int = 0,
+    missing: list[str] | None = None,
+    libraries: list[str] | None = None,
+    progress_callback=None,
+    cancel_token: CancellationToken | None = None,
+) -> dict[str, list]:
+    """
+    Brings the song table up to date with a batch of changed directories, in one transaction
+
+    Only the files directly inside each directory are looked at, plus anything inside
+    subdirectories that aren't `watched` (new, deleted, or polling mode) - watched
+    subdirectories get their own change events
+
+    Songs whose file has gone aren't deleted straight away - the other half of a move may land
+    in the next batch, and deleting would take the song out of its playlists. They come back as
+    `missing`, to be passed in to the next batch: if they still haven't turned up, they're removed then.
+    Songs in one of the `libraries` that's gone or empty are never removed - it's most likely unmounted
+
+    Raises JobCancelled if `cancel_token` is cancelled - only before anything is written
+
+    Returns a dict of lists:
+    - added: song ids for new songs
+    - updated: song ids for changed & moved songs
+    - removed: song ids for songs that are gone from disk
+    - missing: filepaths of songs that went missing in this batch
+    - directories: every directory walked, so new ones can be watched
+    """
+    changes: dict[str, list] = {"added": [], "updated": [], "removed": [], "missing": [], "directories": []}
+    suffixes = get_audio_suffixes(extensions)
+    try:
+        filepaths: list[str] = []
+        # missing from the last batch - a new file matching one of these is a move
+        held = get_known_filepaths(missing) if missing else {}
+        known = dict(held)
+        for directory in directories:
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+            if not os.path.isdir(directory):
+                # deleted - the parent directory's event takes care of the files
+                continue
+            parent_exists: dict[str, bool] = {}
+            for filepath, row in get_known_files(directory).items():
+                parent = os.path.dirname(filepath)
+                if parent not in parent_exists:
+                    parent_exists[parent] = os.path.isdir(parent)
+                if parent == directory or parent not in watched or not parent_exists[parent]:
+                    known[filepath] = row
+            for dirpath, dirnames, filenames in os.walk(directory):
+                changes["directories"].append(dirpath)
+                # watched subdirectories are handled by their own events
+                dirnames[:] = [d for d in dirnames if os.path.join(dirpath, d) not in watched]
+                for file in filenames:
+                    if file.lower().endswith(suffixes):
+                        filepaths.append(os.path.join(dirpath, file))
+        plan = plan_rescan(filepaths, known)
+        if plan.removed and libraries:
+            # every song in an unmounted library would look deleted - leave them be until it's back
+            unavailable = tuple(os.path.join(library, "") for library in libraries if not is_library_available(library))
+            skipped = [filepath for filepath in plan.removed if filepath.startswith(unavailable)] if unavailable else []
+            for filepath in skipped:
+                del plan.removed[filepath]
+            if skipped:
+                warning(f"sync_directories() | {unavailable} missing or empty, not removing {len(skipped)} songs")
+        # only songs that were already missing last batch are removed, the rest get another batch
+        changes["missing"] = [filepath for filepath in plan.removed if filepath not in held]
+        for filepath in changes["missing"]:
+            del plan.removed[filepath]
+
+        # Read tags before opening the transaction, so it stays short
+        insert_data: list[tuple] = []
+        for filepath, audio, fail_reason in get_tags_parallel(plan.new + plan.changed, workers):
+            if fail_reason:
+                debug(f"sync_directories() | skipping {filepath}: {fail_reason}")
+                continue
+            try:
+                insert_data.append(get_song_row(filepath, audio, os.stat(filepath)))
+            except OSError:
+                continue
+        removed_ids = list(plan.removed.values())
+        new_filepaths = [row[0] for row in insert_data if row[0] not in known]
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+
+        with DBA.DBAccess() as db:
+            if insert_data:
+                db.executemany(upsert_song_sql, insert_data)
+            if plan.moved:
+                db.executemany(move_song_sql, plan.moved)
+            for i in range(0, len(removed_ids), 900):
+                chunk = removed_ids[i : i + 900]
+                placeholders = ", ".join("?" for _ in chunk)
+                db.execute(f"DELETE FROM song_playlist WHERE song_id IN ({placeholders});", chunk)
+                db.execute(f"DELETE FROM song WHERE id IN ({placeholders});", chunk)
+            for i in range(0, len(new_filepaths), 900):
+                chunk = new_filepaths[i : i + 900]
+                placeholders = ", ".join("?" for _ in chunk)
+                result = db.query(f"SELECT id FROM song WHERE filepath IN ({placeholders});", chunk)
+                changes["added"].extend(row[0] for row in result)
+
+        changes["updated"] = [known[row[0]][0] for row in insert_data if row[0] in known]
+        changes["updated"].extend(move[4] for move in plan.moved)
+        changes["removed"] = removed_ids
+    except JobCancelled:
+        raise
+    except Exception as e:
+        error(f"sync_directories() | could not sync {directories}: {e}")
+    return changes
+
+
+class LibraryWatcher(QObject):
+    """
+    Keeps the song table in sync with the library folders while the app is running
+
+    - every library directory is watched with QFileSystemWatcher (inotify on linux)
+    - if they can't all be watched (inotify watch limit), the library gets polled instead
+    - the whole library is also synced every `watch_poll_interval` seconds while watching -
+      directories don't get an event when a file's tags are edited in place, only when files
+      are created, deleted or moved, so that's how edited files are found
+    - change events are debounced, then synced as one batch - a BACKGROUND job on the JobScheduler
+    - a sync doesn't run alongside a job that changes the same songs (`conflicting_jobs`):
+      it waits for them to finish, and a running sync stops (to go again later) when one starts
+    - libraryChangedSignal carries the song ids that changed, so the table can update in place
+    """
+
+    libraryChangedSignal: pyqtSignal = pyqtSignal(dict)
+    # keys of JobScheduler jobs that write the same songs a sync does
+    conflicting_jobs: tuple[str, ...] = ("scan_libraries", "reorganize_files")
+
+    def __init__(self, job_scheduler: JobScheduler, parent=None):
+        super().__init__(parent)
+        self.job_scheduler: JobScheduler = job_scheduler
+        config = ConfigParser()
+        config.read(Path(user_config_dir(appname="musicpom", appauthor="billypom")) / "config.ini")
+        self.libraries: list[str] = [path.strip() for path in config.get("settings", "library").split(",")]
+        self.extensions: list[str] = config.get("settings", "extensions").split(",")
+        self.workers: int = config.getint("settings", "tag_workers", fallback=0)
+        self.debounce_ms: int = config.getint("settings", "watch_debounce_ms", fallback=1000)
+        self.poll_interval: int = config.getint("settings", "watch_poll_interval", fallback=300)
+
+        self.dirty: set[str] = set()
+        # songs whose file went missing in the last sync - removed next sync, unless they were moved
+        self.missing: list[str] = []
+        # the next sync walks every library folder, watched subdirectories included
+        self.full_sync: bool = False
+        self.is_syncing: bool = False
+        self.is_polling: bool = False
+        # the running sync, and what it was given - handed back to the next sync if it's stopped for a conflicting job
+        self.job: Job | None = None
+        self.job_batch: tuple[list[str], list[str], bool] = ([], [], False)
+        self.stopped_for_conflict: bool = False
+
+        self.watcher: QFileSystemWatcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+        self.debounce_timer: QTimer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.timeout.connect(self.sync)
+        self.poll_timer: QTimer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll)
+        self.job_scheduler.jobsChanged.connect(self.on_jobs_changed)
+
+    def start(self) -> None:
+        """Finds every library directory (on a worker thread), then starts watching them"""
+        worker = Worker(get_library_directories, self.libraries)
+        worker.signals.signal_result.connect(self.on_library_directories_found)
+        self.job_scheduler.submit(worker, priority=JobPriority.BACKGROUND, key="watch_library")
+
+    def stop(self) -> None:
+        """Stops watching & polling"""
+        self.poll_timer.stop()
+        self.debounce_timer.stop()
+        directories = self.watcher.directories()
+        if directories:
+            self.watcher.removePaths(directories)
+
+    def on_library_directories_found(self, directories: list[str]) -> None:
+        failed = self.watcher.addPaths(directories)
+        if failed:
+            error(
+                f"LibraryWatcher | could not watch {len(failed)} of {len(directories)} directories, "
+                f"polling every {self.poll_interval or 300}s instead"
+            )
+            self.watcher.removePaths(self.watcher.directories())
+            self.is_polling = True
+            self.poll_timer.start((self.poll_interval or 300) * 1000)
+        else:
+            debug(f"LibraryWatcher | watching {len(directories)} directories")
+            if self.poll_interval > 0:
+                # files edited in place (tags) don't trigger a directory event
+                self.poll_timer.start(self.poll_interval * 1000)
+
+    def on_directory_changed(self, path: str) -> None:
+        """Something was created, deleted or moved in `path` - wait for things to settle down"""
+        self.dirty.add(path)
+        self.debounce_timer.start(self.debounce_ms)
+
+    def poll(self) -> None:
+        """
+        Every library folder gets walked - for changes that didn't come with an event
+        (files edited in place), or everything if nothing is watched
+        """
+        self.full_sync = True
+        self.sync()
+
+    def sync(self) -> None:
+        """Syncs every directory that changed since the last sync"""
+        if self.is_syncing or not (self.dirty or self.missing or self.full_sync):
+            # on_sync_done picks up anything that changed in the meantime
+            return
+        if self.get_conflicting_job() is not None:
+            # on_jobs_changed tries again once it's done
+            return
+        if self.full_sync:
+            directories = list(self.libraries)
+            watched = set()
+        else:
+            directories = sorted(self.dirty)
+            watched = set(self.watcher.directories())
+        missing = self.missing
+        self.job_batch = (sorted(self.dirty), missing, self.full_sync)
+        self.dirty.clear()
+        self.missing = []
+        self.full_sync = False
+        self.is_syncing = True
+        self.stopped_for_conflict = False
+        worker = Worker(
+            sync_directories, directories, watched, self.extensions, self.workers, missing, self.libraries
+        )
+        worker.signals.signal_result.connect(self.on_sync_finished)
+        worker.signals.signal_cancelled.connect(self.on_sync_cancelled)
+        worker.signals.signal_finished.connect(self.on_sync_done)
+        self.job = self.job_scheduler.submit(worker, "Syncing library changes", JobPriority.BACKGROUND, key="sync_library")
+
+    def get_conflicting_job(self) -> Job | None:
+        """A queued or running job that writes the same songs as a sync, if there is one"""
+        for key in self.conflicting_jobs:
+            job = self.job_scheduler.get_job(key)
+            if job is not None:
+                return job
+        return None
+
+    def on_jobs_changed(self) -> None:
+        """Stops a sync when a conflicting job is submitted, and starts the held back one when it's done"""
+        conflicting_job = self.get_conflicting_job()
+        if self.job is not None:
+            if self.job not in self.job_scheduler.jobs:
+                # cancelled before it started - it never finishes, so finish up here
+                self.on_sync_cancelled()
+                self.on_sync_done()
+            elif conflicting_job is not None and self.job.state != CANCELLING:
+                debug(f"LibraryWatcher | stopping the sync, {conflicting_job.key} is changing the same songs")
+                self.stopped_for_conflict = True
+                self.job_scheduler.cancel(self.job)
+        elif (
+            conflicting_job is None
+            and (self.dirty or self.missing or self.full_sync)
+            and not self.debounce_timer.isActive()
+        ):
+            self.sync()
+
+    def on_sync_finished(self, changes: dict[str, list]) -> None:
+        # checked again next sync (after the debounce, if nothing else changes) -
+        # the worker emits signal_finished first, so on_sync_done didn't see these
+        self.missing = changes["missing"]
+        if self.missing and not self.is_syncing:
+            self.debounce_timer.start(self.debounce_ms)
+        if not self.is_polling:
+            watched = set(self.watcher.directories())
+            new_directories = [d for d in changes["directories"] if d not in watched]
+            if new_directories:
+                self.watcher.addPaths(new_directories)
+        if changes["added"] or changes["updated"] or changes["removed"]:
+            debug(
+                f"LibraryWatcher | {len(changes['added'])} added, "
+                f"{len(changes['updated'])} updated, {len(changes['removed'])} removed"
+            )
+            self.libraryChangedSignal.emit(changes)
+
+    def on_sync_cancelled(self) -> None:
+        """
+        Stopped before writing anything - a sync stopped for a conflicting job goes again afterwards
+        One cancelled from the jobs window doesn't, the next poll picks up whatever it was doing
+        """
+        if not self.stopped_for_conflict:
+            return
+        directories, missing, full_sync = self.job_batch
+        self.dirty.update(directories)
+        self.missing = missing + [filepath for filepath in self.missing if filepath not in missing]
+        self.full_sync = self.full_sync or full_sync
+
+    def on_sync_done(self) -> None:
+        if self.job is None:
+            return
+        self.job = None
+        self.is_syncing = False
+        if self.full_sync:
+            self.sync()
+        elif self.dirty or self.missing:
+            self.debounce_timer.start(self.debounce_ms)
@@ -0,0 +1,316 @@
+import os
+import time
+import shutil
+import hashlib
+import threading
+import subprocess
+import numpy as np
+from configparser import ConfigParser
+from logging import debug, error
+from pathlib import Path
+from appdirs import user_cache_dir, user_config_dir
+from utils.pcm_stream import PCMStream, get_decode_command
+
+# Decoded songs, as mono 16 bit PCM .npy files named after get_cache_key()
+cache_dir = Path(user_cache_dir(appname="musicpom", appauthor="billypom")) / "pcm"
+
+# Songs are cached at half of CD rate - the visualizer's bands go up to 11 kHz,
+# and a 5 minute song is ~13 MB on disk instead of ~26 MB
+CACHE_FRAME_RATE = 22050
+# bytes read from ffmpeg at a time while filling
+FILL_CHUNK_BYTES = 1 << 16
+
+# cache file -> the CacheFill writing it, while it's running
+_fills: dict[Path, "CacheFill"] = {}
+# the fill for the song that's playing, if any - cancelled when another song starts
+_playback_fill: "CacheFill | None" = None
+_fill_lock = threading.Lock()
+
+
+def get_cache_size_limit() -> int:
+    """Returns the most the cache may hold, in bytes, from config.ini. 0 = don't cache"""
+    config = ConfigParser()
+    config.read(Path(user_config_dir(appname="musicpom", appauthor="billypom")) / "config.ini")
+    try:
+        return max(0, config.getint("settings", "pcm_cache_size_mb", fallback=1024)) * 1024 * 1024
+    except ValueError:
+        return 0
+
+
+def get_cache_key(filepath: str, frame_rate: int) -> str | None:
+    """
+    Fingerprint of a file - changes when the file is replaced or edited
+    Returns None if the file can't be read
+    """
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    fingerprint = f"{os.path.abspath(filepath)}|{stat.st_size}|{stat.st_mtime_ns}|{frame_rate}"
+    return hashlib.blake2b(fingerprint.encode(), digest_size=16).hexdigest()
+
+
+class CachedPCM:
+    """A decoded song, memory-mapped from the cache. Reads the same as a PCMStream"""
+
+    def __init__(self, cache_file: Path):
+        self.samples: np.ndarray = np.load(cache_file, mmap_mode="r")
+        self._max_sample: int | None = None
+
+    @property
+    def max_sample(self) -> int:
+        """Loudest sample in the song, worked out the first time it's needed"""
+        if self._max_sample is None:
+            # not np.abs - abs(-32768) doesn't fit in an int16
+            self._max_sample = max(1, int(self.samples.max()), -int(self.samples.min()))
+        return self._max_sample
+
+    def read(self, start_index: int, sample_count: int) -> np.ndarray:
+        """Returns samples [start_index, start_index + sample_count), shorter past the end of the song"""
+        return self.samples[start_index : start_index + sample_count]
+
+    def close(self) -> None:
+        pass
+
+
+class CacheFill(threading.Thread):
+    """
+    Decodes a whole song into the cache, in the background
+    What's been decoded so far can be read while it runs (see FillingPCM), so a song is only decoded once
+    """
+
+    def __init__(self, filepath: str, frame_rate: int, cache_file: Path, size_limit: int):
+        super().__init__(daemon=True)
+        self.filepath: str = filepath
+        self.frame_rate: int = frame_rate
+        self.cache_file: Path = cache_file
+        self.size_limit: int = size_limit
+        # per fill names - a cancelled fill of the same song may still be cleaning up
+        self.partial: Path = cache_file.with_suffix(f".{id(self):x}.part")
+        self.temp_file: Path = cache_file.with_suffix(f".{id(self):x}.tmp")
+        self.process: subprocess.Popen | None = None
+        self.cancelled: bool = False
+        self.condition = threading.Condition()
+        # samples written to `partial` so far, and the loudest of them
+        self.decoded: int = 0
+        self.max_sample: int = 1
+        # finished, one way or another - and whether cache_file was written
+        self.done: bool = False
+        self.cached: bool = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.kill()
+
+    def wait(self) -> bool:
+        """Blocks until the fill is done, returns True if the song is in the cache"""
+        self.join()
+        return self.cached
+
+    def run(self) -> None:
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.partial, "wb") as f:
+                self.process = subprocess.Popen(
+                    get_decode_command(self.filepath, self.frame_rate),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+                if self.cancelled:
+                    self.process.kill()
+                assert self.process.stdout is not None
+                leftover = b""
+                while chunk := self.process.stdout.read(FILL_CHUNK_BYTES):
+                    chunk = leftover + chunk
+                    usable = len(chunk) // 2 * 2
+                    leftover = chunk[usable:]
+                    samples = np.frombuffer(chunk[:usable], dtype=np.int16)
+                    f.write(chunk[:usable])
+                    # readers only go up to `decoded`, so it has to be on disk first
+                    f.flush()
+                    with self.condition:
+                        self.decoded += samples.size
+                        if samples.size:
+                            self.max_sample = max(self.max_sample, int(samples.max()), -int(samples.min()))
+                        self.condition.notify_all()
+                self.process.wait()
+            if self.cancelled or self.process.returncode != 0 or not self.decoded:
+                return
+            # .npy header, then the raw samples as they came out of ffmpeg
+            with open(self.temp_file, "wb") as out, open(self.partial, "rb") as raw:
+                np.lib.format.write_array_header_1_0(
+                    out, {"descr": "<i2", "fortran_order": False, "shape": (self.decoded,)}
+                )
+                shutil.copyfileobj(raw, out)
+            with self.condition:
+                os.replace(self.temp_file, self.cache_file)
+                self.cached = True
+            debug(f"CacheFill | cached {self.filepath} -> {self.cache_file}")
+            evict_cache(self.size_limit)
+        except OSError as e:
+            error(f"CacheFill | could not cache {self.filepath}: {e}")
+        finally:
+            process = self.process
+            if process is not None and process.poll() is None:
+                process.kill()
+                process.wait()
+            with self.condition:
+                self.done = True
+                self.partial.unlink(missing_ok=True)
+                self.temp_file.unlink(missing_ok=True)
+                self.condition.notify_all()
+            with _fill_lock:
+                if _fills.get(self.cache_file) is self:
+                    del _fills[self.cache_file]
+
+
+class FillingPCM:
+    """
+    A song that's still being decoded into the cache. Reads the same as a PCMStream
+    Samples come from what the CacheFill has written so far, then from the cache file once it's done
+    (or from a PCMStream of its own, if the fill fails)
+    """
+
+    def __init__(self, fill: CacheFill):
+        self.fill: CacheFill = fill
+        self.source: CachedPCM | PCMStream | None = None
+
+    @property
+    def max_sample(self) -> int:
+        """Loudest sample decoded so far"""
+        if self.source is not None:
+            return self.source.max_sample
+        return self.fill.max_sample
+
+    def read(self, start_index: int, sample_count: int) -> np.ndarray | None:
+        """
+        Returns samples [start_index, start_index + sample_count)
+        Returns None if they aren't decoded yet, or a short array past the end of the song
+        """
+        if self.source is None:
+            fill = self.fill
+            with fill.condition:
+                if not fill.done:
+                    if start_index + sample_count > fill.decoded:
+                        return None
+                    # the fill deletes `partial` under the same lock, once it's done
+                    with open(fill.partial, "rb") as f:
+                        f.seek(start_index * 2)
+                        data = f.read(sample_count * 2)
+                    return np.frombuffer(data[: len(data) // 2 * 2], dtype=np.int16)
+            self.source = (open_cached(fill.cache_file) if fill.cached else None) or PCMStream(
+                fill.filepath, fill.frame_rate
+            )
+        return self.source.read(start_index, sample_count)
+
+    def close(self) -> None:
+        if self.source is not None:
+            self.source.close()
+
+
+def evict_cache(size_limit: int) -> None:
+    """Deletes the least recently played songs until the cache fits in `size_limit` bytes"""
+    try:
+        entries = []
+        for entry in os.scandir(cache_dir):
+            stat = entry.stat()
+            if entry.name.endswith(".npy"):
+                entries.append((stat, entry))
+            elif stat.st_mtime < time.time() - 3600:
+                # left behind by a fill that never finished (the app was closed)
+                os.remove(entry.path)
+    except OSError:
+        return
+    total = sum(stat.st_size for stat, _ in entries)
+    # opening a cache file bumps its mtime, so the oldest mtime was played longest ago
+    for stat, entry in sorted(entries, key=lambda e: e[0].st_mtime):
+        if total <= size_limit:
+            break
+        try:
+            os.remove(entry.path)
+            total -= stat.st_size
+            debug(f"evict_cache() | removed {entry.name}")
+        except OSError as e:
+            error(f"evict_cache() | could not remove {entry.path}: {e}")
+
+
+def open_cached(cache_file: Path) -> CachedPCM | None:
+    """Memory-maps a cached song, None if it isn't in the cache"""
+    if not cache_file.exists():
+        return None
+    try:
+        pcm = CachedPCM(cache_file)
+        # opening a cache file bumps its mtime, see evict_cache()
+        os.utime(cache_file)
+        return pcm
+    except (OSError, ValueError) as e:
+        error(f"open_cached() | unreadable cache file {cache_file}, decoding again: {e}")
+        cache_file.unlink(missing_ok=True)
+        return None
+
+
+def get_fill(filepath: str, frame_rate: int, cache_file: Path, size_limit: int) -> CacheFill | None:
+    """
+    The fill that's writing `cache_file`, started if it isn't running yet
+    Returns None if the song is in the cache already. Call with _fill_lock held
+    """
+    fill = _fills.get(cache_file)
+    if fill is not None and not fill.cancelled:
+        return fill
+    # a fill takes itself out of _fills (under the lock) only after the cache file is there
+    if cache_file.exists():
+        return None
+    fill = CacheFill(filepath, frame_rate, cache_file, size_limit)
+    _fills[cache_file] = fill
+    fill.start()
+    return fill
+
+
+def fill_cache(filepath: str, frame_rate: int = CACHE_FRAME_RATE) -> Path | None:
+    """
+    Decodes a song into the cache and waits for it - or waits for the fill that's already decoding it
+    Returns the cache file, or None if caching is off or the song couldn't be decoded
+    """
+    size_limit = get_cache_size_limit()
+    key = get_cache_key(filepath, frame_rate)
+    if not size_limit or not key:
+        return None
+    cache_file = cache_dir / f"{key}.npy"
+    if cache_file.exists():
+        return cache_file
+    with _fill_lock:
+        fill = get_fill(filepath, frame_rate, cache_file, size_limit)
+    if fill is None or fill.wait():
+        return cache_file
+    return None
+
+
+def open_pcm(filepath: str, frame_rate: int = CACHE_FRAME_RATE) -> CachedPCM | FillingPCM | PCMStream:
+    """
+    Returns the decoded samples of a song, for reading a frame at a time
+
+    - a song that's been played (or prefetched) before is memory-mapped straight from the cache
+    - otherwise it's decoded into the cache in the background, and read from there as it's decoded
+    - with the cache turned off, it's streamed (see PCMStream)
+    """
+    global _playback_fill
+    size_limit = get_cache_size_limit()
+    key = get_cache_key(filepath, frame_rate)
+    if not size_limit or not key:
+        return PCMStream(filepath, frame_rate)
+    cache_file = cache_dir / f"{key}.npy"
+    pcm = open_cached(cache_file)
+    if pcm is not None:
+        return pcm
+    with _fill_lock:
+        # only the song that's playing - skipping through songs shouldn't decode all of them
+        if _playback_fill is not None and _playback_fill.cache_file != cache_file:
+            _playback_fill.cancel()
+        fill = get_fill(filepath, frame_rate, cache_file, size_limit)
+        _playback_fill = fill
+    if fill is None:
+        # finished just now
+        return open_cached(cache_file) or PCMStream(filepath, frame_rate)
+    return FillingPCM(fill)
@@ -0,0 +1,155 @@
+import threading
+import subprocess
+import numpy as np
+from logging import debug, error
+from pydub import AudioSegment
+
+
+def get_decode_command(filepath: str, frame_rate: int, start_seconds: float = 0) -> list[str]:
+    """ffmpeg (the one pydub uses) command that writes mono 16 bit PCM to stdout"""
+    return [
+        AudioSegment.converter,
+        "-v", "quiet",
+        "-ss", f"{start_seconds:.3f}",
+        "-i", filepath,
+        "-f", "s16le",
+        "-ac", "1",
+        "-ar", str(frame_rate),
+        "-",
+    ]
+
+
+class PCMStream:
+    """
+    Decodes an audio file to mono 16 bit PCM a chunk at a time, into a ring buffer
+    that follows the playback position
+
+    - ffmpeg (the one pydub uses) runs in the background, starting at the position asked for
+    - it only decodes `buffer_seconds` ahead of the last read, so memory stays the same for any track length
+    - reading somewhere outside the buffer (a seek) restarts the decode from there
+
+    ```
+    stream = PCMStream(filepath)
+    samples = stream.read(start_index, sample_count)  # None until that part is decoded
+    stream.close()
+    ```
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        frame_rate: int = 44100,
+        buffer_seconds: float = 20,
+        chunk_seconds: float = 0.1,
+    ):
+        self.filepath: str = filepath
+        self.frame_rate: int = frame_rate
+        self.capacity: int = int(buffer_seconds * frame_rate)
+        self.chunk_bytes: int = int(chunk_seconds * frame_rate) * 2
+        # keep a little audio from behind the read position, for small jumps back
+        self.keep_behind: int = self.capacity // 10
+        self.buffer: np.ndarray = np.zeros(self.capacity, dtype=np.int16)
+        # absolute sample indexes that are in the buffer: [start, end)
+        self.start: int = 0
+        self.end: int = 0
+        self.read_position: int = 0
+        # loudest sample decoded so far - for normalising without decoding the whole song first
+        self.max_sample: int = 1
+        self.finished: bool = False
+        self.closed: bool = False
+        self.seek_to: int | None = 0
+        self.process: subprocess.Popen | None = None
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.decode, daemon=True)
+        self.thread.start()
+
+    def read(self, start_index: int, sample_count: int) -> np.ndarray | None:
+        """
+        Returns a copy of samples [start_index, start_index + sample_count)
+        Returns None if they aren't decoded yet, or an empty/short array past the end of the song
+        """
+        with self.condition:
+            self.read_position = start_index
+            end_index = start_index + sample_count
+            if start_index < self.start or start_index > self.end + self.capacity // 2:
+                # seeked somewhere else, start decoding from there
+                if self.seek_to != start_index:
+                    self.seek_to = start_index
+                    self.condition.notify_all()
+                return None
+            if end_index > self.end and not self.finished:
+                # not decoded yet, let the decoder know there's room
+                self.condition.notify_all()
+                return None
+            end_index = min(end_index, self.end)
+            if end_index <= start_index:
+                return np.zeros(0, dtype=np.int16)
+            indexes = np.arange(start_index, end_index) % self.capacity
+            samples = self.buffer[indexes]
+            # the decoder waits for reads to make room
+            self.condition.notify_all()
+            return samples
+
+    def close(self) -> None:
+        """Stops decoding"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.stop_process()
+
+    def start_process(self, start_index: int) -> None:
+        self.stop_process()
+        command = get_decode_command(self.filepath, self.frame_rate, start_index / self.frame_rate)
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def stop_process(self) -> None:
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.kill()
+            process.wait()
+
+    def decode(self) -> None:
+        """Decoder thread - keeps the buffer filled ahead of the read position"""
+        try:
+            while True:
+                with self.condition:
+                    # wait until there's room ahead of the reader, or something else to do
+                    while not self.closed and self.seek_to is None and (
+                        self.finished or self.end - self.read_position >= self.capacity - self.keep_behind
+                    ):
+                        self.condition.wait()
+                    if self.closed:
+                        break
+                    seek_to = self.seek_to
+                    if seek_to is not None:
+                        self.seek_to = None
+                        self.start = self.end = seek_to
+                        self.finished = False
+                if seek_to is not None:
+                    debug(f"PCMStream | decoding {self.filepath} from sample {seek_to}")
+                    self.start_process(seek_to)
+                assert self.process is not None and self.process.stdout is not None
+                chunk = self.process.stdout.read(self.chunk_bytes)
+                with self.condition:
+                    if self.seek_to is not None or self.closed:
+                        # this chunk is from before the seek
+                        continue
+                    if not chunk:
+                        self.finished = True
+                        self.condition.notify_all()
+                        continue
+                    samples = np.frombuffer(chunk[: len(chunk) // 2 * 2], dtype=np.int16)
+                    indexes = np.arange(self.end, self.end + samples.size) % self.capacity
+                    self.buffer[indexes] = samples
+                    self.end += samples.size
+                    self.start = max(self.start, self.end - self.capacity)
+                    if samples.size:
+                        self.max_sample = max(self.max_sample, int(np.abs(samples.astype(np.int32)).max()))
+                    self.condition.notify_all()
+        except Exception as e:
+            error(f"PCMStream | could not decode {self.filepath}: {e}")
+            with self.condition:
+                self.finished = True
+                self.condition.notify_all()
+        finally:
+            self.stop_process()
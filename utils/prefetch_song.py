@@ -0,0 +1,40 @@
+import os
+from logging import debug
+from utils.get_now_playing import get_now_playing
+from utils.pcm_cache import fill_cache
+from utils.waveform_peaks import load_waveform_peaks
+
+# how much of the file is read at a time when warming the cache
+READ_CHUNK_SIZE = 1 << 20
+
+
+def warm_file_cache(filepath: str) -> int:
+    """
+    Reads the whole file and throws it away, so the OS has it cached when the player opens it
+    (a hint like posix_fadvise isn't enough for files on a network share). Returns bytes read
+    """
+    read = 0
+    try:
+        with open(filepath, "rb", buffering=0) as f:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            while chunk := f.read(READ_CHUNK_SIZE):
+                read += len(chunk)
+    except OSError as e:
+        debug(f"warm_file_cache() | {filepath}: {e}")
+    return read
+
+
+def prefetch_song(filepath: str, progress_callback=None) -> dict | None:
+    """
+    Gets the next song ready before the current one ends - for a Worker
+    The file is read into the OS cache and decoded into the PCM cache (once - the waveform is made
+    from that, and the visualizer memory-maps it when the song starts), its album art thumbnail
+    is made if needed, and its tags are read
+
+    Returns get_now_playing()'s dict, so it can be shown straight away when the song starts
+    """
+    warm_file_cache(filepath)
+    fill_cache(filepath)
+    load_waveform_peaks(filepath)
+    return get_now_playing(filepath, lambda: False)
@@ -0,0 +1,135 @@
+import threading
+from dataclasses import dataclass
+from time import perf_counter
+
+# most progress updates a job sends to the gui per second, the rest are folded into the next one
+MAX_UPDATES_PER_SECOND = 10
+
+
+@dataclass
+class Progress:
+    """Where a job is up to - sent through Worker's signal_progress_update"""
+
+    # what the job is doing, "Adding songs"
+    label: str
+    done: int
+    # None if the job doesn't know how much there is (still walking folders)
+    total: int | None
+    # items per second, since the job started
+    rate: float
+    # seconds left, if there's a total
+    eta: float | None
+    # the last thing worked on, usually a filepath
+    item: str
+    finished: bool = False
+
+    def __str__(self) -> str:
+        text = f"{self.label}: {self.done:,}"
+        if self.total is not None:
+            text += f" / {self.total:,}"
+        if self.finished:
+            return f"{text} - done"
+        if self.rate:
+            text += f" | {self.rate:,.0f}/s"
+        if self.eta is not None:
+            minutes, seconds = divmod(int(self.eta), 60)
+            text += f" | {minutes}:{seconds:02d} left"
+        if self.item:
+            text += f" | {self.item}"
+        return text
+
+
+class ProgressReporter:
+    """
+    What a Worker passes to its function as `progress_callback`
+
+    Counts work done, and sends it to the gui as a Progress, at most MAX_UPDATES_PER_SECOND times a second -
+    however many files a job gets through, the event loop only gets a handful of updates
+    ```
+    progress_callback.start(len(files), "Adding songs")
+    for filepath in files:
+        ...
+        progress_callback.advance(item=filepath)
+    ```
+    emit(str) still works for plain status messages, and is throttled the same way
+    """
+
+    def __init__(self, signal_progress, signal_progress_update, max_updates_per_second: float = MAX_UPDATES_PER_SECOND):
+        self.signal_progress = signal_progress
+        self.signal_progress_update = signal_progress_update
+        self.interval: float = 1 / max_updates_per_second
+        self.lock = threading.Lock()
+        self.label: str = ""
+        self.done: int = 0
+        self.total: int | None = None
+        self.item: str = ""
+        self.started: float = perf_counter()
+        self.last_update: float = 0.0
+        # a count / message that hasn't been sent yet
+        self.pending: bool = False
+        self.message: str | None = None
+        self.reported: bool = False
+
+    def start(self, total: int | None = None, label: str = "") -> None:
+        """Starts counting from 0 - `total` is None if it isn't known (yet)"""
+        with self.lock:
+            self.label = label or self.label
+            self.done = 0
+            self.total = total
+            self.item = ""
+            self.started = perf_counter()
+            self.pending = True
+        self.update()
+
+    def set_total(self, total: int | None) -> None:
+        with self.lock:
+            self.total = total
+            self.pending = True
+        self.update()
+
+    def advance(self, count: int = 1, item: str | None = None) -> None:
+        """`count` more things done, `item` being the last of them"""
+        with self.lock:
+            self.done += count
+            if item is not None:
+                self.item = item
+            self.pending = True
+        self.update()
+
+    def emit(self, message: str) -> None:
+        """A plain status message, like the old signal_progress"""
+        with self.lock:
+            self.message = message
+        self.update()
+
+    def get_progress(self, finished: bool = False) -> Progress:
+        elapsed = perf_counter() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total is not None and rate > 0:
+            eta = max(0, self.total - self.done) / rate
+        return Progress(self.label, self.done, self.total, rate, eta, self.item, finished)
+
+    def update(self, force: bool = False) -> None:
+        """Sends whatever has changed, unless something was sent less than `interval` ago"""
+        with self.lock:
+            now = perf_counter()
+            if not force and now - self.last_update < self.interval:
+                return
+            message, self.message = self.message, None
+            progress = self.get_progress() if self.pending else None
+            self.pending = False
+            self.last_update = now
+            self.reported = self.reported or progress is not None
+        if message is not None:
+            self.signal_progress.emit(message)
+        if progress is not None:
+            self.signal_progress_update.emit(progress)
+
+    def finish(self) -> None:
+        """Sends anything held back, then a last update saying the job is done (if it ever reported a count)"""
+        self.update(force=True)
+        if self.reported:
+            with self.lock:
+                progress = self.get_progress(finished=True)
+            self.signal_progress_update.emit(progress)
@@ -0,0 +1,194 @@
+import os
+import json
+import errno
+import shutil
+import hashlib
+import DBA
+from concurrent.futures import ThreadPoolExecutor
+from logging import debug, error
+from pathlib import Path
+from appdirs import user_config_dir
+from utils.cancellation_token import CancellationToken
+
+# Moves that were started but not committed to the database yet
+# - if the app dies in the middle, `recover_reorganize_files()` puts the files back on the next start
+journal_file = Path(user_config_dir(appname="musicpom", appauthor="billypom")) / "reorganize_journal.json"
+
+
+def plan_reorganize(filepaths: list[str], target_dir: str) -> tuple[list[tuple[int, str, str]], dict[str, str]]:
+    """
+    Works out where every file goes - target_dir/Artist/Album/filename - using the song table,
+    without opening the audio files
+
+    Returns a tuple of ([(song id, filepath, new filepath)], {filepath: reason it can't be moved})
+    """
+    rows = []
+    with DBA.DBAccess() as db:
+        for i in range(0, len(filepaths), 900):
+            chunk = filepaths[i : i + 900]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows.extend(
+                db.query(f"SELECT id, filepath, artist, album FROM song WHERE filepath IN ({placeholders});", chunk)
+            )
+    moves: list[tuple[int, str, str]] = []
+    failed: dict[str, str] = {}
+    destinations: set[str] = set()
+    for song_id, filepath, artist, album in rows:
+        # a / in a tag would make an extra folder
+        artist = (artist or "").replace(os.sep, "-").strip() or "Unknown Artist"
+        album = (album or "").replace(os.sep, "-").strip() or "Unknown Album"
+        new_path = os.path.join(target_dir, artist, album, os.path.basename(filepath))
+        if new_path == filepath:
+            continue
+        if new_path in destinations or os.path.exists(new_path):
+            failed[filepath] = f"Another file is already at {new_path}"
+            continue
+        destinations.add(new_path)
+        moves.append((song_id, filepath, new_path))
+    found = {row[1] for row in rows}
+    for filepath in filepaths:
+        if filepath not in found:
+            failed[filepath] = "Not in the library"
+    return moves, failed
+
+
+def file_digest(filepath: str) -> bytes:
+    with open(filepath, "rb") as f:
+        return hashlib.file_digest(f, "blake2b").digest()
+
+
+def move_file(source: str, destination: str) -> None:
+    """
+    Moves one file, without overwriting anything
+    A rename if both paths are on the same filesystem, otherwise copy, verify, then delete the original
+    """
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    if os.path.exists(destination):
+        raise FileExistsError(errno.EEXIST, "Destination already exists", destination)
+    try:
+        os.rename(source, destination)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    partial = destination + ".part"
+    try:
+        shutil.copy2(source, partial)
+        if os.path.getsize(partial) != os.path.getsize(source) or file_digest(partial) != file_digest(source):
+            raise OSError(f"Copy of {source} does not match the original")
+        os.replace(partial, destination)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    os.remove(source)
+
+
+def write_journal(moves: list[tuple[int, str, str]]) -> None:
+    """Writes the planned moves to disk, atomically, before any file is touched"""
+    temp_file = journal_file.with_suffix(".tmp")
+    with open(temp_file, "w") as f:
+        json.dump({"moves": moves}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, journal_file)
+
+
+def undo_moves(moves: list[tuple[int, str, str]]) -> None:
+    """Puts moved files back where they came from"""
+    for _, source, destination in moves:
+        if os.path.exists(destination) and not os.path.exists(source):
+            try:
+                move_file(destination, source)
+                debug(f"undo_moves() | {destination} -> {source}")
+            except OSError as e:
+                error(f"undo_moves() | could not move {destination} back to {source}: {e}")
+
+
+def reorganize_files(
+    filepaths: list[str],
+    target_dir: str,
+    workers: int = 8,
+    progress_callback=None,
+    cancel_token: CancellationToken | None = None,
+) -> tuple[bool, dict[str, str]]:
+    """
+    Moves songs into target_dir/Artist/Album/filename
+
+    1. every move is planned up front from the song table
+    2. the plan is written to a journal
+    3. files are moved on a pool of threads
+    4. every filepath is updated in one transaction
+    5. the journal is deleted
+    If the database update fails, the files are moved back
+    If `cancel_token` is cancelled, files that haven't been moved yet stay where they are
+    - the ones already moved are still saved to the database
+
+    Returns a tuple of (success, {filepath: reason}) for files that weren't moved
+    """
+    moves, failed = plan_reorganize(filepaths, target_dir)
+    if not moves:
+        return True, failed
+    write_journal(moves)
+
+    def move(planned: tuple[int, str, str]) -> tuple[tuple[int, str, str], str | None]:
+        """Returns (planned move, why it wasn't moved) - None if it was"""
+        if cancel_token and cancel_token.is_cancelled():
+            return planned, "Cancelled"
+        try:
+            move_file(planned[1], planned[2])
+        except OSError as e:
+            error(f"reorganize_files() | Error moving file: {planned[1]} | {e}")
+            return planned, f"Error moving file: {e}"
+        return planned, None
+
+    done: list[tuple[int, str, str]] = []
+    if progress_callback:
+        progress_callback.start(len(moves), "Organizing")
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for planned, reason in executor.map(move, moves):
+            if progress_callback:
+                progress_callback.advance(item=planned[1])
+            if reason is None:
+                done.append(planned)
+            else:
+                failed[planned[1]] = reason
+
+    try:
+        with DBA.DBAccess() as db:
+            db.executemany(
+                "UPDATE song SET filepath = ?, file_inode = ? WHERE id = ?;",
+                [(destination, os.stat(destination).st_ino, song_id) for song_id, _, destination in done],
+            )
+    except Exception as e:
+        error(f"reorganize_files() | could not update the database, moving files back: {e}")
+        undo_moves(done)
+        journal_file.unlink(missing_ok=True)
+        return False, {source: f"Database update failed: {e}" for _, source, _ in done} | failed
+    journal_file.unlink(missing_ok=True)
+    debug(f"reorganize_files() | moved {len(done)} files, {len(failed)} failed")
+    return True, failed
+
+
+def recover_reorganize_files() -> None:
+    """
+    Finishes off a reorganize that was interrupted - run at startup
+    Moves that made it into the database are kept, the rest are moved back
+    """
+    if not journal_file.exists():
+        return
+    try:
+        with open(journal_file) as f:
+            moves = [tuple(move) for move in json.load(f)["moves"]]
+    except (OSError, ValueError, KeyError) as e:
+        error(f"recover_reorganize_files() | unreadable journal {journal_file}: {e}")
+        return
+    with DBA.DBAccess() as db:
+        committed = set()
+        for i in range(0, len(moves), 900):
+            chunk = moves[i : i + 900]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = db.query(f"SELECT id, filepath FROM song WHERE id IN ({placeholders});", [m[0] for m in chunk])
+            committed.update(rows)
+    undo_moves([move for move in moves if (move[0], move[2]) not in committed])
+    journal_file.unlink(missing_ok=True)
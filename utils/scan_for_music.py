@@ -1,31 +1,211 @@
 import os
+import DBA
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from logging import debug
 from utils.add_files_to_database import add_files_to_database
+from utils.audio_file_walker import AudioFileWalker
+from utils.cancellation_token import CancellationToken
+from utils.scan_pipeline import stat_files
 from configparser import ConfigParser
 from pathlib import Path
 from appdirs import user_config_dir
 
 
 
-def scan_for_music(progress_callback=None):
+def scan_for_music(
+    incremental: bool = True, progress_callback=None, cancel_token: CancellationToken | None = None
+) -> tuple[bool, dict[str, str]]:
     """
     Scans for audio files in user-defined paths
     - Paths are defined in config file
-    - Accepted file extensions are defined in config file
+    - Accepted file extensions, and folders to skip, are defined in config file
     - Adds found file to database
+
+    Files are handed on as the library is walked (walk -> stat -> tags -> insert),
+    so songs start showing up in the database straight away
+
+    Args:
+        incremental: only read tags for new or changed files (see `rescan_files()`)
+        progress_callback: emit data for user feedback
+        cancel_token: stops the scan early - songs already read stay in the database
+
+    Returns a tuple of (success, {filepath: details}) for files that failed or were removed
+    Raises JobCancelled if it was cancelled
     """
     if progress_callback:
         progress_callback.emit('Scanning libraries...')
     config = ConfigParser()
     config.read(Path(user_config_dir(appname="musicpom", appauthor="billypom")) / "config.ini")
     libraries = [path.strip() for path in config.get("settings", "library").split(',')]
-    extensions = config.get("settings", "extensions").split(",")
-
-    # Use each library as root dir, walk the dir and find files
-    for library in libraries:
-        files_to_add = []
-        for dirpath, _, filenames in os.walk(library):
-            for file in filenames:
-                filename = os.path.join(dirpath, file)
-                if any(filename.lower().endswith(ext) for ext in extensions):
-                    files_to_add.append(filename)
-        add_files_to_database(files_to_add, progress_callback)
+    walker = AudioFileWalker.from_config(config)
+
+    # Use each library as root dir - walked on other threads, a bounded queue ahead of the tag reading
+    if incremental:
+        return rescan_files(walker.walk(libraries), progress_callback=progress_callback, cancel_token=cancel_token)
+    return add_files_to_database(
+        walker.walk_paths(libraries), progress_callback=progress_callback, cancel_token=cancel_token
+    )
+
+move_song_sql = "UPDATE song SET filepath = ?, file_size = ?, file_mtime = ?, file_inode = ? WHERE id = ?;"
+
+
+@dataclass
+class RescanPlan:
+    """What needs to happen to the song table so it matches the files on disk"""
+    new: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    # (new filepath, size, mtime, inode, song id) - ready for an UPDATE
+    moved: list[tuple[str, int, int, int, int]] = field(default_factory=list)
+    # {filepath: song id} for library files that are gone from disk
+    removed: dict[str, int] = field(default_factory=dict)
+    # {filepath: reason} for files that could not be looked at
+    failed: dict[str, str] = field(default_factory=dict)
+    unchanged: int = 0
+
+
+def get_known_files(directory: str | None = None) -> dict[str, tuple[int, int | None, int | None, int | None]]:
+    """
+    Returns {filepath: (song id, size, mtime, inode)} for songs in the library
+    or only the songs somewhere underneath `directory`, if given
+    """
+    with DBA.DBAccess() as db:
+        if directory is None:
+            rows = db.query("SELECT id, filepath, file_size, file_mtime, file_inode FROM song;", ())
+        else:
+            prefix = directory.rstrip("/") + "/"
+            rows = db.query(
+                "SELECT id, filepath, file_size, file_mtime, file_inode FROM song WHERE substr(filepath, 1, ?) = ?;",
+                (len(prefix), prefix),
+            )
+    return {filepath: (song_id, size, mtime, inode) for song_id, filepath, size, mtime, inode in rows}
+
+
+def plan_rescan(
+    filepaths: list[str], known: dict[str, tuple[int, int | None, int | None, int | None]]
+) -> RescanPlan:
+    """
+    Compares files found on disk against `known` library files, using stat() info only
+    - unchanged files (same size & mtime) are skipped
+    - new or changed files need their tags read
+    - files that moved (known inode, size & mtime at a new path) only need their filepath updated
+    - known files that are no longer on disk are removed
+    """
+    plan = RescanPlan()
+    unknown: dict[str, os.stat_result] = {}
+    seen: set[str] = set()
+    for filepath in filepaths:
+        try:
+            stat = os.stat(filepath)
+        except OSError as e:
+            plan.failed[filepath] = f"Could not stat file: {e}"
+            continue
+        seen.add(filepath)
+        if filepath not in known:
+            unknown[filepath] = stat
+            continue
+        _, size, mtime, _ = known[filepath]
+        if size != stat.st_size or mtime != stat.st_mtime_ns:
+            plan.changed.append(filepath)
+        else:
+            plan.unchanged += 1
+
+    # Library files that weren't found on disk - either moved or removed
+    # (songs added from outside of the library folders still exist, leave them be)
+    gone = [filepath for filepath in known if filepath not in seen and not os.path.exists(filepath)]
+    # a rename keeps inode, size and mtime - all 3 have to match, since inodes get reused
+    missing = {
+        (known[filepath][3], known[filepath][1], known[filepath][2]): (known[filepath][0], filepath)
+        for filepath in gone
+        if known[filepath][3] is not None
+    }
+    for filepath, stat in unknown.items():
+        match = missing.pop((stat.st_ino, stat.st_size, stat.st_mtime_ns), None)
+        if match is None:
+            plan.new.append(filepath)
+        else:
+            song_id, old_filepath = match
+            debug(f"plan_rescan() | moved: {old_filepath} -> {filepath}")
+            plan.moved.append((filepath, stat.st_size, stat.st_mtime_ns, stat.st_ino, song_id))
+    moved_ids = {move[4] for move in plan.moved}
+    for filepath in gone:
+        if known[filepath][0] not in moved_ids:
+            plan.removed[filepath] = known[filepath][0]
+    debug(
+        f"plan_rescan() | {len(plan.new)} new, {len(plan.changed)} changed, {len(plan.moved)} moved, "
+        f"{len(plan.removed)} removed, {plan.unchanged} unchanged"
+    )
+    return plan
+
+
+def rescan_files(
+    filepaths: Iterable[str | os.DirEntry], progress_callback=None, cancel_token: CancellationToken | None = None
+) -> tuple[bool, dict[str, str]]:
+    """
+    Brings the song table up to date with `filepaths`, reading tags only for new or changed files
+    Library files that are no longer on disk are reported, not deleted
+
+    Like plan_rescan(), but decides file by file as `filepaths` come in, instead of needing them all first
+    - unchanged files (same size & mtime) are skipped
+    - new or changed files go straight on to have their tags read
+    - files that moved (known inode, size & mtime, old path gone) only get their filepath updated
+
+    Returns a tuple of (success, {filepath: details}) for files that failed or were removed
+    Raises JobCancelled if `cancel_token` is cancelled - moves found so far are still saved,
+    but nothing is reported as removed, since not every file was looked at
+    """
+    known = get_known_files()
+    # a rename keeps inode, size and mtime - all 3 have to match, since inodes get reused
+    identities = {
+        (inode, size, mtime): filepath
+        for filepath, (_, size, mtime, inode) in known.items()
+        if inode is not None
+    }
+    details: dict[str, str] = {}
+    moved: list[tuple[str, int, int, int, int]] = []
+    unchanged = 0
+
+    def get_files_to_read():
+        nonlocal unchanged
+        for filepath, stat in stat_files(filepaths, details):
+            if cancel_token and cancel_token.is_cancelled():
+                # stop handing out files - add_files_to_database() saves what it has, then raises
+                return
+            if progress_callback:
+                progress_callback.advance(item=filepath)
+            # whatever is left in `known` afterwards wasn't found
+            row = known.pop(filepath, None)
+            if row is not None:
+                _, size, mtime, _ = row
+                if size == stat.st_size and mtime == stat.st_mtime_ns:
+                    unchanged += 1
+                    continue
+                yield filepath
+                continue
+            old_filepath = identities.get((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+            if old_filepath in known and not os.path.exists(old_filepath):
+                debug(f"rescan_files() | moved: {old_filepath} -> {filepath}")
+                song_id = known.pop(old_filepath)[0]
+                moved.append((filepath, stat.st_size, stat.st_mtime_ns, stat.st_ino, song_id))
+                continue
+            yield filepath
+
+    if progress_callback:
+        # every file on disk counts, not just the ones that need their tags read
+        progress_callback.start(None, "Scanning library")
+    # new files can't clash with an existing row, so one upsert covers new & changed
+    try:
+        success, failed = add_files_to_database(get_files_to_read(), replace_existing=True, cancel_token=cancel_token)
+    finally:
+        if moved:
+            with DBA.DBAccess() as db:
+                db.executemany(move_song_sql, moved)
+    if success:
+        details.update(failed)
+    # Library files that weren't found on disk
+    # (songs added from outside of the library folders still exist, leave them be)
+    removed = [filepath for filepath in known if not os.path.exists(filepath)]
+    for filepath in removed:
+        details[filepath] = "File no longer exists on disk"
+    debug(f"rescan_files() | {len(moved)} moved, {len(removed)} removed, {unchanged} unchanged")
+    return True, details
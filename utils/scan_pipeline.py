@@ -0,0 +1,78 @@
+import os
+import queue
+import threading
+from collections.abc import Iterable, Iterator
+from logging import debug
+
+# how many items a buffered() stage can get ahead of the stage reading from it
+QUEUE_SIZE = 1000
+
+_DONE = object()
+
+
+class _Failed:
+    """Carries an exception from a buffered() stage's thread to the reader"""
+
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+def buffered(iterable: Iterable, maxsize: int = QUEUE_SIZE) -> Iterator:
+    """
+    Runs `iterable` on its own thread, through a bounded queue
+    - the producer blocks once it's `maxsize` items ahead, so memory stays flat however big the input is
+    - exceptions in the producer are raised in the reader
+    - if the reader stops early (or is closed), the producer stops too
+    """
+    items: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_Failed(e))
+            return
+        put(_DONE)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failed):
+                raise item.exception
+            yield item
+    finally:
+        stop.set()
+
+
+def stat_files(
+    files: Iterable[str | os.DirEntry], failed: dict[str, str]
+) -> Iterator[tuple[str, os.stat_result]]:
+    """
+    Yields (filepath, stat) for each file. Files that can't be stat()ed go in `failed` instead
+    DirEntry's from AudioFileWalker use their cached stat()
+    """
+    for file in files:
+        filepath = file.path if isinstance(file, os.DirEntry) else file
+        try:
+            stat = file.stat() if isinstance(file, os.DirEntry) else os.stat(filepath)
+        except OSError as e:
+            debug(f"stat_files() | {filepath}: {e}")
+            failed[filepath] = f"Could not stat file: {e}"
+            continue
+        yield filepath, stat
@@ -1,37 +1,65 @@
+import base64
+from mutagen import FileType
+from mutagen.flac import FLAC, Picture
+from mutagen.easymp4 import EasyMP4
+from mutagen.mp4 import MP4Cover
 from mutagen.id3._frames import APIC
 from mutagen.id3 import ID3
+from utils.art_cache import get_apic_data, get_picture_data, update_art_hash
+from utils.get_tags import get_tags_for_writing
 
 
 def set_album_art(song_filepath: str, art_filepath: str) -> None:
-    """Updates the ID3 tag APIC (album art) for a song
+    """Updates the album art for a song - the ID3 tag APIC, or the format's own picture for flac, ogg & m4a
 
     Args:
         `song_filepath`: fully qualified path to audio file
         `art_filepath` : fully qualified path to picture file
     """
-    audio = ID3(song_filepath)
-    # Remove existing APIC Frames (album art)
-    audio.delall("APIC")
-    # Add the album art
+    audio = get_tags_for_writing(song_filepath)
+    tags = audio.tags if isinstance(audio, FileType) else audio
+    if art_filepath.endswith(".jpg") or art_filepath.endswith(".jpeg"):
+        mime = "image/jpeg"
+    elif art_filepath.endswith(".png"):
+        mime = "image/png"
+    else:
+        mime = None
     with open(art_filepath, "rb") as art:
-        if art_filepath.endswith(".jpg") or art_filepath.endswith(".jpeg"):
-            audio.add(
+        data = art.read()
+    if isinstance(tags, ID3):
+        # Remove existing APIC Frames (album art)
+        tags.delall("APIC")
+        # Add the album art
+        if mime:
+            tags.add(
                 APIC(
                     encoding=3,  # 3 = utf-8
-                    mime="image/jpeg",
+                    mime=mime,
                     type=3,  # 3 = cover image
                     desc="Cover",
-                    data=art.read(),
+                    data=data,
                 )
             )
-        elif art_filepath.endswith(".png"):
-            audio.add(
-                APIC(
-                    encoding=3,  # 3 = utf-8
-                    mime="image/png",
-                    type=3,  # 3 = cover image
-                    desc="Cover",
-                    data=art.read(),
-                )
-            )
-    audio.save()
+    elif isinstance(audio, EasyMP4):
+        if "cover" in tags:
+            del tags["cover"]
+        if mime:
+            image_format = MP4Cover.FORMAT_PNG if mime == "image/png" else MP4Cover.FORMAT_JPEG
+            tags["cover"] = [MP4Cover(data, imageformat=image_format)]
+    else:
+        picture = Picture()
+        picture.type = 3  # 3 = cover image
+        picture.mime = mime or ""
+        picture.desc = "Cover"
+        picture.data = data
+        if isinstance(audio, FLAC):
+            audio.clear_pictures()
+            if mime:
+                audio.add_picture(picture)
+        # ogg files keep their pictures in a vorbis comment
+        elif mime:
+            tags["metadata_block_picture"] = [base64.b64encode(picture.write()).decode("ascii")]
+        elif "metadata_block_picture" in tags:
+            del tags["metadata_block_picture"]
+    audio.save(song_filepath)
+    update_art_hash(song_filepath, get_apic_data(audio) if isinstance(audio, ID3) else get_picture_data(audio))
@@ -1,16 +1,18 @@
-from logging import debug, error, warning
+from logging import debug, warning
 from components import ErrorDialog
 from components.HeaderTags import HeaderTags2
+from mutagen import FileType
 from mutagen.id3 import ID3
-from mutagen.id3._util import ID3NoHeaderError
 from mutagen.id3._frames import USLT, Frame
+from utils.get_tags import easy_keys, get_tags_for_writing
 
 def set_tag(filepath: str, db_column: str, value: str):
     """
     Sets the ID3 tag for a file given a filepath, db_column, and a value for the tag
+    Formats without ID3 tags (flac, ogg, opus, m4a) get the same tag by its "easy" name, see `easy_keys`
 
     Args:
-        filepath: path to the mp3 file
+        filepath: path to the audio file
         db_column: db column name of the ID3 tag
         value: value to set for the tag
 
@@ -21,21 +23,23 @@ def set_tag(filepath: str, db_column: str, value: str):
     debug(f"filepath: {filepath} | db_column: {db_column} | value: {value}")
 
     try:
-        try:  # Load existing tags
-            audio_file = ID3(filepath)
-        except ID3NoHeaderError:  # Create new tags if none exist
-            audio_file = ID3()
+        audio_file = get_tags_for_writing(filepath)
+        tags = audio_file.tags if isinstance(audio_file, FileType) else audio_file
+        if not isinstance(tags, ID3):
+            if db_column not in easy_keys:
+                warning(f'Tag "{db_column}" not found - tag update skipped')
+            elif value:
+                tags[easy_keys[db_column]] = [value]
+            elif easy_keys[db_column] in tags:
+                del tags[easy_keys[db_column]]
+            audio_file.save(filepath)
+            return True
         # Lyrics get handled differently
         if db_column == "lyrics":
-            try:
-                audio = ID3(filepath)
-            except Exception as e:
-                error(f"ran into an exception: {e}")
-                audio = ID3()
-            audio.delall("USLT")
+            tags.delall("USLT")
             frame = USLT(encoding=3, text=value)
-            audio.add(frame)
-            audio.save()
+            tags.add(frame)
+            audio_file.save(filepath)
             return True
         # DB Tag into Mutagen Frame Class
         if db_column in headers.db:
@@ -43,7 +47,7 @@ def set_tag(filepath: str, db_column: str, value: str):
             assert frame_class is not None # ooo scary
             if issubclass(frame_class, Frame):
                 frame = frame_class(encoding=3, text=[value])
-                audio_file.add(frame)
+                tags.add(frame)
         else:
             warning(f'Tag "{db_column}" not found - ID3 tag update skipped')
         audio_file.save(filepath)
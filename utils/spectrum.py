@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from functools import lru_cache
+import numpy as np
+
+
+@dataclass(frozen=True)
+class LogBands:
+    """Everything about a spectrum's log frequency bands that only depends on the frame size"""
+
+    window: np.ndarray  # hanning window, 1 per sample
+    edges: np.ndarray  # [start, end, start, end, ...] rfft bin of each band, for np.maximum.reduceat
+    empty: np.ndarray  # True for bands without any rfft bins
+    weights: np.ndarray  # sensitivity boost per band, higher bands get more
+
+
+@lru_cache(maxsize=16)
+def get_log_bands(sample_count: int, resolution: int, sampling_window_length: float, sensitivity: float) -> LogBands:
+    """
+    Splits the rfft bins of a `sample_count` long frame into `resolution` log spaced bands
+
+    Frequencies are in the same units the analyser has always used: np.fft.fftfreq(sample_count, d=sampling_window_length)
+    A band i holds the bins with a frequency in (log_freqs[i] - 1 / resolution, log_freqs[i])
+    """
+    freq = np.fft.rfftfreq(sample_count, d=sampling_window_length)
+    # highest positive frequency fftfreq gives (rfft also has nyquist, for even frame sizes)
+    max_freq = ((sample_count - 1) // 2) / (sample_count * sampling_window_length)
+    log_freqs = np.logspace(np.log10(freq[1]), np.log10(max_freq), resolution)
+    point_range = 1 / resolution
+    starts = np.searchsorted(freq, log_freqs - point_range, side="right")
+    ends = np.searchsorted(freq, log_freqs, side="left")
+    empty = ends <= starts
+    # reduceat needs in-range indexes, empty bands get zeroed afterwards anyway
+    edges = np.minimum(np.column_stack((starts, ends)).ravel(), freq.size - 1)
+    weights = ((1 + sensitivity) / 10 + (sensitivity - 1) / 10) ** (np.arange(resolution) / 50)
+    return LogBands(np.hanning(sample_count), edges, empty, weights)
+
+
+def log_band_amplitudes(
+    v_sample: np.ndarray, resolution: int, sampling_window_length: float = 0.05, sensitivity: float = 10
+) -> np.ndarray:
+    """
+    Returns the loudest amplitude in each of `resolution` log spaced frequency bands of a frame of samples
+    Raises ValueError if the frame is too short to have a spectrum
+    """
+    if v_sample.size < 2:
+        raise ValueError("Not enough samples for a spectrum")
+    bands = get_log_bands(v_sample.size, resolution, sampling_window_length, sensitivity)
+    # Use a window function to reduce spectral leakage
+    amps = np.abs(np.fft.rfft(v_sample * bands.window)) * (2 / v_sample.size)
+    # reduceat gives the max of [start, end) for each band at the even indexes
+    # (the odd ones are the gaps between bands, and get thrown away)
+    points = np.maximum.reduceat(amps, bands.edges)[::2]
+    points[bands.empty] = 0
+    return points * bands.weights
+
+
+def decay_points(points: np.ndarray, amps: np.ndarray, playing: bool) -> np.ndarray:
+    """
+    Fades the previous frame's points towards the new amplitudes, in place
+    Peaks rise straight away, falling bands fade out smoothly, everything fades fast when not playing
+    """
+    if not playing:
+        # More aggressive decay when no audio is playing
+        points *= 0.7
+    else:
+        falling = amps < points
+        points[falling] = points[falling] * 0.8 + amps[falling] * 0.2
+        points[~falling] = amps[~falling]
+    # Set a lower threshold to properly reach zero
+    points[points < 1e-4] = 0
+    return points
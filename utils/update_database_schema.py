@@ -0,0 +1,40 @@
+import DBA
+from logging import debug
+from utils.initialize_db import create_song_fts
+
+# Columns added to the song table after the original release
+# - existing databases get these via ALTER TABLE, new ones get them from sql/init.sql
+song_columns: dict[str, str] = {
+    "file_size": "integer",
+    "file_mtime": "integer",
+    "file_inode": "integer",
+    "lyrics": "text",
+    "art_hash": "varchar(32)",
+}
+
+# Indexes used by the music table's ORDER BY (see MusicTable.get_order_by_clause)
+song_indexes: dict[str, str] = {
+    "song_artist_album_idx": "artist COLLATE NOCASE, album COLLATE NOCASE, track_number COLLATE NOCASE",
+    "song_album_idx": "album COLLATE NOCASE, track_number COLLATE NOCASE",
+    "song_title_idx": "title COLLATE NOCASE",
+}
+
+
+def update_database_schema() -> None:
+    """
+    Brings an existing database up to date with sql/init.sql
+    Adds any missing columns & indexes to the song table, and the song_fts search index.
+    Safe to run every startup
+    """
+    with DBA.DBAccess() as db:
+        existing = [row[1] for row in db.query("PRAGMA table_info(song);", ())]
+        for column, column_type in song_columns.items():
+            if column not in existing:
+                debug(f"update_database_schema() | adding song.{column}")
+                db.execute(f"ALTER TABLE song ADD COLUMN {column} {column_type};", ())
+        for index, columns in song_indexes.items():
+            db.execute(f"CREATE INDEX IF NOT EXISTS {index} ON song ({columns});", ())
+        tables = [row[0] for row in db.query("SELECT name FROM sqlite_master WHERE type = 'table';", ())]
+        if "song_fts" not in tables:
+            debug("update_database_schema() | building the song_fts search index")
+            create_song_fts(db)
@@ -0,0 +1,295 @@
+import os
+import json
+import struct
+import threading
+import subprocess
+import DBA
+import numpy as np
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from logging import debug, error
+from pathlib import Path
+from appdirs import user_cache_dir
+from utils.pcm_cache import CACHE_FRAME_RATE, cache_dir as pcm_cache_dir, fill_cache, get_cache_key
+from utils.pcm_stream import get_decode_command
+from utils.cancellation_token import CancellationToken
+
+# Waveform peaks files, named after get_cache_key(), and an index of {filepath: key}
+peaks_dir = Path(user_cache_dir(appname="musicpom", appauthor="billypom")) / "waveforms"
+index_file = peaks_dir / "index.json"
+_index_lock = threading.Lock()
+
+# .peaks file layout (little endian):
+#   header: magic, version, sample rate, number of levels
+#   per level: samples per bucket, number of buckets
+#   per level: [min, max, min, max, ...] int16
+PEAKS_MAGIC = b"MPWF"
+PEAKS_VERSION = 1
+HEADER = struct.Struct("<4sHIH")
+LEVEL_HEADER = struct.Struct("<II")
+
+
+class WaveformPeaks:
+    """
+    Min/max of a song's samples per bucket, at a few zoom levels
+
+    The first level has a bucket every `samples_per_bucket` samples,
+    each level after that has buckets `factor` times bigger
+    """
+
+    def __init__(self, sample_rate: int, levels: list[tuple[int, np.ndarray]]):
+        self.sample_rate: int = sample_rate
+        # [(samples per bucket, (buckets, 2) array of min & max)], finest first
+        self.levels: list[tuple[int, np.ndarray]] = levels
+
+    @property
+    def duration_ms(self) -> int:
+        samples_per_bucket, peaks = self.levels[0]
+        return int(len(peaks) * samples_per_bucket * 1000 / self.sample_rate)
+
+    def get_peaks(self, buckets: int) -> np.ndarray:
+        """
+        Returns `buckets` rows of [min, max], from -1 to 1, covering the whole song
+        Uses the coarsest level that still has at least that many buckets
+        """
+        level = self.levels[0][1]
+        for _, peaks in reversed(self.levels):
+            if len(peaks) >= buckets:
+                level = peaks
+                break
+        if buckets <= 0 or not len(level):
+            return np.zeros((0, 2))
+        edges = np.linspace(0, len(level), buckets, endpoint=False).astype(np.intp)
+        mins = np.minimum.reduceat(level[:, 0], edges)
+        maxs = np.maximum.reduceat(level[:, 1], edges)
+        return np.column_stack((mins, maxs)) / 32768
+
+    def save(self, filepath: Path) -> None:
+        """Writes a .peaks file, atomically"""
+        temp_file = filepath.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(temp_file, "wb") as f:
+            f.write(HEADER.pack(PEAKS_MAGIC, PEAKS_VERSION, self.sample_rate, len(self.levels)))
+            for samples_per_bucket, peaks in self.levels:
+                f.write(LEVEL_HEADER.pack(samples_per_bucket, len(peaks)))
+            for _, peaks in self.levels:
+                f.write(peaks.astype("<i2").tobytes())
+        os.replace(temp_file, filepath)
+
+    @classmethod
+    def load(cls, filepath: Path) -> "WaveformPeaks":
+        """Reads a .peaks file. Raises ValueError if it isn't one"""
+        data = filepath.read_bytes()
+        magic, version, sample_rate, level_count = HEADER.unpack_from(data)
+        if magic != PEAKS_MAGIC or version != PEAKS_VERSION:
+            raise ValueError(f"Not a version {PEAKS_VERSION} peaks file")
+        offset = HEADER.size
+        level_sizes = []
+        for _ in range(level_count):
+            level_sizes.append(LEVEL_HEADER.unpack_from(data, offset))
+            offset += LEVEL_HEADER.size
+        levels = []
+        for samples_per_bucket, bucket_count in level_sizes:
+            peaks = np.frombuffer(data, dtype="<i2", count=bucket_count * 2, offset=offset).reshape(-1, 2)
+            levels.append((samples_per_bucket, peaks))
+            offset += bucket_count * 4
+        return cls(sample_rate, levels)
+
+
+def iter_pcm_chunks(filepath: str, frame_rate: int, chunk_samples: int = 1 << 18) -> Iterator[np.ndarray]:
+    """
+    Yields the song's mono 16 bit samples, a chunk at a time
+    From the visualizer's cache if it's there (see pcm_cache.py), otherwise from ffmpeg
+    """
+    key = get_cache_key(filepath, frame_rate)
+    cache_file = pcm_cache_dir / f"{key}.npy"
+    if key and cache_file.exists():
+        try:
+            samples = np.load(cache_file, mmap_mode="r")
+        except (OSError, ValueError):
+            pass
+        else:
+            for start in range(0, len(samples), chunk_samples):
+                yield np.asarray(samples[start : start + chunk_samples])
+            return
+    process = subprocess.Popen(
+        get_decode_command(filepath, frame_rate), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    assert process.stdout is not None
+    try:
+        leftover = b""
+        while chunk := process.stdout.read(chunk_samples * 2):
+            chunk = leftover + chunk
+            usable = len(chunk) // 2 * 2
+            leftover = chunk[usable:]
+            yield np.frombuffer(chunk[:usable], dtype=np.int16)
+        if process.wait() != 0:
+            raise OSError(f"ffmpeg could not decode {filepath}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def compute_peaks(
+    chunks: Iterator[np.ndarray],
+    sample_rate: int,
+    samples_per_bucket: int = 256,
+    level_count: int = 5,
+    factor: int = 4,
+) -> WaveformPeaks:
+    """Min/max per bucket of a stream of samples, then each coarser level from the one before it"""
+    parts = []
+    leftover = np.zeros(0, dtype=np.int16)
+    for chunk in chunks:
+        samples = np.concatenate((leftover, chunk)) if leftover.size else chunk
+        whole = samples.size - samples.size % samples_per_bucket
+        buckets = samples[:whole].reshape(-1, samples_per_bucket)
+        parts.append(np.column_stack((buckets.min(axis=1), buckets.max(axis=1))))
+        leftover = samples[whole:]
+    if leftover.size:
+        parts.append(np.array([[leftover.min(), leftover.max()]]))
+    peaks = np.concatenate(parts).astype(np.int16) if parts else np.zeros((0, 2), dtype=np.int16)
+    levels = [(samples_per_bucket, peaks)]
+    for _ in range(level_count - 1):
+        if len(peaks) <= 1:
+            break
+        edges = np.arange(0, len(peaks), factor)
+        peaks = np.column_stack(
+            (np.minimum.reduceat(peaks[:, 0], edges), np.maximum.reduceat(peaks[:, 1], edges))
+        )
+        samples_per_bucket *= factor
+        levels.append((samples_per_bucket, peaks))
+    return WaveformPeaks(sample_rate, levels)
+
+
+def update_index(changes: dict[str, str]) -> None:
+    """
+    Records which peaks file belongs to each song - {filepath: key}
+    Peaks files a song used before it changed are deleted
+    """
+    with _index_lock:
+        try:
+            index = json.loads(index_file.read_text())
+        except (OSError, ValueError):
+            index = {}
+        for filepath, key in changes.items():
+            old_key = index.get(filepath)
+            if old_key and old_key != key:
+                (peaks_dir / f"{old_key}.peaks").unlink(missing_ok=True)
+            index[filepath] = key
+        temp_file = index_file.with_suffix(".tmp")
+        temp_file.write_text(json.dumps(index))
+        os.replace(temp_file, index_file)
+
+
+def get_waveform_peaks(filepath: str, frame_rate: int = CACHE_FRAME_RATE) -> WaveformPeaks | None:
+    """Returns the song's peaks if they've been made already, otherwise None"""
+    key = get_cache_key(filepath, frame_rate)
+    if not key:
+        return None
+    peaks_file = peaks_dir / f"{key}.peaks"
+    try:
+        return WaveformPeaks.load(peaks_file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, struct.error) as e:
+        error(f"get_waveform_peaks() | unreadable {peaks_file}: {e}")
+        peaks_file.unlink(missing_ok=True)
+        return None
+
+
+def write_waveform_peaks(
+    filepath: str, frame_rate: int = CACHE_FRAME_RATE, fill_pcm_cache: bool = False
+) -> tuple[str, WaveformPeaks] | None:
+    """
+    Decodes a song and writes its peaks file. Returns (key, peaks), or None if the song can't be decoded
+    `fill_pcm_cache` - for a song that's about to play: it's decoded into the visualizer's cache
+    (or the decode that's already doing that is waited for), and the peaks are made from there
+    """
+    key = get_cache_key(filepath, frame_rate)
+    if not key:
+        return None
+    if fill_pcm_cache:
+        fill_cache(filepath, frame_rate)
+    try:
+        peaks = compute_peaks(iter_pcm_chunks(filepath, frame_rate), frame_rate)
+        peaks_dir.mkdir(parents=True, exist_ok=True)
+        peaks.save(peaks_dir / f"{key}.peaks")
+    except OSError as e:
+        error(f"write_waveform_peaks() | {filepath}: {e}")
+        return None
+    debug(f"write_waveform_peaks() | {filepath}")
+    return key, peaks
+
+
+def create_waveform_peaks(
+    filepath: str, frame_rate: int = CACHE_FRAME_RATE, fill_pcm_cache: bool = False
+) -> WaveformPeaks | None:
+    """Makes one song's peaks file, and adds it to the index"""
+    written = write_waveform_peaks(filepath, frame_rate, fill_pcm_cache)
+    if written is None:
+        return None
+    key, peaks = written
+    update_index({filepath: key})
+    return peaks
+
+
+def load_waveform_peaks(filepath: str, progress_callback=None) -> tuple[str, WaveformPeaks] | None:
+    """
+    The song's peaks, made first if they don't exist yet - for a Worker
+    The song is playing or about to, so it shares one decode with the visualizer (see pcm_cache.fill_cache)
+    Returns (filepath, peaks), so the result can be matched to the song that's playing
+    """
+    peaks = get_waveform_peaks(filepath) or create_waveform_peaks(filepath, fill_pcm_cache=True)
+    if peaks is None:
+        return None
+    return filepath, peaks
+
+
+def generate_waveform_peaks(
+    filepaths: list[str] | None = None,
+    workers: int = 2,
+    frame_rate: int = CACHE_FRAME_RATE,
+    progress_callback=None,
+    cancel_token: CancellationToken | None = None,
+) -> int:
+    """
+    Background batch job - makes peaks files for every song that doesn't have one yet
+    `filepaths` defaults to the whole library
+    Stops early if `cancel_token` is cancelled - songs left over get theirs when they're played
+
+    Returns how many were made
+    """
+    if filepaths is None:
+        with DBA.DBAccess() as db:
+            filepaths = [row[0] for row in db.query("SELECT filepath FROM song;", ())]
+    missing = []
+    for filepath in filepaths:
+        key = get_cache_key(filepath, frame_rate)
+        if key and not (peaks_dir / f"{key}.peaks").exists():
+            missing.append(filepath)
+    made = 0
+    # the index is written every so often, rather than once per song
+    changes: dict[str, str] = {}
+    if progress_callback:
+        progress_callback.start(len(missing), "Waveforms")
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        def write(filepath: str):
+            if cancel_token and cancel_token.is_cancelled():
+                return None
+            return write_waveform_peaks(filepath, frame_rate)
+
+        results = executor.map(write, missing)
+        for filepath, written in zip(missing, results):
+            if written is not None:
+                made += 1
+                changes[filepath] = written[0]
+            if len(changes) >= 100:
+                update_index(changes)
+                changes = {}
+            if progress_callback:
+                progress_callback.advance(item=filepath)
+    if changes:
+        update_index(changes)
+    debug(f"generate_waveform_peaks() | made {made} of {len(missing)}")
+    return made